@@ -3,15 +3,40 @@ from openai import OpenAI
 from src.models.domain import Stock
 from src.config import settings
 from src.infrastructure.throttling import RateLimiter
-from src.analysis.prompts import PERSONA_PROMPTS
+from src.infrastructure.metrics import LLMMetrics, LLMCallRecord, estimate_cost
+from src.analysis.prompts import PERSONA_PROMPTS, ENSEMBLE_SUFFIX
+from src.analysis.ensemble import EnsembleResult, PersonaOpinion, parse_verdict, aggregate_opinions, DEFAULT_ENSEMBLE
+from src.strategies.base import SignalType
+from concurrent.futures import ThreadPoolExecutor
+from src.infrastructure.cache import RedisCache
+from typing import Dict, List, Iterator
+import hashlib
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Shared across the blocking and streaming paths so both count against one budget
+llm_rate_limiter = RateLimiter(max_calls=60, period=60)
+
+INSIGHT_CACHE_TTL = 300 # 5 min, matches the market data cache
+
 class AIAnalyst:
     """Uses Google Gemini (Primary) and OpenAI (Failover) to analyze stock data."""
     
-    def __init__(self):
+    GEMINI_MODEL = "gemini-2.0-flash"
+    OPENAI_MODEL = "gpt-4o"
+
+    def __init__(self, metrics: LLMMetrics = None, cache: RedisCache = None, gemini_model=None, openai_client=None):
+        self.metrics = metrics or LLMMetrics()
+        self.cache = cache or RedisCache(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=settings.REDIS_DB)
+        
+        # Injected clients (e.g. local stand-ins for benchmarking) skip key-based setup
+        if gemini_model or openai_client:
+            self.gemini_model = gemini_model
+            self.openai_client = openai_client
+            return
+
         # Try to get keys from settings, or fallback to st.secrets directly
         gemini_key = settings.GEMINI_API_KEY
         openai_key = settings.OPENAI_API_KEY
@@ -37,7 +62,7 @@ class AIAnalyst:
         if gemini_key:
             genai.configure(api_key=gemini_key)
             # Use gemini-2.0-flash (Standard for late 2025)
-            self.gemini_model = genai.GenerativeModel('gemini-2.0-flash')
+            self.gemini_model = genai.GenerativeModel(self.GEMINI_MODEL)
         else:
             logger.warning("Gemini API key not configured.")
             self.gemini_model = None
@@ -49,44 +74,119 @@ class AIAnalyst:
             logger.warning("OpenAI API key not configured.")
             self.openai_client = None
 
-    @RateLimiter(max_calls=60, period=60)
-    def analyze_stock(self, stock: Stock, persona: str = "General") -> str:
-        """Generates a text analysis of the stock using the selected persona."""
+    def analyze_stock(self, stock: Stock, persona: str = "General", verdict: bool = False) -> str:
+        """
+        Generates a text analysis of the stock using the selected persona.
+        With `verdict`, the answer starts with a "VERDICT: X, CONFIDENCE: N" line (see ENSEMBLE_SUFFIX).
+        """
         
         if not stock.indicators:
             return "Insufficient data for AI analysis."
             
         # Prepare Prompt
-        prompt_template = PERSONA_PROMPTS.get(persona, PERSONA_PROMPTS["General"])
-        
-        # Safe formatting
         try:
-            prompt = prompt_template.format(
-                symbol=stock.symbol,
-                company_name=stock.company_name or "Unknown",
-                current_price=f"{stock.current_price:.2f}" if stock.current_price else "N/A",
-                rsi=f"{stock.indicators.rsi:.2f}" if stock.indicators.rsi else "N/A",
-                macd=f"{stock.indicators.macd:.2f}" if stock.indicators.macd else "N/A",
-                sma_50=f"{stock.indicators.sma_50:.2f}" if stock.indicators.sma_50 else "N/A",
-                sma_200=f"{stock.indicators.sma_200:.2f}" if stock.indicators.sma_200 else "N/A",
-                pe_ratio=stock.fundamentals.get('PE_Ratio', 'N/A'),
-                eps=stock.fundamentals.get('EPS', 'N/A'),
-                market_cap=stock.fundamentals.get('Market_Cap', 'N/A'),
-                sector=stock.fundamentals.get('Sector', 'N/A'),
-                sentiment_score=f"{stock.sentiment_score:.2f}" if stock.sentiment_score is not None else "N/A",
-                sentiment_summary=stock.sentiment_summary or "No significant news."
-            )
+            prompt = self.build_prompt(stock, persona)
         except Exception as e:
             logger.error(f"Error formatting prompt: {e}")
             return "Error preparing analysis data."
+        if verdict:
+            prompt += ENSEMBLE_SUFFIX
+        
+        return self._complete(prompt, persona, stock.symbol)
+
+    def analyze_ensemble(self, stock: Stock, personas: List[str] = None, max_workers: int = 4) -> EnsembleResult:
+        """
+        Evaluates several personas on one stock and aggregates them into a combined vote.
+        The stock data block is formatted once and the persona requests run in parallel,
+        so a multi-persona view costs roughly one round trip of latency.
+        """
+        personas = personas or DEFAULT_ENSEMBLE
+        start = time.perf_counter()
+        
+        if not stock.indicators:
+            opinions = [PersonaOpinion(persona=p, signal=SignalType.HOLD, confidence=0.0, insight="Insufficient data for AI analysis.") for p in personas]
+            return aggregate_opinions(stock.symbol, opinions)
+        
+        fields = self._prompt_fields(stock)
+        
+        def run(persona: str) -> PersonaOpinion:
+            prompt = self._build_prompt(persona, fields) + ENSEMBLE_SUFFIX
+            insight = self._complete(prompt, persona, stock.symbol)
+            if not self.is_model_output(insight):
+                # Failed/unavailable call: no opinion, so it carries no weight in the vote
+                return PersonaOpinion(persona=persona, signal=SignalType.HOLD, confidence=0.0, insight=insight)
+            signal, confidence = parse_verdict(insight)
+            return PersonaOpinion(persona=persona, signal=signal, confidence=confidence, insight=insight)
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(personas)))) as pool:
+            opinions = list(pool.map(run, personas))
+        
+        result = aggregate_opinions(stock.symbol, opinions)
+        result.latency_ms = (time.perf_counter() - start) * 1000
+        return result
+
+    @classmethod
+    def build_prompt(cls, stock: Stock, persona: str = "General") -> str:
+        """The exact prompt sent for this stock and persona (also used to key stored decisions)."""
+        return cls._build_prompt(persona, cls._prompt_fields(stock))
+
+    @classmethod
+    def input_hash(cls, stock: Stock, persona: str = "General") -> str:
+        """Stable hash of every input the model sees for this stock and persona."""
+        return hashlib.sha256(cls.build_prompt(stock, persona).encode()).hexdigest()[:24]
+
+    @classmethod
+    def model_for(cls, insight: str) -> str:
+        """Returns which model produced a labelled insight."""
+        return cls.OPENAI_MODEL if insight.startswith("**[OpenAI") else cls.GEMINI_MODEL
+
+    @staticmethod
+    def is_model_output(insight: str) -> bool:
+        """True if the insight came from a model (as opposed to an error/unavailable message)."""
+        return insight.startswith("**[Gemini") or insight.startswith("**[OpenAI")
+
+    @staticmethod
+    def _prompt_fields(stock: Stock) -> Dict[str, str]:
+        """Formats the stock data block shared by all persona prompts."""
+        return dict(
+            symbol=stock.symbol,
+            company_name=stock.company_name or "Unknown",
+            current_price=f"{stock.current_price:.2f}" if stock.current_price else "N/A",
+            rsi=f"{stock.indicators.rsi:.2f}" if stock.indicators.rsi else "N/A",
+            macd=f"{stock.indicators.macd:.2f}" if stock.indicators.macd else "N/A",
+            sma_50=f"{stock.indicators.sma_50:.2f}" if stock.indicators.sma_50 else "N/A",
+            sma_200=f"{stock.indicators.sma_200:.2f}" if stock.indicators.sma_200 else "N/A",
+            pe_ratio=stock.fundamentals.get('PE_Ratio', 'N/A'),
+            eps=stock.fundamentals.get('EPS', 'N/A'),
+            market_cap=stock.fundamentals.get('Market_Cap', 'N/A'),
+            sector=stock.fundamentals.get('Sector', 'N/A'),
+            sentiment_score=f"{stock.sentiment_score:.2f}" if stock.sentiment_score is not None else "N/A",
+            sentiment_summary=stock.sentiment_summary or "No significant news."
+        )
+
+    @staticmethod
+    def _build_prompt(persona: str, fields: Dict[str, str]) -> str:
+        prompt_template = PERSONA_PROMPTS.get(persona, PERSONA_PROMPTS["General"])
+        return prompt_template.format(**fields)
+
+    def _complete(self, prompt: str, persona: str, symbol: str = None) -> str:
+        """Returns the labelled insight for a prompt, from cache when possible."""
+        cached = self._get_cached_insight(prompt, persona, symbol)
+        if cached:
+            return cached
+        return self._generate(prompt, persona, symbol)
+
+    @llm_rate_limiter
+    def _generate(self, prompt: str, persona: str, symbol: str = None) -> str:
+        """Runs the prompt against Gemini with OpenAI failover."""
         
         # 1. Try Gemini (Primary)
         gemini_error = None
         if self.gemini_model:
             try:
-                response = self.gemini_model.generate_content(prompt)
-                if response.text:
-                    return f"**[Gemini - {persona}]**: {response.text}"
+                text = self._call_gemini(prompt, persona, symbol)
+                if text:
+                    return self._cache_insight(prompt, persona, f"**[Gemini - {persona}]**: {text}")
             except Exception as e:
                 gemini_error = str(e)
                 logger.warning(f"Gemini analysis failed: {e}. Failing over to OpenAI...")
@@ -94,26 +194,95 @@ class AIAnalyst:
         # 2. Try OpenAI (Failover)
         if self.openai_client:
             try:
-                response = self.openai_client.chat.completions.create(
-                    model="gpt-4o", # Using GPT-4o for best results
-                    messages=[{"role": "user", "content": prompt}],
-                    max_tokens=150
-                )
-                return f"**[OpenAI - {persona}]**: {response.choices[0].message.content}"
+                text = self._call_openai(prompt, persona, symbol, failover=self.gemini_model is not None)
+                return self._cache_insight(prompt, persona, f"**[OpenAI - {persona}]**: {text}")
             except Exception as e:
                 logger.error(f"OpenAI analysis failed: {e}")
+                return self._failure_message(gemini_error, e)
                 
-                # Debug: List available OpenAI models
-                openai_debug = ""
-                try:
-                    models = self.openai_client.models.list()
-                    # Filter for likely chat models to keep list readable
-                    names = [m.id for m in models.data if "gpt" in m.id]
-                    openai_debug = "\n\n**Available OpenAI Models:**\n" + ", ".join(names)
-                except Exception as list_err:
-                    openai_debug = f"\n\n(Could not list OpenAI models: {list_err})"
-                
-                return f"Error: Both AI models failed.\n\nGemini Error: {gemini_error}\nOpenAI Error: {e}{openai_debug}"
+        return self._failure_message(gemini_error)
+
+    def analyze_stock_stream(self, stock: Stock, persona: str = "General") -> Iterator[str]:
+        """
+        Streaming variant of analyze_stock: yields text chunks as they arrive.
+        Uses the same Gemini -> OpenAI failover; the complete text is cached for reuse.
+        """
+        if not stock.indicators:
+            yield "Insufficient data for AI analysis."
+            return
+            
+        try:
+            prompt = self.build_prompt(stock, persona)
+        except Exception as e:
+            logger.error(f"Error formatting prompt: {e}")
+            yield "Error preparing analysis data."
+            return
+        
+        yield from self._complete_stream(prompt, persona, stock.symbol)
+
+    def _complete_stream(self, prompt: str, persona: str, symbol: str = None) -> Iterator[str]:
+        cached = self._get_cached_insight(prompt, persona, symbol)
+        if cached:
+            yield cached
+            return
+        yield from self._generate_stream(prompt, persona, symbol)
+
+    @llm_rate_limiter
+    def _generate_stream(self, prompt: str, persona: str, symbol: str = None) -> Iterator[str]:
+        # 1. Try Gemini (Primary)
+        gemini_error = None
+        if self.gemini_model:
+            header = f"**[Gemini - {persona}]**: "
+            parts = []
+            try:
+                for chunk in self._stream_gemini(prompt, persona, symbol):
+                    if not parts:
+                        yield header
+                    parts.append(chunk)
+                    yield chunk
+                if parts:
+                    self._cache_insight(prompt, persona, header + "".join(parts))
+                    return
+            except Exception as e:
+                gemini_error = str(e)
+                logger.warning(f"Gemini stream failed: {e}. Failing over to OpenAI...")
+                if parts:
+                    yield "\n\n_(Gemini stream interrupted, continuing with OpenAI)_\n\n"
+        
+        # 2. Try OpenAI (Failover)
+        if self.openai_client:
+            header = f"**[OpenAI - {persona}]**: "
+            parts = []
+            try:
+                for chunk in self._stream_openai(prompt, persona, symbol, failover=self.gemini_model is not None):
+                    if not parts:
+                        yield header
+                    parts.append(chunk)
+                    yield chunk
+                if not parts:
+                    raise RuntimeError("OpenAI stream returned no content")
+                self._cache_insight(prompt, persona, header + "".join(parts))
+                return
+            except Exception as e:
+                logger.error(f"OpenAI stream failed: {e}")
+                yield self._failure_message(gemini_error, e)
+                return
+        
+        yield self._failure_message(gemini_error)
+
+    def _failure_message(self, gemini_error: str = None, openai_error: Exception = None) -> str:
+        if openai_error is not None:
+            # Debug: List available OpenAI models
+            openai_debug = ""
+            try:
+                models = self.openai_client.models.list()
+                # Filter for likely chat models to keep list readable
+                names = [m.id for m in models.data if "gpt" in m.id]
+                openai_debug = "\n\n**Available OpenAI Models:**\n" + ", ".join(names)
+            except Exception as list_err:
+                openai_debug = f"\n\n(Could not list OpenAI models: {list_err})"
+            
+            return f"Error: Both AI models failed.\n\nGemini Error: {gemini_error}\nOpenAI Error: {openai_error}{openai_debug}"
                 
         # If we get here, it means:
         # 1. No models configured OR
@@ -130,3 +299,112 @@ No AI models are configured. To enable AI analysis, add at least one API key to
 - `OPENAI_API_KEY` - Get from https://platform.openai.com/api-keys
 
 Then restart the application."""
+
+    @staticmethod
+    def _insight_cache_key(prompt: str, persona: str) -> str:
+        return f"ai_insight:{persona}:{hashlib.sha256(prompt.encode()).hexdigest()[:24]}"
+
+    def _get_cached_insight(self, prompt: str, persona: str, symbol: str = None):
+        try:
+            cached = self.cache.get(self._insight_cache_key(prompt, persona))
+        except Exception as e:
+            logger.warning(f"Insight cache read failed: {e}")
+            return None
+        if cached:
+            self.metrics.record(LLMCallRecord(provider="cache", model="-", persona=persona, symbol=symbol, cache_hit=True))
+        return cached
+
+    def _cache_insight(self, prompt: str, persona: str, insight: str) -> str:
+        try:
+            self.cache.set(self._insight_cache_key(prompt, persona), insight, expire=INSIGHT_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Insight cache write failed: {e}")
+        return insight
+
+    def _call_gemini(self, prompt: str, persona: str, symbol: str = None) -> str:
+        """Calls Gemini and records latency/token usage. Re-raises provider errors."""
+        record = LLMCallRecord(provider="gemini", model=self.GEMINI_MODEL, persona=persona, symbol=symbol)
+        start = time.perf_counter()
+        try:
+            response = self.gemini_model.generate_content(prompt)
+            usage = getattr(response, "usage_metadata", None)
+            if usage:
+                record.prompt_tokens = getattr(usage, "prompt_token_count", None)
+                record.completion_tokens = getattr(usage, "candidates_token_count", None)
+            return response.text
+        except Exception as e:
+            record.error = type(e).__name__
+            raise
+        finally:
+            self._finish_record(record, start)
+
+    def _call_openai(self, prompt: str, persona: str, symbol: str = None, failover: bool = False) -> str:
+        """Calls OpenAI and records latency/token usage. Re-raises provider errors."""
+        record = LLMCallRecord(provider="openai", model=self.OPENAI_MODEL, persona=persona, symbol=symbol, failover=failover)
+        start = time.perf_counter()
+        try:
+            response = self.openai_client.chat.completions.create(
+                model=self.OPENAI_MODEL, # Using GPT-4o for best results
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=150
+            )
+            usage = getattr(response, "usage", None)
+            if usage:
+                record.prompt_tokens = usage.prompt_tokens
+                record.completion_tokens = usage.completion_tokens
+            return response.choices[0].message.content
+        except Exception as e:
+            record.error = type(e).__name__
+            raise
+        finally:
+            self._finish_record(record, start)
+
+    def _stream_gemini(self, prompt: str, persona: str, symbol: str = None) -> Iterator[str]:
+        record = LLMCallRecord(provider="gemini", model=self.GEMINI_MODEL, persona=persona, symbol=symbol)
+        start = time.perf_counter()
+        try:
+            for chunk in self.gemini_model.generate_content(prompt, stream=True):
+                usage = getattr(chunk, "usage_metadata", None)
+                if usage:
+                    record.prompt_tokens = getattr(usage, "prompt_token_count", None)
+                    record.completion_tokens = getattr(usage, "candidates_token_count", None)
+                if chunk.text:
+                    if record.ttft_ms is None:
+                        record.ttft_ms = (time.perf_counter() - start) * 1000
+                    yield chunk.text
+        except Exception as e:
+            record.error = type(e).__name__
+            raise
+        finally:
+            self._finish_record(record, start)
+
+    def _stream_openai(self, prompt: str, persona: str, symbol: str = None, failover: bool = False) -> Iterator[str]:
+        record = LLMCallRecord(provider="openai", model=self.OPENAI_MODEL, persona=persona, symbol=symbol, failover=failover)
+        start = time.perf_counter()
+        try:
+            stream = self.openai_client.chat.completions.create(
+                model=self.OPENAI_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=150,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            for chunk in stream:
+                if chunk.usage:
+                    record.prompt_tokens = chunk.usage.prompt_tokens
+                    record.completion_tokens = chunk.usage.completion_tokens
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if record.ttft_ms is None:
+                        record.ttft_ms = (time.perf_counter() - start) * 1000
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            record.error = type(e).__name__
+            raise
+        finally:
+            self._finish_record(record, start)
+
+    def _finish_record(self, record: LLMCallRecord, start: float):
+        record.latency_ms = (time.perf_counter() - start) * 1000
+        if record.error is None:
+            record.cost_usd = estimate_cost(record.model, record.prompt_tokens, record.completion_tokens)
+        self.metrics.record(record)
@@ -0,0 +1,132 @@
+from typing import Dict, Optional, Sequence
+import logging
+
+import numpy as np
+
+from src.config import settings
+from src.models.risk import AllocationSettings, RiskSettings
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+DEFAULT_DAILY_VOL = 0.02 # Assumed for symbols without enough history
+MIN_OVERLAP = 10 # Shared daily returns needed before a pair's correlation is estimated
+ALLOCATION_METHODS = ("vol_target", "kelly", "mean_variance", "fixed") # "fixed": the agent's one $1,000 buy per cycle
+
+
+class PositionAllocator:
+    """
+    Sizes all of a cycle's buy candidates together from their recent daily
+    returns (NumPy covariance, shrunk toward its diagonal) and AI confidence:
+
+    - vol_target: weights proportional to confidence / volatility, scaled so the
+      new positions together run at `target_volatility` (correlation-aware)
+    - kelly: `kelly_fraction` of the Kelly weights inv(cov) @ mu
+    - mean_variance: the long-only tangency portfolio inv(cov) @ mu, scaled to
+      the cycle budget
+
+    Expected returns come from the AI view: a buy at confidence c implies an
+    annualized Sharpe ratio of c * `view_sharpe`. The result respects RiskSettings:
+    at most `slots` new positions (largest weights first), each at most
+    max_position_size, all within min(cash, max_gross_pct * equity).
+    """
+
+    def __init__(self, allocation: Optional[AllocationSettings] = None, risk: Optional[RiskSettings] = None):
+        self.allocation = allocation or settings.ALLOCATION_SETTINGS
+        self.risk = risk or settings.RISK_SETTINGS
+
+    def allocate(self, symbols: Sequence[str], prices: Sequence[float], closes: Sequence[Sequence[float]],
+                 confidence: Sequence[float], equity: float, cash: float, slots: int) -> Dict[str, int]:
+        """Target share counts for `symbols` (only those worth at least one share are returned)."""
+        n = len(symbols)
+        if not n or slots <= 0 or equity <= 0:
+            return {}
+        price = np.asarray(prices, dtype=float)
+        conf = np.clip(np.asarray(confidence, dtype=float), 0.0, 1.0)
+        cov = self.covariance(self.returns_matrix(closes))
+        weights = np.maximum(np.nan_to_num(self.weights(cov, conf)), 0.0)
+
+        # Keep the largest `slots` positive weights, then re-weight just those
+        keep = np.argsort(-weights, kind="stable")[:slots]
+        keep = keep[weights[keep] > 0]
+        if len(keep) < n:
+            weights = np.zeros(n)
+            if len(keep):
+                weights[keep] = np.maximum(np.nan_to_num(self.weights(cov[np.ix_(keep, keep)], conf[keep])), 0.0)
+
+        dollars = np.minimum(weights * equity, self.risk.max_position_size)
+        budget = max(0.0, min(cash, self.allocation.max_gross_pct * equity))
+        total = dollars.sum()
+        if total > budget:
+            dollars *= budget / total
+        shares = np.floor(np.divide(dollars, price, out=np.zeros(n), where=price > 0)).astype(int)
+        logger.debug(f"Allocated ${float(dollars.sum()):,.0f} across {int((shares > 0).sum())} of {n} candidates ({self.allocation.method})")
+        return {symbol: int(q) for symbol, q in zip(symbols, shares) if q > 0}
+
+    def returns_matrix(self, closes: Sequence[Sequence[float]]) -> np.ndarray:
+        """
+        (days x symbols) daily returns over the last `lookback_days`, aligned on the
+        most recent bar. Days before a symbol's history starts are NaN.
+        """
+        length = min(max((len(c) for c in closes), default=0), self.allocation.lookback_days + 1)
+        tail = np.full((length, len(closes)), np.nan)
+        for j, c in enumerate(closes):
+            series = np.asarray(c[-length:], dtype=float) if length else np.empty(0)
+            if len(series):
+                tail[length - len(series):, j] = series
+        tail[~(tail > 0)] = np.nan # Missing or bad prices
+        return tail[1:] / tail[:-1] - 1.0 if length > 1 else np.empty((0, len(closes)))
+
+    def covariance(self, returns: np.ndarray) -> np.ndarray:
+        """
+        Each symbol's variance comes from its own returns and each correlation from
+        the days both symbols have (pairs sharing fewer than MIN_OVERLAP days are
+        taken as uncorrelated), so one short history only affects its own row.
+        """
+        n = returns.shape[1]
+        valid = ~np.isnan(returns)
+        x = np.where(valid, returns, 0.0)
+        m = valid.astype(float)
+        count = m.T @ m # Days each pair has in common (diagonal: each symbol's own)
+        total = x.T @ m # total[i, j]: sum of i's returns on days j also has
+        squares = (x * x).T @ m
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cross = (x.T @ x - total * total.T / count) / (count - 1)
+            spread = (squares - total * total / count) / (count - 1) # spread[i, j]: i's variance on days shared with j
+            corr = cross / np.sqrt(spread * spread.T)
+        corr[~np.isfinite(corr) | (count < MIN_OVERLAP)] = 0.0
+        corr = np.clip(corr, -1.0, 1.0)
+        np.fill_diagonal(corr, 1.0)
+        # Pairwise estimates need not be jointly consistent: clip to the nearest PSD correlation
+        eigenvalues, vectors = np.linalg.eigh(corr)
+        if eigenvalues.min() < 0:
+            corr = (vectors * np.maximum(eigenvalues, 1e-8)) @ vectors.T
+            scale = np.sqrt(np.diag(corr))
+            corr = corr / np.outer(scale, scale)
+
+        variance = np.diag(spread).copy() if n else np.empty(0)
+        # Flat, short or missing series: assume a typical volatility rather than zero risk
+        variance[~(variance > 0)] = DEFAULT_DAILY_VOL ** 2
+        vol = np.sqrt(variance)
+        sample = corr * np.outer(vol, vol)
+        a = self.allocation.shrinkage
+        return (1 - a) * sample + a * np.diag(variance)
+
+    def weights(self, cov: np.ndarray, conf: np.ndarray) -> np.ndarray:
+        """Fractions of equity per candidate (before slot, size and budget caps)."""
+        vol = np.sqrt(np.diag(cov))
+        method = self.allocation.method
+        if method == "vol_target":
+            raw = conf / vol
+            portfolio_vol = np.sqrt(raw @ cov @ raw * TRADING_DAYS)
+            return raw * (self.allocation.target_volatility / portfolio_vol) if portfolio_vol > 0 else raw * 0.0
+
+        mu = conf * vol * self.allocation.view_sharpe / np.sqrt(TRADING_DAYS) # Daily expected return implied by the view
+        raw = np.linalg.solve(cov + np.eye(len(conf)) * 1e-10, mu)
+        if method == "kelly":
+            return self.allocation.kelly_fraction * raw
+        if method == "mean_variance":
+            raw = np.maximum(raw, 0.0)
+            total = raw.sum()
+            return raw * (self.allocation.max_gross_pct / total) if total > 0 else raw
+        raise ValueError(f"Unknown allocation method: {method}")
@@ -0,0 +1,80 @@
+import re
+from typing import List, Optional, Tuple
+from pydantic import BaseModel, Field
+from src.strategies.base import SignalType
+
+# Personas consulted when no explicit list is given
+DEFAULT_ENSEMBLE = ["Warren Buffett", "Peter Lynch", "Benjamin Graham"]
+
+# Net weighted vote needed (in -1..1) before the ensemble leans BUY or SELL
+CONSENSUS_THRESHOLD = 0.2
+
+DEFAULT_CONFIDENCE = 0.5
+
+VERDICT_PATTERN = re.compile(r"VERDICT:\s*\**\s*(BUY|SELL|HOLD)\**\s*,?\s*CONFIDENCE:\s*(\d+(?:\.\d+)?)", re.IGNORECASE)
+
+# Fallback keywords, covering the verdict phrases used in PERSONA_PROMPTS
+BUY_KEYWORDS = ("bullish", "buy", "undervalued")
+SELL_KEYWORDS = ("bearish", "sell", "avoid", "overvalued")
+
+
+class PersonaOpinion(BaseModel):
+    """One persona's verdict on a stock."""
+    persona: str
+    signal: SignalType
+    confidence: float = Field(DEFAULT_CONFIDENCE, description="0.0 to 1.0")
+    insight: str
+
+
+class EnsembleResult(BaseModel):
+    """Combined vote over several persona opinions."""
+    symbol: str
+    consensus: SignalType
+    score: float = Field(0.0, description="Confidence-weighted vote from -1 (SELL) to 1 (BUY)")
+    agreement: float = Field(0.0, description="Fraction of personas agreeing with the consensus")
+    opinions: List[PersonaOpinion] = []
+    latency_ms: Optional[float] = None
+
+
+def explicit_verdict(insight: str) -> Optional[Tuple[SignalType, float]]:
+    """(signal, confidence) from a "VERDICT: X, CONFIDENCE: N" line, or None if the insight has none."""
+    match = VERDICT_PATTERN.search(insight)
+    if not match:
+        return None
+    return SignalType(match.group(1).upper()), min(float(match.group(2)), 100.0) / 100.0
+
+
+def parse_verdict(insight: str) -> Tuple[SignalType, float]:
+    """
+    Extracts (signal, confidence) from an insight.
+    Prefers an explicit "VERDICT: X, CONFIDENCE: N" line, otherwise falls back to keywords.
+    """
+    verdict = explicit_verdict(insight)
+    if verdict:
+        return verdict
+
+    text = insight.lower()
+    is_buy = any(k in text for k in BUY_KEYWORDS)
+    is_sell = any(k in text for k in SELL_KEYWORDS)
+    if is_buy and not is_sell:
+        return SignalType.BUY, DEFAULT_CONFIDENCE
+    if is_sell and not is_buy:
+        return SignalType.SELL, DEFAULT_CONFIDENCE
+    return SignalType.HOLD, DEFAULT_CONFIDENCE
+
+
+def aggregate_opinions(symbol: str, opinions: List[PersonaOpinion]) -> EnsembleResult:
+    """Combines persona opinions into a confidence-weighted consensus."""
+    weights = {SignalType.BUY: 1.0, SignalType.SELL: -1.0, SignalType.HOLD: 0.0}
+    total_confidence = sum(o.confidence for o in opinions)
+    score = sum(weights[o.signal] * o.confidence for o in opinions) / total_confidence if total_confidence else 0.0
+
+    if score >= CONSENSUS_THRESHOLD:
+        consensus = SignalType.BUY
+    elif score <= -CONSENSUS_THRESHOLD:
+        consensus = SignalType.SELL
+    else:
+        consensus = SignalType.HOLD
+
+    agreement = sum(1 for o in opinions if o.signal == consensus) / len(opinions) if opinions else 0.0
+    return EnsembleResult(symbol=symbol, consensus=consensus, score=score, agreement=agreement, opinions=opinions)
@@ -0,0 +1,32 @@
+import hashlib
+import json
+from typing import Optional
+
+from src.models.domain import Stock
+
+
+def news_id(item: dict) -> Optional[str]:
+    """Stable id for an Alpha Vantage news feed item (the feed has no id field)."""
+    if not item:
+        return None
+    return item.get("url") or f"{item.get('time_published', '')}:{item.get('title', '')}"
+
+
+def input_fingerprint(stock: Stock, persona: str) -> str:
+    """
+    Hash of everything an agent decision depends on: last bar, indicator snapshot,
+    fundamentals, latest news item and persona. Intraday price ticks inside the same
+    bar do not change it; indicators are rounded to the precision the prompts use.
+    """
+    last_bar = max((p.timestamp for p in stock.history), default=None)
+    indicators = stock.indicators.model_dump() if stock.indicators else {}
+    payload = {
+        "symbol": stock.symbol,
+        "persona": persona,
+        "last_bar": last_bar.isoformat() if last_bar else None,
+        "indicators": {k: round(v, 2) if v is not None else None for k, v in indicators.items()},
+        "fundamentals": stock.fundamentals,
+        "news": stock.latest_news_id,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:24]
@@ -127,3 +127,10 @@ PERSONA_PROMPTS = {
     "Philip Fisher": FISHER_PROMPT,
     "John Templeton": TEMPLETON_PROMPT
 }
+
+# Appended to persona prompts in ensemble mode (and by the agent) so verdicts can be parsed.
+# The verdict goes first so the OpenAI max_tokens cap can only truncate the commentary
+ENSEMBLE_SUFFIX = """
+Start your answer with one line in exactly this format, then give your reasoning:
+VERDICT: <BUY|SELL|HOLD>, CONFIDENCE: <0-100>
+"""
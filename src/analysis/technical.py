@@ -9,40 +9,43 @@ class TechnicalAnalyzer:
     def calculate_indicators(stock: Stock) -> TechnicalIndicators:
         if not stock.history:
             return TechnicalIndicators()
+        frame = TechnicalAnalyzer.indicator_frame([p.close for p in sorted(stock.history, key=lambda p: p.timestamp)])
+        return TechnicalAnalyzer.indicators_at(frame, len(frame) - 1)
 
-        df = pd.DataFrame([p.model_dump() for p in stock.history])
-        df.set_index('timestamp', inplace=True)
-        df.sort_index(inplace=True)
-        
-        close = df['close']
-        
-        # SMA
-        sma_50 = close.rolling(window=50).mean().iloc[-1]
-        sma_200 = close.rolling(window=200).mean().iloc[-1]
-        
-        # EMA
-        ema_12 = close.ewm(span=12, adjust=False).mean().iloc[-1]
-        ema_26 = close.ewm(span=26, adjust=False).mean().iloc[-1]
+    @staticmethod
+    def indicator_frame(closes) -> pd.DataFrame:
+        """
+        Every indicator for every bar of `closes` (oldest first). All of them only
+        look backwards, so row i equals what calculate_indicators gives for the
+        first i + 1 bars: backtests compute this once instead of once per bar.
+        """
+        close = pd.Series(closes, dtype=float)
         
         # MACD
-        macd_line = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+        ema_12 = close.ewm(span=12, adjust=False).mean()
+        ema_26 = close.ewm(span=26, adjust=False).mean()
+        macd_line = ema_12 - ema_26
         signal_line = macd_line.ewm(span=9, adjust=False).mean()
-        macd_hist = macd_line - signal_line
         
         # RSI
         delta = close.diff()
         gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
         loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
         rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
         
-        return TechnicalIndicators(
-            rsi=rsi.iloc[-1] if not pd.isna(rsi.iloc[-1]) else None,
-            macd=macd_line.iloc[-1] if not pd.isna(macd_line.iloc[-1]) else None,
-            macd_signal=signal_line.iloc[-1] if not pd.isna(signal_line.iloc[-1]) else None,
-            macd_hist=macd_hist.iloc[-1] if not pd.isna(macd_hist.iloc[-1]) else None,
-            sma_50=sma_50 if not pd.isna(sma_50) else None,
-            sma_200=sma_200 if not pd.isna(sma_200) else None,
-            ema_12=ema_12 if not pd.isna(ema_12) else None,
-            ema_26=ema_26 if not pd.isna(ema_26) else None
-        )
+        return pd.DataFrame({
+            "rsi": 100 - (100 / (1 + rs)),
+            "macd": macd_line,
+            "macd_signal": signal_line,
+            "macd_hist": macd_line - signal_line,
+            "sma_50": close.rolling(window=50).mean(),
+            "sma_200": close.rolling(window=200).mean(),
+            "ema_12": ema_12,
+            "ema_26": ema_26,
+        })
+
+    @staticmethod
+    def indicators_at(frame: pd.DataFrame, i: int) -> TechnicalIndicators:
+        """Row `i` of an indicator_frame (NaN -> None)."""
+        row = frame.iloc[i]
+        return TechnicalIndicators(**{name: (None if pd.isna(value) else float(value)) for name, value in row.items()})
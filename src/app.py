@@ -11,50 +11,36 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from src.providers.yahoo import YahooFinanceProvider
 from src.strategies.sma_crossover import SMACrossoverStrategy
 from src.strategies.rsi_reversion import RSIMeanReversionStrategy
+from src.strategies.persona_replay import PersonaReplayStrategy
 from src.backtesting.engine import Backtester
-from src.execution.paper_engine import PaperTradingEngine
+from src.backtesting.replay import PersonaReplayRunner
 from src.analysis.technical import TechnicalAnalyzer
 from src.models.domain import Stock
 
-from src.services.market_data import MarketDataService
 from src.execution.alpaca_engine import AlpacaExecutionEngine
-from src.analysis.ai_analyst import AIAnalyst
+from src.analysis.prompts import PERSONA_PROMPTS
+from src.analysis.ensemble import DEFAULT_ENSEMBLE
 from src.config import settings
-from src.models.risk import RiskSettings
+from src.models.risk import RiskSettings, AllocationSettings
+from src.analysis.allocation import ALLOCATION_METHODS
 from src.models.watchlist import WatchlistItem
-from src.models.trading import OrderSide, OrderType
+from src.models.trading import OrderSide, OrderType, FillModelSettings
+from src.execution.fill_model import fill_model_from_settings
 import datetime
 import random
-from src.services.scanner import MarketScanner
-from src.services.portfolio_manager import PortfolioManager
-from src.services.scheduler import AgentScheduler
+from src.services.registry import ServiceRegistry
+from src.infrastructure.journal import JOURNAL_ACTIONS
 
 st.set_page_config(page_title="AI Day Trading Bot", layout="wide")
 
-# Initialize Session State
-if 'service' not in st.session_state:
-    st.session_state.service = MarketDataService()
-if 'ai_analyst' not in st.session_state:
-    st.session_state.ai_analyst = AIAnalyst()
-
-# Execution Engine Selection
-if 'engine' not in st.session_state:
-    # Default to Paper
-    st.session_state.engine = PaperTradingEngine()
-
-# Agent Services
-if 'scanner' not in st.session_state:
-    st.session_state.scanner = MarketScanner()
-if 'portfolio_manager' not in st.session_state:
-    st.session_state.portfolio_manager = PortfolioManager(
-        st.session_state.service,
-        st.session_state.ai_analyst,
-        st.session_state.engine,
-        st.session_state.scanner
-    )
-if 'scheduler' not in st.session_state:
-    st.session_state.scheduler = AgentScheduler(st.session_state.portfolio_manager)
-    st.session_state.scheduler.start()
+@st.cache_resource
+def get_services() -> ServiceRegistry:
+    """Built once per process and shared by every session (warm caches, one agent)."""
+    return ServiceRegistry()
+
+services = get_services()
+
+# Per-user Session State
 
 # Watchlist
 if 'watchlist' not in st.session_state:
@@ -218,10 +204,21 @@ def main():
     st.sidebar.caption("Execution Mode")
     st.sidebar.write("**Alpaca Trading**")
     
-    if settings.ALPACA_API_KEY:
-        if not isinstance(st.session_state.engine, AlpacaExecutionEngine):
+    if settings.AGENT_WORKER_SOCKET:
+        # The worker owns the engine; this process only asks it which one it runs
+        try:
+            status = services.agent.status()
+            settings.ALPACA_PAPER = status["alpaca_paper"] # So the Settings page shows the worker's mode
+            if status["broker"] == "alpaca":
+                st.sidebar.info(f"📊 Worker: Alpaca ({'Paper' if status['alpaca_paper'] else 'Live'})")
+            else:
+                st.sidebar.warning("📊 Worker: local paper account (Alpaca not connected)")
+        except Exception as e:
+            st.sidebar.error(f"❌ Agent worker unreachable: {e}")
+    elif settings.ALPACA_API_KEY:
+        if not isinstance(services.engine, AlpacaExecutionEngine):
             try:
-                st.session_state.engine = AlpacaExecutionEngine()
+                services.use_alpaca()
                 mode = "Paper" if settings.ALPACA_PAPER else "Live"
                 st.sidebar.success(f"✅ Connected: Alpaca ({mode})")
             except Exception as e:
@@ -249,24 +246,33 @@ def main():
 def show_dashboard():
     st.header("Dashboard")
     
+    # The agent's account: in worker mode it lives in the worker, not this process's engine
+    agent = services.agent
+
     # Portfolio Summary
     st.subheader("Portfolio Summary")
     try:
-        account = st.session_state.engine.get_account()
+        broker = agent.status()["broker"]
+    except Exception:
+        broker = None
+    if broker == "alpaca" and st.button("🔄 Sync with Broker"):
+        agent.sync_broker()
+    try:
+        account = agent.account()
         
         c1, c2, c3, c4 = st.columns(4)
-        c1.metric("Equity", f"${float(account.equity):,.2f}")
-        c2.metric("Buying Power", f"${float(account.buying_power):,.2f}")
+        c1.metric("Equity", f"${account['equity']:,.2f}")
+        c2.metric("Buying Power", f"${account['buying_power']:,.2f}")
         
         # Calculate P&L (Simple approximation if not provided directly)
         # Alpaca account object usually has 'last_equity'
-        last_equity = float(account.last_equity)
-        equity = float(account.equity)
+        last_equity = account["last_equity"]
+        equity = account["equity"]
         pnl = equity - last_equity
         pnl_pct = (pnl / last_equity) * 100 if last_equity else 0
         
         c3.metric("Today's P&L", f"${pnl:,.2f}", f"{pnl_pct:.2f}%")
-        c4.metric("Status", account.status)
+        c4.metric("Status", account["status"])
         
     except Exception as e:
         st.error(f"Failed to fetch account info: {e}")
@@ -274,18 +280,33 @@ def show_dashboard():
     # Active Positions
     st.subheader("Active Positions")
     try:
-        positions = st.session_state.engine.get_positions()
+        positions = agent.positions()
         if positions:
             pos_data = []
             for p in positions:
                 pos_data.append({
-                    "Symbol": p.symbol,
-                    "Qty": p.qty,
-                    "Value": f"${float(p.market_value):,.2f}",
-                    "P&L": f"${float(p.unrealized_pl):,.2f}",
-                    "P&L %": f"{float(p.unrealized_plpc)*100:.2f}%"
+                    "Symbol": p["symbol"],
+                    "Qty": p["qty"],
+                    "Value": f"${float(p['market_value']):,.2f}",
+                    "P&L": f"${float(p['unrealized_pl']):,.2f}",
+                    "P&L %": f"{float(p['unrealized_plpc'])*100:.2f}%"
                 })
             st.dataframe(pd.DataFrame(pos_data), use_container_width=True)
+
+            c1, c2 = st.columns([1, 3])
+            confirm = c2.checkbox("I understand this closes every position at market")
+            if c1.button("🚨 Liquidate All Positions", disabled=not confirm):
+                try:
+                    with st.spinner("Submitting exit orders..."):
+                        results = agent.liquidate_all()
+                    failed = sum(r["order_id"] is None for r in results)
+                    if failed:
+                        st.error(f"{failed} of {len(results)} exit orders failed.")
+                    else:
+                        st.success(f"Submitted {len(results)} exit orders.")
+                    st.dataframe(pd.DataFrame(results), use_container_width=True, hide_index=True)
+                except Exception as e:
+                    st.error(f"Liquidation failed: {e}")
         else:
             st.info("No active positions.")
     except Exception as e:
@@ -295,7 +316,7 @@ def show_dashboard():
     st.subheader("Market News")
     try:
         # Use AAPL as a default for news if no specific context
-        news = st.session_state.service.get_market_news("AAPL") 
+        news = services.market_data.get_market_news("AAPL") 
         if news:
             for item in news[:5]:
                 with st.expander(f"{item.get('title')} - {item.get('time_published')[:8]}"):
@@ -319,7 +340,7 @@ def show_analysis():
             with st.spinner(f"Fetching data for {symbol}..."):
                 try:
                     # Use service to get analyzed stock
-                    stock = st.session_state.service.get_stock_analysis(symbol)
+                    stock = services.market_data.get_stock_analysis(symbol)
                     # Store in session state to persist across reruns
                     st.session_state.current_stock = stock
                     st.session_state.current_symbol = symbol
@@ -342,14 +363,37 @@ def show_analysis():
             # AI Insight
             st.subheader("🤖 AI Analyst Insight")
             if st.button("Generate Insight", key=f"insight_{st.session_state.current_symbol}"):
-                with st.spinner(f"Consulting {st.session_state.ai_persona}..."):
-                    insight = st.session_state.ai_analyst.analyze_stock(stock, persona=st.session_state.ai_persona)
-                    st.session_state.current_insight = insight
+                # Stream tokens as they arrive; the full text is kept for reruns
+                with st.container(border=True):
+                    insight = st.write_stream(
+                        services.ai_analyst.analyze_stock_stream(stock, persona=st.session_state.ai_persona)
+                    )
+                st.session_state.current_insight = insight
             
             # Display insight if it exists
-            if hasattr(st.session_state, 'current_insight') and st.session_state.current_insight:
+            elif hasattr(st.session_state, 'current_insight') and st.session_state.current_insight:
                 st.info(st.session_state.current_insight)
 
+            # Ensemble View
+            st.subheader("🧑‍🤝‍🧑 Persona Ensemble")
+            ensemble_personas = st.multiselect(
+                "Personas", list(PERSONA_PROMPTS.keys()), default=DEFAULT_ENSEMBLE,
+                key=f"ensemble_{st.session_state.current_symbol}"
+            )
+            if st.button("Generate Ensemble View", key=f"ensemble_btn_{st.session_state.current_symbol}") and ensemble_personas:
+                with st.spinner(f"Consulting {len(ensemble_personas)} personas..."):
+                    st.session_state.current_ensemble = services.ai_analyst.analyze_ensemble(stock, ensemble_personas)
+
+            ensemble = st.session_state.get('current_ensemble')
+            if ensemble and ensemble.symbol == stock.symbol:
+                c1, c2, c3 = st.columns(3)
+                c1.metric("Consensus", ensemble.consensus.value)
+                c2.metric("Score", f"{ensemble.score:+.2f}")
+                c3.metric("Agreement", f"{ensemble.agreement:.0%}")
+                for opinion in ensemble.opinions:
+                    with st.expander(f"{opinion.persona}: {opinion.signal.value} ({opinion.confidence:.0%})"):
+                        st.write(opinion.insight)
+
     with tab2:
         st.subheader("Bulk Stock Analysis")
         symbols_input = st.text_area("Enter symbols (comma separated)", "AAPL, MSFT, GOOG, AMZN")
@@ -361,7 +405,7 @@ def show_analysis():
             progress_bar = st.progress(0)
             for i, sym in enumerate(symbols):
                 try:
-                    stock = st.session_state.service.get_stock_analysis(sym)
+                    stock = services.market_data.get_stock_analysis(sym)
                     results.append({
                         "Symbol": sym,
                         "Price": f"${stock.current_price:.2f}",
@@ -375,6 +419,36 @@ def show_analysis():
                 
             st.dataframe(pd.DataFrame(results))
 
+@st.fragment(run_every=2)
+def show_agent_jobs():
+    """Running/queued agent jobs; re-renders on its own every 2s without blocking the page."""
+    agent = services.agent
+    try:
+        jobs = agent.jobs()
+    except Exception as e:
+        st.warning(f"Could not load agent jobs: {e}")
+        return
+    for job in jobs["pending"]:
+        c1, c2 = st.columns([4, 1])
+        with c1:
+            label = f"#{job['id']} {job['name']} - {job['status']}: {job['message']}"
+            if job["merged"]:
+                label += f" (+{job['merged']} merged)"
+            st.progress(job["progress"], text=label)
+        with c2:
+            if st.button("Cancel", key=f"cancel_job_{job['id']}"):
+                agent.cancel_job(job_id=job["id"])
+    recent = jobs["recent"]
+    # Refresh the whole page (activity log, timings) once when a job finishes
+    last_finished = recent[0]["id"] if recent else 0
+    if st.session_state.setdefault("last_finished_job", last_finished) != last_finished:
+        st.session_state.last_finished_job = last_finished
+        st.rerun()
+    if recent:
+        with st.expander("Recent Agent Jobs"):
+            st.dataframe(pd.DataFrame(recent), use_container_width=True, hide_index=True,
+                         column_config={"progress": st.column_config.ProgressColumn("Progress", min_value=0.0, max_value=1.0)})
+
 def show_agent_dashboard():
     st.header("🤖 Agent Command Center")
     
@@ -390,48 +464,62 @@ def show_agent_dashboard():
     
     st.markdown("---")
     
+    agent = services.agent
+    try:
+        status = agent.status()
+    except Exception as e:
+        st.error(f"⚠️ Agent worker unavailable: {e}")
+        return
+    
     # Safety Check
-    if not settings.TRADING_ENABLED:
+    if not status["trading_enabled"]:
         st.error("⚠️ TRADING IS DISABLED - Enable trading in Settings to use the Agent")
         return
     
     # Agent Controls
     col1, col2, col3 = st.columns([1, 1, 2])
     with col1:
-        next_run = st.session_state.scheduler.get_next_run()
-        next_run_str = next_run.strftime("%H:%M") if next_run else "N/A"
+        next_run = datetime.datetime.fromisoformat(status["next_run"]) if status["next_run"] else None
+        next_run_str = next_run.strftime("%a %H:%M ET") if next_run else "N/A"
         st.metric("Next Run", next_run_str, "Scheduled")
+        warmup = status["warmup"]
+        if warmup:
+            st.caption(f"Last warm-up {warmup['started']}: {len(warmup['warmed'])} warmed, "
+                       f"{len(warmup['already_warm'])} already warm, {len(warmup['skipped'])} skipped")
     with col2:
         st.metric("Active Persona", st.session_state.ai_persona)
     with col3:
         # Max stocks slider
         max_stocks = st.slider("Max Stocks to Analyze", min_value=5, max_value=50, value=10, step=5,
                                help="How many stocks should the agent analyze per run?")
+        budget = st.number_input("Time Budget (seconds, 0 = none)", min_value=0, value=0, step=30,
+                                 help="If set, candidates are ranked by expected value and the cycle stops starting new work at the deadline.")
     
-    # Run Button
+    # Run Button - queues the cycle and returns; progress is polled below
     if st.button("🚀 Run Agent Cycle Now", type="primary", use_container_width=True):
-        with st.status("Agent Running...", expanded=True) as status:
-            st.write("🔍 Scanning Market & Watchlist...")
-            watchlist_symbols = [item.symbol for item in st.session_state.watchlist]
-            
-            st.session_state.portfolio_manager.run_cycle(
-                persona=st.session_state.ai_persona,
-                watchlist=watchlist_symbols,
-                max_stocks=max_stocks
-            )
-            status.update(label="Agent Cycle Complete", state="complete", expanded=False)
-            st.rerun()
+        watchlist_symbols = [item.symbol for item in st.session_state.watchlist]
+        job = agent.submit_cycle(
+            persona=st.session_state.ai_persona,
+            watchlist=watchlist_symbols,
+            max_stocks=max_stocks,
+            budget_seconds=budget or None
+        )
+        st.toast(f"Agent cycle queued (job #{job['id']})")
+
+    show_agent_jobs()
 
     # Activity Log
     st.subheader("📜 Agent Activity Log")
-    if st.session_state.portfolio_manager.decisions_log:
-        log_df = pd.DataFrame(st.session_state.portfolio_manager.decisions_log)
+    decisions_log = agent.decisions()
+    if decisions_log:
+        log_df = pd.DataFrame(decisions_log)
         st.dataframe(
             log_df, 
             column_config={
                 "time": "Time",
                 "symbol": "Symbol",
                 "action": st.column_config.TextColumn("Action", help="Buy/Sell/Hold"),
+                "persona": "Persona",
                 "reason": "Reason"
             },
             use_container_width=True,
@@ -440,6 +528,88 @@ def show_agent_dashboard():
     else:
         st.info("No activity logged yet. Run the agent to see decisions.")
 
+    # Full history from the persistent journal
+    with st.expander("🔎 Search Decision Journal"):
+        c1, c2, c3, c4 = st.columns(4)
+        with c1:
+            q_symbol = st.text_input("Symbol", "", key="journal_symbol").upper()
+        with c2:
+            q_action = st.selectbox("Action", ["Any", *JOURNAL_ACTIONS], key="journal_action")
+        with c3:
+            q_persona = st.selectbox("Persona", ["Any"] + list(PERSONA_PROMPTS.keys()), key="journal_persona")
+        with c4:
+            q_range = st.date_input("Date Range", [], key="journal_range")
+        start = datetime.datetime.combine(q_range[0], datetime.time.min) if len(q_range) > 0 else None
+        end = datetime.datetime.combine(q_range[-1], datetime.time.max) if len(q_range) > 0 else None
+        result = agent.query_journal(
+            symbol=q_symbol or None,
+            action=None if q_action == "Any" else q_action,
+            persona=None if q_persona == "Any" else q_persona,
+            start=start.isoformat() if start else None,
+            end=end.isoformat() if end else None
+        )
+        entries = result["entries"]
+        st.caption(f"{len(entries)} matching decisions (max 500 shown) of {result['total']} journaled.")
+        if entries:
+            st.dataframe(pd.DataFrame(entries), use_container_width=True, hide_index=True)
+
+    # LLM Performance
+    with st.expander("⏱️ LLM Performance"):
+        summary = agent.llm_summary()
+        if summary:
+            st.dataframe(pd.DataFrame(summary), use_container_width=True, hide_index=True)
+            records_df = pd.DataFrame(agent.llm_records())
+            st.download_button("Export Call Records (CSV)", records_df.to_csv(index=False),
+                               file_name="llm_calls.csv", mime="text/csv")
+        else:
+            st.info("No LLM calls recorded yet.")
+
+    # Per-stage timing of the last agent cycle
+    with st.expander("🧵 Cycle Timing"):
+        cycle_report = agent.cycle_report()
+        cycle_stats = cycle_report["stats"]
+        if cycle_stats:
+            st.dataframe(pd.DataFrame(cycle_stats), use_container_width=True, hide_index=True)
+            st.caption("busy = time spent working, blocked = time waiting on a full downstream queue.")
+            skipped = cycle_report["skipped"]
+            if skipped:
+                st.warning(f"{len(skipped)} symbols skipped to meet the time budget.")
+                st.dataframe(pd.DataFrame(skipped), use_container_width=True, hide_index=True)
+        else:
+            st.info("Run the agent to see per-stage timing.")
+
+    # Pre-trade risk state and rejections
+    with st.expander("🛡️ Risk Limits"):
+        risk_report = agent.risk_report()
+        state = risk_report["state"]
+        if state:
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("Exposure", f"${state['exposure']:,.2f}", f"{state['open_positions']} positions", delta_color="off")
+            c2.metric("Today's P&L", f"${state['daily_pnl']:,.2f}")
+            c3.metric("Drawdown", f"{state['drawdown_pct']:.2%}", f"peak ${state['peak_equity']:,.2f}", delta_color="off")
+            c4.metric("Orders Checked", state["checks"])
+            if risk_report["rejections"]:
+                st.dataframe(pd.DataFrame(risk_report["rejections"]), use_container_width=True, hide_index=True)
+            else:
+                st.caption("No orders rejected.")
+        else:
+            st.info("The current engine has no risk checks.")
+
+    # Live Orders (streamed broker updates)
+    with st.expander("📡 Live Orders"):
+        order_report = agent.order_report()
+        if order_report["open"] is None:
+            st.info("Paper orders fill when prices are processed; live order tracking applies to Alpaca.")
+        else:
+            if order_report["open"]:
+                st.dataframe(pd.DataFrame(order_report["open"]), use_container_width=True, hide_index=True)
+            else:
+                st.caption("No open orders.")
+            latency = order_report["latency"]
+            if latency.get("fills"):
+                st.caption(f"Fill latency over {latency['fills']} fills: p50 {latency['p50_ms']} ms, "
+                           f"p95 {latency['p95_ms']} ms, max {latency['max_ms']} ms")
+
     # Watchlist Management (Input for Agent)
     st.subheader("🎯 Priority Watchlist")
     with st.expander("Manage Watchlist"):
@@ -471,6 +641,7 @@ def show_settings():
     trading_enabled = st.toggle("Enable Trading", value=settings.TRADING_ENABLED)
     if trading_enabled != settings.TRADING_ENABLED:
         settings.TRADING_ENABLED = trading_enabled
+        services.agent.set_trading_enabled(enabled=trading_enabled)
         if not trading_enabled:
             st.error("TRADING DISABLED - KILL SWITCH ACTIVATED")
         else:
@@ -489,15 +660,24 @@ def show_settings():
     
     new_paper_mode = (alpaca_mode == "Paper Trading")
     if new_paper_mode != settings.ALPACA_PAPER:
-        settings.ALPACA_PAPER = new_paper_mode
-        # Reinitialize engine with new mode
-        if settings.ALPACA_API_KEY:
+        # Reinitialize engine with new mode (in the worker, if one runs the agent)
+        if settings.AGENT_WORKER_SOCKET:
             try:
-                st.session_state.engine = AlpacaExecutionEngine()
-                st.success(f"✅ Switched to {alpaca_mode}")
+                status = services.agent.set_alpaca_mode(paper=new_paper_mode)
+                settings.ALPACA_PAPER = status["alpaca_paper"]
+                st.success(f"✅ Worker switched to {alpaca_mode}")
                 st.rerun()
             except Exception as e:
-                st.error(f"Error switching mode: {e}")
+                st.error(f"Error switching the worker's mode: {e}")
+        else:
+            settings.ALPACA_PAPER = new_paper_mode
+            if settings.ALPACA_API_KEY:
+                try:
+                    services.use_alpaca()
+                    st.success(f"✅ Switched to {alpaca_mode}")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Error switching mode: {e}")
 
             
     # Risk Management
@@ -513,8 +693,28 @@ def show_settings():
             settings.RISK_SETTINGS.max_daily_loss = max_loss
             settings.RISK_SETTINGS.max_drawdown_pct = max_dd
             settings.RISK_SETTINGS.max_open_positions = int(max_open)
+            services.agent.set_risk_settings(**settings.RISK_SETTINGS.model_dump())
             st.success("Risk settings updated!")
 
+    # Position Sizing
+    st.subheader("Position Sizing")
+    with st.form("allocation_settings"):
+        allocation = settings.ALLOCATION_SETTINGS
+        method = st.selectbox("Method", ALLOCATION_METHODS, index=ALLOCATION_METHODS.index(allocation.method),
+                              help="How a cycle's bullish candidates are sized together; 'fixed' buys one $1,000 position per cycle")
+        c1, c2, c3 = st.columns(3)
+        target_vol = c1.number_input("Target Volatility (annual)", 0.01, 1.0, allocation.target_volatility, step=0.01)
+        kelly_fraction = c2.number_input("Kelly Fraction", 0.05, 1.0, allocation.kelly_fraction, step=0.05)
+        max_gross = c3.number_input("Max Equity per Cycle", 0.01, 1.0, allocation.max_gross_pct, step=0.05)
+
+        if st.form_submit_button("Update Position Sizing"):
+            settings.ALLOCATION_SETTINGS = AllocationSettings(**{
+                **allocation.model_dump(), "method": method, "target_volatility": target_vol,
+                "kelly_fraction": kelly_fraction, "max_gross_pct": max_gross
+            })
+            services.agent.set_allocation_settings(**settings.ALLOCATION_SETTINGS.model_dump())
+            st.success("Position sizing updated!")
+
     # API Keys
     st.subheader("API Configuration")
     with st.form("api_keys"):
@@ -592,9 +792,10 @@ def show_backtesting():
         - **SMA Crossover**: Buys when short-term average crosses above long-term, sells when it crosses below
         - **RSI Mean Reversion**: Buys when RSI is oversold (<30), sells when overbought (>70)
         
-        **Why only technical strategies?**
-        AI personas (Buffett, Lynch, etc.) require real-time LLM API calls and can't be easily backtested on historical data. 
-        Technical strategies are rule-based and deterministic, making them perfect for backtesting.
+        **AI Persona Strategies (Replay):**
+        AI personas (Buffett, Lynch, etc.) are backtested from a stored decision cache. The first run asks the
+        LLM once per historical day (rate-limited) and stores the answer; later runs replay those decisions
+        from disk, so they are fast and repeatable.
         
         **Why backtest?**
         - Validate strategy performance before risking real money
@@ -606,13 +807,38 @@ def show_backtesting():
     
     col1, col2 = st.columns(2)
     symbol = col1.text_input("Symbol", "AAPL", key="bt_sym").upper()
-    strategy_name = col2.selectbox("Strategy", ["SMA Crossover", "RSI Mean Reversion"])
+    strategy_name = col2.selectbox("Strategy", ["SMA Crossover", "RSI Mean Reversion"] + [f"AI: {p}" for p in PERSONA_PROMPTS])
+    
+    is_persona = strategy_name.startswith("AI: ")
+    if is_persona:
+        fill_missing = st.checkbox("Fill missing decisions with live LLM calls (one call per uncached day)", value=True)
+
+    with st.expander("Protective Exits (Bracket Orders)"):
+        st.caption("Each buy gets a take-profit and a stop that the paper engine checks on every bar. 0 = off.")
+        c1, c2, c3 = st.columns(3)
+        stop_loss_pct = c1.number_input("Stop-Loss %", 0.0, 50.0, 0.0, step=0.5)
+        take_profit_pct = c2.number_input("Take-Profit %", 0.0, 200.0, 0.0, step=0.5)
+        trailing_stop_pct = c3.number_input("Trailing Stop %", 0.0, 50.0, 0.0, step=0.5, help="Replaces the fixed stop-loss")
+
+    with st.expander("Execution Costs (Fill Model)"):
+        defaults = settings.FILL_MODEL_SETTINGS
+        realistic = st.checkbox("Simulate spread, slippage, impact, partial fills and latency", value=defaults.model != "ideal")
+        c1, c2, c3 = st.columns(3)
+        spread_bps = c1.number_input("Spread (bps)", 0.0, 500.0, defaults.spread_bps, step=1.0)
+        slippage_bps = c2.number_input("Slippage at 100% volume (bps)", 0.0, 1000.0, defaults.slippage_bps, step=5.0)
+        impact_bps = c3.number_input("Impact at 100% volume (bps)", 0.0, 1000.0, defaults.impact_bps, step=5.0)
+        c1, c2 = st.columns(2)
+        max_participation = c1.number_input("Max Share of Bar Volume", 0.001, 1.0, defaults.max_participation, step=0.01)
+        latency_ticks = c2.number_input("Latency (bars)", 0, 10, defaults.latency_ticks, help="1 = fill on the bar after the signal")
+        fill_settings = FillModelSettings(model="realistic" if realistic else "ideal", spread_bps=spread_bps,
+                                          slippage_bps=slippage_bps, impact_bps=impact_bps,
+                                          max_participation=max_participation, latency_ticks=int(latency_ticks))
     
     if st.button("Run Backtest"):
         with st.spinner("Running backtest..."):
             try:
                 # Fetch Data
-                stock = st.session_state.service.get_stock_analysis(symbol)
+                stock = services.market_data.get_stock_analysis(symbol)
                 
                 # Display date range
                 if stock.history and len(stock.history) > 0:
@@ -623,11 +849,23 @@ def show_backtesting():
                 # Select Strategy
                 if strategy_name == "SMA Crossover":
                     strategy = SMACrossoverStrategy()
+                elif is_persona:
+                    persona = strategy_name[len("AI: "):]
+                    store = services.decision_store
+                    if fill_missing:
+                        fill_bar = st.progress(0.0, text=f"Filling {persona} decisions...")
+                        runner = PersonaReplayRunner(services.ai_analyst, store)
+                        counts = runner.fill(stock, [persona], progress=lambda done, total: fill_bar.progress(done / total))
+                        st.caption(f"Decisions: {counts['cached']} cached, {counts['called']} new, {counts['failed']} failed")
+                    strategy = PersonaReplayStrategy(store, persona)
                 else:
                     strategy = RSIMeanReversionStrategy()
                 
                 # Run Backtest
-                backtester = Backtester(strategy)
+                backtester = Backtester(strategy, stop_loss_pct=stop_loss_pct or None,
+                                        take_profit_pct=take_profit_pct or None,
+                                        trailing_stop_pct=trailing_stop_pct or None, fast=True,
+                                        fill_model=fill_model_from_settings(fill_settings))
                 
                 # Capture stdout to show logs
                 import io
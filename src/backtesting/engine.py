@@ -1,18 +1,39 @@
-from typing import List, Type
+from typing import List, Optional, Type
 from datetime import datetime
 import pandas as pd
-from src.models.domain import Stock, Price
-from src.models.trading import OrderSide
+from src.models.domain import Stock, Price, TechnicalIndicators
+from src.models.trading import OrderSide, OrderStatus, OrderType
 from src.strategies.base import Strategy, SignalType
 from src.execution.paper_engine import PaperTradingEngine
+from src.execution.fast_sim import FastSimEngine
+from src.execution.fill_model import FillModel
 from src.analysis.technical import TechnicalAnalyzer
 
 class Backtester:
     """Runs a strategy against historical data."""
     
-    def __init__(self, strategy: Strategy, initial_cash: float = 100000.0):
+    MIN_PERIODS = 200
+    
+    def __init__(self, strategy: Strategy, initial_cash: float = 100000.0, stop_loss_pct: Optional[float] = None,
+                 take_profit_pct: Optional[float] = None, trailing_stop_pct: Optional[float] = None, fast: bool = False,
+                 fill_model: Optional[FillModel] = None):
+        """
+        Optional protective exits, as a percent of the entry bar's close: each buy is
+        placed as a bracket whose stop-loss (or trailing stop) and take-profit are
+        checked by the paper engine on every bar, independently of strategy signals.
+        `fast` simulates with FastSimEngine (slotted records, bar-time fills).
+        `fill_model` sets execution costs, partial fills and latency (default: settings.FILL_MODEL_SETTINGS).
+        """
         self.strategy = strategy
-        self.engine = PaperTradingEngine(initial_cash=initial_cash)
+        self.engine = (FastSimEngine(initial_cash=initial_cash, fill_model=fill_model) if fast
+                       else PaperTradingEngine(initial_cash=initial_cash, risk_checks=False, fill_model=fill_model))
+        self.stop_loss_pct = stop_loss_pct
+        self.take_profit_pct = take_profit_pct
+        self.trailing_stop_pct = trailing_stop_pct
+
+    @property
+    def uses_exits(self) -> bool:
+        return bool(self.stop_loss_pct or self.take_profit_pct or self.trailing_stop_pct)
         
     def run(self, stock_data: Stock):
         """
@@ -20,11 +41,9 @@ class Backtester:
         """
         print(f"Starting backtest for {self.strategy.name} on {stock_data.symbol}")
         
-        # We need to iterate through history, calculating indicators at each step
-        # to avoid look-ahead bias. For simplicity/performance in this MVP,
-        # we might pre-calculate indicators but only "reveal" them sequentially.
-        # However, TechnicalAnalyzer calculates on the whole history.
-        # So we will simulate by slicing the history.
+        # Indicators are computed once for the whole history and "revealed" bar by
+        # bar: they only look backwards, so bar i sees exactly what a slice up to i
+        # would give (see TechnicalAnalyzer.indicator_frame), without look-ahead.
         
         full_history = stock_data.history
         if not full_history:
@@ -35,42 +54,69 @@ class Backtester:
         full_history.sort(key=lambda x: x.timestamp)
         
         # We need at least enough data for the longest indicator (e.g. 200 days)
-        min_periods = 200
+        min_periods = self.MIN_PERIODS
+        frame = TechnicalAnalyzer.indicator_frame([p.close for p in full_history])
         
         for i in range(min_periods, len(full_history)):
             # Slice history up to current point
             current_slice = full_history[:i+1]
             current_price_point = current_slice[-1]
             
-            # Create a temporary stock object for analysis
-            # Convert history to dicts to avoid Pydantic class mismatch during reloading
-            temp_stock = Stock(
-                symbol=stock_data.symbol,
-                history=[p.model_dump() for p in current_slice],
-                current_price=current_price_point.close
-            )
-            
-            # Calculate indicators for this slice
-            temp_stock.indicators = TechnicalAnalyzer.calculate_indicators(temp_stock)
+            # Create a temporary stock object (with indicators) for this slice
+            temp_stock = self.slice_stock(stock_data.symbol, current_slice, TechnicalAnalyzer.indicators_at(frame, i))
             
+            if isinstance(self.engine, FastSimEngine):
+                self.engine.clock = current_price_point.timestamp
+
             # Get Signal
             signal = self.strategy.analyze(temp_stock)
             
             # Execute Signal
             if signal.signal_type == SignalType.BUY:
                 # Buy logic: e.g., buy 10 shares
-                self.engine.place_order(stock_data.symbol, OrderSide.BUY, 10)
+                if self.uses_exits:
+                    close = current_price_point.close
+                    self.engine.place_bracket_order(
+                        stock_data.symbol, OrderSide.BUY, 10,
+                        take_profit=close * (1 + self.take_profit_pct / 100) if self.take_profit_pct else None,
+                        stop_loss=close * (1 - self.stop_loss_pct / 100) if self.stop_loss_pct else None,
+                        trail_percent=self.trailing_stop_pct
+                    )
+                else:
+                    self.engine.place_order(stock_data.symbol, OrderSide.BUY, 10)
             elif signal.signal_type == SignalType.SELL:
                 # Sell logic: e.g., sell all shares
                 position = self.engine.portfolio.positions.get(stock_data.symbol)
                 if position:
+                    self.engine.cancel_orders(stock_data.symbol) # Drop protective exits for the shares being sold
                     self.engine.place_order(stock_data.symbol, OrderSide.SELL, position.quantity)
             
             # Process orders with current price
-            self.engine.process_orders({stock_data.symbol: current_price_point.close})
+            self.engine.process_orders({stock_data.symbol: current_price_point.close},
+                                       {stock_data.symbol: current_price_point.volume})
             
         self._print_results(stock_data)
 
+    @staticmethod
+    def slice_stock(symbol: str, current_slice: List[Price], indicators: Optional[TechnicalIndicators] = None) -> Stock:
+        """
+        Builds the point-in-time view of a stock that strategies see on a given bar.
+        Shared with the persona replay runner so stored decisions match backtest inputs.
+        `indicators` (precomputed for this bar) skips recalculating them over the slice.
+        """
+        # Built without validation: the bars are already Price objects, and re-validating
+        # (or dumping) the whole slice on every bar made backtests quadratic. It also
+        # sidesteps the Pydantic class mismatch after a module reload.
+        temp_stock = Stock.model_construct(
+            symbol=symbol,
+            history=current_slice,
+            current_price=current_slice[-1].close
+        )
+        
+        # Calculate indicators for this slice
+        temp_stock.indicators = indicators or TechnicalAnalyzer.calculate_indicators(temp_stock)
+        return temp_stock
+
     def _print_results(self, stock: Stock):
         portfolio_value = self.engine.portfolio.total_value
         initial_cash = 100000.0 # Should match init
@@ -82,4 +128,7 @@ class Backtester:
         print(f"Final Value:   ${portfolio_value:,.2f}")
         print(f"Total Return:  {return_pct:.2f}%")
         print(f"Total Trades:  {len(self.engine.trades)}")
+        if self.uses_exits:
+            exits = [o for o in self.engine.book.archive if o.oco_group and o.status == OrderStatus.FILLED]
+            print(f"Protective Exits: {len(exits)} ({sum(o.order_type != OrderType.LIMIT for o in exits)} stops)")
         print("-" * 30)
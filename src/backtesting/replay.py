@@ -0,0 +1,78 @@
+import os
+from datetime import date
+from typing import Callable, Dict, List, Optional
+import logging
+
+from src.models.domain import Stock
+from src.analysis.ai_analyst import AIAnalyst
+from src.analysis.ensemble import parse_verdict
+from src.analysis.technical import TechnicalAnalyzer
+from src.backtesting.engine import Backtester
+from src.infrastructure.decision_store import AIDecisionStore, StoredDecision
+from src.infrastructure.throttling import RateLimiter
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def default_decision_store() -> AIDecisionStore:
+    """The decision store under settings.DATA_DIR."""
+    return AIDecisionStore(os.path.join(settings.DATA_DIR, "ai_decisions.db"))
+
+
+class PersonaReplayRunner:
+    """
+    Walks a stock's history once and records the persona's decision for every bar,
+    so backtests can replay AI personas without live LLM calls.
+    Days that already have a stored decision for the same inputs are never re-asked.
+    """
+
+    def __init__(self, analyst: AIAnalyst, store: AIDecisionStore, calls_per_minute: int = 30):
+        self.analyst = analyst
+        self.store = store
+        # Per-runner budget on top of the analyst's own limiter
+        self._analyze = RateLimiter(max_calls=calls_per_minute, period=60)(analyst.analyze_stock)
+
+    def fill(self, stock_data: Stock, personas: List[str], start: Optional[date] = None, end: Optional[date] = None,
+             progress: Callable[[int, int], None] = None) -> Dict[str, int]:
+        """
+        Ensures a stored decision exists for every (bar, persona) in the date range.
+        Returns counts of cached, newly called and failed decisions.
+        """
+        history = sorted(stock_data.history, key=lambda p: p.timestamp)
+        indices = [
+            i for i in range(Backtester.MIN_PERIODS, len(history))
+            if (start is None or history[i].timestamp.date() >= start)
+            and (end is None or history[i].timestamp.date() <= end)
+        ]
+        counts = {"cached": 0, "called": 0, "failed": 0}
+        existing = {persona: self.store.load(stock_data.symbol, persona, start=start, end=end) for persona in personas}
+        total = len(indices) * len(personas)
+
+        done = 0
+        frame = TechnicalAnalyzer.indicator_frame([p.close for p in history])
+        for i in indices:
+            temp_stock = Backtester.slice_stock(stock_data.symbol, history[:i + 1], TechnicalAnalyzer.indicators_at(frame, i))
+            day = history[i].timestamp.date()
+            for persona in personas:
+                input_hash = AIAnalyst.input_hash(temp_stock, persona)
+                if (day, input_hash) in existing[persona]:
+                    counts["cached"] += 1
+                else:
+                    insight = self._analyze(temp_stock, persona=persona)
+                    if AIAnalyst.is_model_output(insight):
+                        signal, confidence = parse_verdict(insight)
+                        self.store.put(StoredDecision(
+                            symbol=stock_data.symbol, date=day, persona=persona, model=AIAnalyst.model_for(insight),
+                            input_hash=input_hash, signal=signal.value, confidence=confidence, insight=insight
+                        ))
+                        counts["called"] += 1
+                    else:
+                        logger.warning(f"No model output for {stock_data.symbol} {day} ({persona}); not stored")
+                        counts["failed"] += 1
+                done += 1
+                if progress:
+                    progress(done, total)
+
+        logger.info(f"Replay fill for {stock_data.symbol}: {counts}")
+        return counts
@@ -0,0 +1,142 @@
+"""
+Offline end-to-end benchmarks against the local stand-ins.
+
+Usage:
+    python -m src.benchmarking.bench agent --llm-ms 800 --data-ms 300 --error-rate 0.05
+    python -m src.benchmarking.bench bulk --symbols AAPL,MSFT,NVDA --library recordings.json
+    python -m src.benchmarking.bench record --symbols AAPL,MSFT --library recordings.json
+"""
+import argparse
+import sys
+import os
+import time
+import logging
+
+# Ensure src is in path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.analysis.ai_analyst import AIAnalyst
+from src.benchmarking.mock_llm import MockGeminiModel, MockOpenAIClient
+from src.benchmarking.mock_market import MockAlphaVantageProvider, MockStockDataProvider, MockMarketScanner
+from src.benchmarking.profiles import LatencyProfile
+from src.benchmarking.recordings import ResponseLibrary
+from src.execution.paper_engine import PaperTradingEngine
+from src.infrastructure.cache import RedisCache
+from src.infrastructure.journal import DecisionJournal
+from src.infrastructure.metrics import percentiles
+from src.services.market_data import MarketDataService
+from src.services.portfolio_manager import PortfolioManager
+from src.services.scanner import SP500_TOP
+
+logger = logging.getLogger(__name__)
+
+
+class OfflineStack:
+    """The agent stack (data, analyst, engine, scanner, manager) wired to local stand-ins."""
+
+    def __init__(self, library: ResponseLibrary, llm_profile: LatencyProfile, data_profile: LatencyProfile,
+                 seed: int = 42, client_rate_limit: bool = False):
+        self.cache = RedisCache(use_redis=False)
+        self.av_provider = MockAlphaVantageProvider(library, data_profile, seed, client_rate_limit=client_rate_limit)
+        self.yahoo_provider = MockStockDataProvider(library, data_profile, seed)
+        self.market_data = MarketDataService(provider=self.av_provider, cache=self.cache, fallback_provider=self.yahoo_provider)
+        self.analyst = AIAnalyst(
+            cache=self.cache,
+            gemini_model=MockGeminiModel(library, llm_profile, seed),
+            openai_client=MockOpenAIClient(library, llm_profile, seed + 1)
+        )
+        self.engine = PaperTradingEngine()
+        self.scanner = MockMarketScanner(self.av_provider)
+        self.portfolio_manager = PortfolioManager(self.market_data, self.analyst, self.engine, self.scanner,
+                                                  journal=DecisionJournal(":memory:"))
+
+    def reset_cache(self):
+        self.cache.memory_cache.clear()
+
+
+def _timed(fn, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def bench_agent(stack: OfflineStack, args) -> dict:
+    """Times full agent cycles."""
+    durations = []
+    for _ in range(args.repeat):
+        if args.cold:
+            stack.reset_cache()
+        durations.append(_timed(stack.portfolio_manager.run_cycle, persona=args.persona, watchlist=args.symbols, max_stocks=args.max_stocks))
+    return {"cycles": len(durations), **{f"cycle_{k}_s": v for k, v in percentiles(durations).items()}}
+
+
+def bench_bulk(stack: OfflineStack, args) -> dict:
+    """Times fetch + indicators + one persona insight per symbol, as the Bulk Analysis tab does."""
+    per_symbol = []
+    for _ in range(args.repeat):
+        for symbol in args.symbols:
+            def analyze():
+                stock = stack.market_data.get_stock_analysis(symbol, force_refresh=True)
+                stack.analyst.analyze_stock(stock, persona=args.persona)
+            per_symbol.append(_timed(analyze))
+    return {"symbols": len(per_symbol), "total_s": sum(per_symbol), **{f"symbol_{k}_s": v for k, v in percentiles(per_symbol).items()}}
+
+
+def bench_scan(stack: OfflineStack, args) -> dict:
+    """Times scan list generation."""
+    durations = [_timed(stack.scanner.get_scan_list, args.symbols) for _ in range(args.repeat)]
+    return {"scans": len(durations), **{f"scan_{k}_s": v for k, v in percentiles(durations).items()}}
+
+
+SCENARIOS = {"agent": bench_agent, "bulk": bench_bulk, "scan": bench_scan}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks using local LLM and market-data stand-ins.")
+    parser.add_argument("scenario", choices=sorted(list(SCENARIOS) + ["record"]))
+    parser.add_argument("--symbols", default=",".join(SP500_TOP[:5]), help="Comma separated symbols")
+    parser.add_argument("--library", default=None, help="Recorded response library (JSON); synthetic data if omitted")
+    parser.add_argument("--persona", default="General")
+    parser.add_argument("--max-stocks", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--distribution", default="lognormal", choices=["fixed", "normal", "lognormal"])
+    parser.add_argument("--llm-ms", type=float, default=800.0, help="Mean LLM latency")
+    parser.add_argument("--data-ms", type=float, default=300.0, help="Mean market-data latency")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--av-calls-per-min", type=int, default=None, help="Simulated Alpha Vantage server quota")
+    parser.add_argument("--cold", action="store_true", help="Clear caches before each agent cycle")
+    parser.add_argument("--client-rate-limit", action="store_true", help="Keep the production 5 calls/min client limiter")
+    args = parser.parse_args(argv)
+    args.symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+
+    if args.scenario == "record":
+        if not args.library:
+            parser.error("record requires --library")
+        from src.config import settings
+        from src.providers.alpha_vantage import AlphaVantageProvider
+        from src.providers.yahoo import YahooFinanceProvider
+        library = ResponseLibrary(seed=args.seed)
+        av = AlphaVantageProvider(api_key=settings.ALPHA_VANTAGE_API_KEY) if settings.ALPHA_VANTAGE_API_KEY else None
+        library.record_market_data(args.symbols, av_provider=av, yahoo_provider=YahooFinanceProvider())
+        library.save(args.library)
+        return
+
+    library = ResponseLibrary.load(args.library) if args.library else ResponseLibrary(seed=args.seed)
+    llm_profile = LatencyProfile(distribution=args.distribution, mean_ms=args.llm_ms, stddev_ms=args.llm_ms * 0.3, error_rate=args.error_rate)
+    data_profile = LatencyProfile(distribution=args.distribution, mean_ms=args.data_ms, stddev_ms=args.data_ms * 0.3,
+                                  error_rate=args.error_rate, rate_limit_calls=args.av_calls_per_min)
+    stack = OfflineStack(library, llm_profile, data_profile, seed=args.seed, client_rate_limit=args.client_rate_limit)
+
+    result = SCENARIOS[args.scenario](stack, args)
+
+    print(f"=== {args.scenario} benchmark ===")
+    for key, value in result.items():
+        print(f"{key:>20}: {value:.3f}" if isinstance(value, float) else f"{key:>20}: {value}")
+    print("--- LLM calls ---")
+    for row in stack.analyst.metrics.summary():
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
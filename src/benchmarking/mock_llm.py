@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+from typing import Iterator
+from src.benchmarking.profiles import FaultInjector, LatencyProfile, MockProviderError
+from src.benchmarking.recordings import ResponseLibrary
+from src.analysis.prompts import PERSONA_PROMPTS
+
+# Split streamed responses into roughly this many chunks
+STREAM_CHUNKS = 8
+
+
+def _persona_for(prompt: str) -> str:
+    """Recovers the persona from a formatted prompt by matching its opening line."""
+    for persona, template in PERSONA_PROMPTS.items():
+        if persona != "General" and template.strip().split(".")[0][:30] in prompt:
+            return persona
+    return "General"
+
+
+def _chunks(text: str) -> Iterator[str]:
+    size = max(1, len(text) // STREAM_CHUNKS)
+    for i in range(0, len(text), size):
+        yield text[i:i + size]
+
+
+class _LLMStandIn:
+    def __init__(self, library: ResponseLibrary = None, profile: LatencyProfile = None, seed: int = 42):
+        self.library = library or ResponseLibrary(seed=seed)
+        self.faults = FaultInjector(profile or LatencyProfile(mean_ms=800, stddev_ms=300), seed=seed)
+
+    def _respond(self, prompt: str) -> str:
+        if self.faults.is_rate_limited():
+            self.faults.wait()
+            raise MockProviderError("429 Resource has been exhausted (e.g. check quota).")
+        self.faults.wait()
+        if self.faults.should_fail():
+            raise MockProviderError("503 The service is currently unavailable.")
+        return self.library.get_insight(_persona_for(prompt), prompt)
+
+
+class MockGeminiModel(_LLMStandIn):
+    """Stand-in for genai.GenerativeModel that replays recorded insights."""
+
+    def generate_content(self, prompt: str, stream: bool = False):
+        text = self._respond(prompt)
+        usage = SimpleNamespace(prompt_token_count=len(prompt) // 4, candidates_token_count=len(text) // 4)
+        if not stream:
+            return SimpleNamespace(text=text, usage_metadata=usage)
+
+        def generate():
+            chunks = list(_chunks(text))
+            for i, chunk in enumerate(chunks):
+                yield SimpleNamespace(text=chunk, usage_metadata=usage if i == len(chunks) - 1 else None)
+        return generate()
+
+
+class MockOpenAIClient(_LLMStandIn):
+    """Stand-in for openai.OpenAI exposing chat.completions.create and models.list."""
+
+    def __init__(self, library: ResponseLibrary = None, profile: LatencyProfile = None, seed: int = 42):
+        super().__init__(library, profile, seed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.models = SimpleNamespace(list=lambda: SimpleNamespace(data=[SimpleNamespace(id="gpt-4o")]))
+
+    def _create(self, model: str, messages: list, max_tokens: int = None, stream: bool = False, stream_options: dict = None):
+        prompt = messages[-1]["content"]
+        text = self._respond(prompt)
+        usage = SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(text) // 4)
+        if not stream:
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+                usage=usage
+            )
+
+        def generate():
+            for chunk in _chunks(text):
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=chunk))], usage=None)
+            if stream_options and stream_options.get("include_usage"):
+                yield SimpleNamespace(choices=[], usage=usage)
+        return generate()
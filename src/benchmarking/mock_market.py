@@ -0,0 +1,119 @@
+from datetime import datetime
+from typing import List, Optional
+from src.models.domain import Stock, Price
+from src.providers.base import StockDataProvider
+from src.providers.alpha_vantage import AlphaVantageProvider
+from src.services.scanner import MarketScanner
+from src.infrastructure.throttling import RateLimiter
+from src.benchmarking.profiles import FaultInjector, LatencyProfile, MockProviderError
+from src.benchmarking.recordings import ResponseLibrary
+
+# Payload Alpha Vantage returns instead of data once the free-tier quota is used up
+AV_RATE_LIMIT_NOTE = {
+    "Note": "Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute and 500 calls per day."
+}
+
+
+def _to_stock(symbol: str, bars: List[dict], start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> Stock:
+    prices = [Price(**bar) for bar in bars]
+    if start_date:
+        prices = [p for p in prices if p.timestamp >= start_date]
+    if end_date:
+        prices = [p for p in prices if p.timestamp <= end_date]
+    return Stock(symbol=symbol, history=prices, current_price=prices[-1].close if prices else None)
+
+
+class MockStockDataProvider(StockDataProvider):
+    """Offline stand-in for YahooFinanceProvider that replays recorded bars."""
+
+    def __init__(self, library: ResponseLibrary = None, profile: LatencyProfile = None, seed: int = 42):
+        self.library = library or ResponseLibrary(seed=seed)
+        self.faults = FaultInjector(profile or LatencyProfile(mean_ms=300, stddev_ms=100), seed=seed)
+
+    def get_stock_data(self, symbol: str, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> Stock:
+        self.faults.wait()
+        if self.faults.should_fail():
+            raise MockProviderError(f"Simulated provider failure for {symbol}")
+        return _to_stock(symbol, self.library.get_bars(symbol), start_date, end_date)
+
+    def get_current_price(self, symbol: str) -> float:
+        self.faults.wait()
+        return self.library.get_bars(symbol)[-1]["close"]
+
+
+class MockAlphaVantageProvider(AlphaVantageProvider):
+    """
+    Offline stand-in for AlphaVantageProvider.
+
+    Replays recorded JSON payloads through the real parsing code by overriding `query`.
+    Server-side throttling is simulated with the profile's rate limit: once exceeded,
+    endpoints return the "Note" payload just like the free tier does.
+    Set `client_rate_limit=False` to bypass the production 5 calls/min client limiter.
+    """
+
+    def __init__(self, library: ResponseLibrary = None, profile: LatencyProfile = None, seed: int = 42,
+                 client_rate_limit: bool = True):
+        self.api_key = "mock"
+        self.ts = None
+        self.library = library or ResponseLibrary(seed=seed)
+        self.faults = FaultInjector(profile or LatencyProfile(mean_ms=400, stddev_ms=150), seed=seed)
+        self.client_rate_limit = client_rate_limit
+
+    def query(self, **params) -> dict:
+        self.faults.wait()
+        if self.faults.is_rate_limited():
+            return dict(AV_RATE_LIMIT_NOTE)
+        if self.faults.should_fail():
+            raise MockProviderError(f"Simulated Alpha Vantage failure for {params.get('function')}")
+
+        function = params.get("function")
+        if function == "OVERVIEW":
+            return self.library.get_overview(params["symbol"])
+        if function == "NEWS_SENTIMENT":
+            return self.library.get_news(params.get("tickers"))
+        if function == "TOP_GAINERS_LOSERS":
+            return self.library.get_top_movers()
+        return {"Error Message": f"Unsupported function in mock: {function}"}
+
+    def get_stock_data(self, symbol: str, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> Stock:
+        if self.client_rate_limit:
+            return self._get_stock_data_limited(symbol, start_date, end_date)
+        return self._get_stock_data(symbol, start_date, end_date)
+
+    def _get_stock_data(self, symbol: str, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> Stock:
+        self.faults.wait()
+        if self.faults.is_rate_limited():
+            # The alpha_vantage client raises ValueError carrying the Note text
+            raise ValueError(AV_RATE_LIMIT_NOTE["Note"])
+        if self.faults.should_fail():
+            raise MockProviderError(f"Simulated Alpha Vantage failure for {symbol}")
+        return _to_stock(symbol, self.library.get_bars(symbol), start_date, end_date)
+
+    # Same client-side limit as the production get_stock_data
+    _get_stock_data_limited = RateLimiter(max_calls=5, period=60)(_get_stock_data)
+
+    def get_news_sentiment(self, symbol: Optional[str] = None, limit: int = 5) -> list:
+        if self.client_rate_limit:
+            return super().get_news_sentiment(symbol, limit)
+        return AlphaVantageProvider.get_news_sentiment.__wrapped__(self, symbol, limit)
+
+    def get_fundamentals(self, symbol: str) -> dict:
+        if self.client_rate_limit:
+            return super().get_fundamentals(symbol)
+        return AlphaVantageProvider.get_fundamentals.__wrapped__(self, symbol)
+
+    def get_current_price(self, symbol: str) -> float:
+        self.faults.wait()
+        return self.library.get_bars(symbol)[-1]["close"]
+
+
+class MockMarketScanner(MarketScanner):
+    """MarketScanner wired to a MockAlphaVantageProvider."""
+
+    def __init__(self, provider: MockAlphaVantageProvider = None):
+        super().__init__(provider=provider or MockAlphaVantageProvider())
+
+    def get_top_gainers_losers(self) -> List[str]:
+        if self.provider.client_rate_limit:
+            return super().get_top_gainers_losers()
+        return MarketScanner.get_top_gainers_losers.__wrapped__(self)
@@ -0,0 +1,77 @@
+import math
+import random
+import threading
+import time
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class MockProviderError(Exception):
+    """Raised by local stand-ins to simulate a provider-side failure."""
+
+
+class LatencyProfile(BaseModel):
+    """Latency and fault behaviour of a simulated upstream."""
+    distribution: str = Field(default="lognormal", description="fixed | normal | lognormal")
+    mean_ms: float = 200.0
+    stddev_ms: float = 50.0
+    error_rate: float = Field(default=0.0, description="Probability (0-1) that a call fails")
+    rate_limit_calls: Optional[int] = Field(default=None, description="Calls allowed per rate_limit_period before throttling")
+    rate_limit_period: float = 60.0
+
+
+class FaultInjector:
+    """
+    Draws latencies, errors and rate-limit decisions from a LatencyProfile.
+    Seeded so that benchmark runs are reproducible.
+    """
+
+    def __init__(self, profile: LatencyProfile = None, seed: int = 42, sleep: bool = True):
+        self.profile = profile or LatencyProfile()
+        self.rng = random.Random(seed)
+        self.sleep = sleep
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def sample_latency(self) -> float:
+        """Returns a latency in seconds."""
+        p = self.profile
+        with self.lock:
+            if p.mean_ms <= 0:
+                ms = 0.0
+            elif p.distribution == "fixed":
+                ms = p.mean_ms
+            elif p.distribution == "normal":
+                ms = self.rng.gauss(p.mean_ms, p.stddev_ms)
+            elif p.distribution == "lognormal":
+                # Parameterise so the sample mean/stddev match mean_ms/stddev_ms
+                variance = p.stddev_ms ** 2
+                mu = math.log(p.mean_ms ** 2 / math.sqrt(variance + p.mean_ms ** 2))
+                sigma = math.sqrt(math.log(1 + variance / p.mean_ms ** 2))
+                ms = self.rng.lognormvariate(mu, sigma)
+            else:
+                raise ValueError(f"Unknown latency distribution: {p.distribution}")
+        return max(ms, 0.0) / 1000
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            return self.rng.random() < self.profile.error_rate
+
+    def is_rate_limited(self) -> bool:
+        """Counts this call and reports whether it exceeds the simulated server-side limit."""
+        p = self.profile
+        if not p.rate_limit_calls:
+            return False
+        with self.lock:
+            now = time.time()
+            self.calls = [t for t in self.calls if now - t < p.rate_limit_period]
+            if len(self.calls) >= p.rate_limit_calls:
+                return True
+            self.calls.append(now)
+            return False
+
+    def wait(self):
+        """Sleeps for one sampled latency."""
+        latency = self.sample_latency()
+        if self.sleep and latency:
+            time.sleep(latency)
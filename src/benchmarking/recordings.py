@@ -0,0 +1,144 @@
+import hashlib
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+SYNTHETIC_INSIGHTS = [
+    "VERDICT: BUY, CONFIDENCE: 70\nBullish. Momentum is improving with RSI in a healthy range and price above the 200-day average.",
+    "VERDICT: SELL, CONFIDENCE: 65\nBearish. Valuation looks stretched relative to earnings and momentum is fading.",
+    "VERDICT: HOLD, CONFIDENCE: 50\nNeutral. Mixed technical signals and no decisive change in sentiment; wait for confirmation.",
+]
+
+
+class ResponseLibrary:
+    """
+    Recorded (or synthetic) upstream responses replayed by the local stand-ins.
+
+    Layout mirrors the raw provider payloads so replay exercises the real parsing code:
+      bars:         {symbol: [{"timestamp", "open", "high", "low", "close", "volume"}, ...]}
+      overview:     {symbol: Alpha Vantage OVERVIEW payload}
+      news:         {symbol: Alpha Vantage NEWS_SENTIMENT payload}
+      top_movers:   Alpha Vantage TOP_GAINERS_LOSERS payload
+      insights:     {persona: [text, ...]}
+    """
+
+    def __init__(self, data: Dict = None, seed: int = 42):
+        data = data or {}
+        self.bars: Dict[str, List[Dict]] = data.get("bars", {})
+        self.overview: Dict[str, Dict] = data.get("overview", {})
+        self.news: Dict[str, Dict] = data.get("news", {})
+        self.top_movers: Dict = data.get("top_movers", {})
+        self.insights: Dict[str, List[str]] = data.get("insights", {})
+        self.seed = seed
+
+    @classmethod
+    def load(cls, path: str) -> "ResponseLibrary":
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump({
+                "bars": self.bars,
+                "overview": self.overview,
+                "news": self.news,
+                "top_movers": self.top_movers,
+                "insights": self.insights,
+            }, f)
+        logger.info(f"Saved response library ({len(self.bars)} symbols) to {path}")
+
+    def _rng(self, key: str) -> random.Random:
+        digest = hashlib.sha256(f"{self.seed}:{key}".encode()).hexdigest()
+        return random.Random(int(digest[:16], 16))
+
+    def get_bars(self, symbol: str, days: int = 260) -> List[Dict]:
+        """Recorded daily bars for `symbol`, or a deterministic random walk if none were recorded."""
+        if symbol not in self.bars:
+            rng = self._rng(f"bars:{symbol}")
+            price = rng.uniform(20, 500)
+            start = datetime(2025, 1, 2)
+            bars = []
+            for i in range(days):
+                open_ = price
+                price = max(1.0, price * (1 + rng.gauss(0.0005, 0.02)))
+                bars.append({
+                    "timestamp": (start + timedelta(days=i)).isoformat(),
+                    "open": open_,
+                    "high": max(open_, price) * (1 + abs(rng.gauss(0, 0.005))),
+                    "low": min(open_, price) * (1 - abs(rng.gauss(0, 0.005))),
+                    "close": price,
+                    "volume": int(rng.uniform(1e6, 5e7)),
+                })
+            self.bars[symbol] = bars
+        return self.bars[symbol]
+
+    def get_overview(self, symbol: str) -> Dict:
+        if symbol not in self.overview:
+            rng = self._rng(f"overview:{symbol}")
+            self.overview[symbol] = {
+                "Symbol": symbol,
+                "PERatio": f"{rng.uniform(8, 60):.2f}",
+                "EPS": f"{rng.uniform(0.5, 12):.2f}",
+                "MarketCapitalization": str(int(rng.uniform(5e9, 3e12))),
+                "BookValue": f"{rng.uniform(5, 80):.2f}",
+                "DividendYield": f"{rng.uniform(0, 0.04):.4f}",
+                "ProfitMargin": f"{rng.uniform(0.02, 0.35):.3f}",
+                "Sector": rng.choice(["TECHNOLOGY", "HEALTHCARE", "FINANCE", "ENERGY"]),
+                "Industry": "SYNTHETIC",
+            }
+        return self.overview[symbol]
+
+    def get_news(self, symbol: Optional[str]) -> Dict:
+        key = symbol or "_market"
+        if key not in self.news:
+            rng = self._rng(f"news:{key}")
+            self.news[key] = {"feed": [
+                {
+                    "title": f"{key} headline {i}",
+                    "url": f"https://example.invalid/{key}/{i}",
+                    "time_published": "20250101T000000",
+                    "summary": f"Synthetic news item {i} for {key}.",
+                    "source": "Mock Wire",
+                    "overall_sentiment_score": round(rng.uniform(-0.5, 0.5), 3),
+                }
+                for i in range(5)
+            ]}
+        return self.news[key]
+
+    def get_top_movers(self) -> Dict:
+        if not self.top_movers:
+            rng = self._rng("top_movers")
+            pool = ["PLTR", "SOFI", "RIVN", "MARA", "NIO", "F", "SNAP", "UBER", "SHOP"]
+            rng.shuffle(pool)
+            self.top_movers = {
+                "top_gainers": [{"ticker": t} for t in pool[:3]],
+                "top_losers": [{"ticker": t} for t in pool[3:6]],
+                "most_actively_traded": [{"ticker": t} for t in pool[6:9]],
+            }
+        return self.top_movers
+
+    def get_insight(self, persona: str, prompt: str) -> str:
+        """Picks a recorded insight for the persona, deterministically per prompt."""
+        choices = self.insights.get(persona) or SYNTHETIC_INSIGHTS
+        return self._rng(f"insight:{persona}:{prompt}").choice(choices)
+
+    def record_market_data(self, symbols: List[str], av_provider=None, yahoo_provider=None):
+        """Captures live provider responses for `symbols` so later runs can replay them offline."""
+        for symbol in symbols:
+            try:
+                provider = av_provider or yahoo_provider
+                stock = provider.get_stock_data(symbol)
+                self.bars[symbol] = [
+                    p.model_dump(mode="json", exclude={"adjusted_close"}) for p in stock.history
+                ]
+                if av_provider:
+                    self.overview[symbol] = av_provider.query(function="OVERVIEW", symbol=symbol)
+                    self.news[symbol] = av_provider.query(function="NEWS_SENTIMENT", tickers=symbol, limit=5)
+            except Exception as e:
+                logger.warning(f"Could not record {symbol}: {e}")
+        if av_provider:
+            self.top_movers = av_provider.query(function="TOP_GAINERS_LOSERS")
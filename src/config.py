@@ -4,7 +4,8 @@ from pydantic_settings import BaseSettings
 from pydantic import ConfigDict
 from pathlib import Path
 
-from src.models.risk import RiskSettings
+from src.models.risk import RiskSettings, AllocationSettings
+from src.models.trading import FillModelSettings
 
 # Get project root directory
 PROJECT_ROOT = Path(__file__).parent.parent
@@ -50,6 +51,10 @@ class Settings(BaseSettings):
     
     # Risk Management
     RISK_SETTINGS: RiskSettings = RiskSettings()
+    ALLOCATION_SETTINGS: AllocationSettings = AllocationSettings()
+
+    # Paper/backtest fills
+    FILL_MODEL_SETTINGS: FillModelSettings = FillModelSettings()
     
     # API Keys
     ALPHA_VANTAGE_API_KEY: Optional[str] = None
@@ -58,11 +63,23 @@ class Settings(BaseSettings):
     ALPACA_SECRET_KEY: Optional[str] = None
     OPENAI_API_KEY: Optional[str] = None
     ALPACA_PAPER: bool = True
+    BROKER_MAX_CALLS_PER_MINUTE: int = 200 # Client-side cap for order submits (Alpaca's REST limit)
+    ORDER_UPDATES_STREAM: bool = True # Track order fills/cancels from Alpaca's trade-updates websocket
+    BROKER_RECONCILE_SECONDS: int = 30 # How often the local position/account mirror re-syncs with Alpaca
     
     # Redis
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
+    
+    # Agent
+    AGENT_CYCLE_BUDGET_SECONDS: int = 240 # Time budget for scheduled cycles (the 09:25 run must finish before the open)
+    AGENT_INTERVAL_MINUTES: int = 0 # Extra intraday cycles every N minutes while the market is open (0 = off)
+    WARMUP_LEAD_MINUTES: int = 20 # Cache warm-up starts this long before each daily cycle (0 = off)
+    AGENT_WORKER_SOCKET: Optional[str] = None # If set, the UI drives a headless worker (src/worker.py) on this socket
+
+    # Local Storage (SQLite stores, journals)
+    DATA_DIR: str = str(PROJECT_ROOT / "data")
 
 settings = Settings()
 
@@ -1,17 +1,25 @@
 from alpaca.trading.client import TradingClient
-from alpaca.trading.requests import MarketOrderRequest
-from alpaca.trading.enums import OrderSide as AlpacaOrderSide, TimeInForce
-from typing import Optional, Dict
-from src.models.trading import Portfolio, Position, Order, OrderSide, OrderType, OrderStatus
+from alpaca.trading.requests import MarketOrderRequest, LimitOrderRequest, GetOrdersRequest, GetPortfolioHistoryRequest
+from alpaca.common.exceptions import APIError
+from alpaca.trading.enums import OrderSide as AlpacaOrderSide, TimeInForce, QueryOrderStatus
+from typing import Optional, Dict, List
+from src.models.trading import Portfolio, Order, OrderSide, OrderType, OrderStatus, OrderEventType
+from src.execution.mirror import AccountMirror
+from src.execution.risk_engine import RiskEngine, RiskRejected
+from src.execution.order_router import BatchOrderRouter, OrderRequest, OrderResult, http_status
+from src.execution.order_tracker import OrderTracker, OrderEventStream, AlpacaTradeUpdateStream, event_from_alpaca
 from src.config import settings
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
 class AlpacaExecutionEngine:
     """Execution engine using Alpaca API."""
+
+    CANCEL_SETTLE_SECONDS = 10.0 # How long liquidate_all waits for cancels before selling anyway
     
-    def __init__(self):
+    def __init__(self, stream: Optional[OrderEventStream] = None):
         api_key = settings.ALPACA_API_KEY
         secret_key = settings.ALPACA_SECRET_KEY
         paper = settings.ALPACA_PAPER
@@ -44,74 +52,170 @@ class AlpacaExecutionEngine:
             secret_key=secret_key,
             paper=paper
         )
+        # Positions/account are served from a local mirror, reconciled every BROKER_RECONCILE_SECONDS
+        self.mirror = AccountMirror(self.client)
+        self.risk = RiskEngine()
+        self.mirror.risk = self.risk
+        self._seed_risk_peak()
+        # Concurrent, rate-limited, retrying submits (Alpaca allows 200 requests/min)
+        self.router = BatchOrderRouter(self._submit, max_calls_per_minute=settings.BROKER_MAX_CALLS_PER_MINUTE)
+        # Fills, partial fills and cancels are pushed by the trade-updates stream instead of polled
+        if stream is None and settings.ORDER_UPDATES_STREAM:
+            stream = AlpacaTradeUpdateStream(api_key, secret_key, paper=paper)
+        self.tracker = OrderTracker(self.mirror, stream)
+
+    def _seed_risk_peak(self):
+        """Starts the drawdown peak from the account's equity history, not from whenever this process started."""
+        try:
+            history = self.client.get_portfolio_history(GetPortfolioHistoryRequest(period="1A", timeframe="1D"))
+            equity = [e for e in (history.equity or []) if e]
+            if equity:
+                self.risk.seed_peak(max(equity))
+        except Exception as e:
+            logger.warning(f"Could not load portfolio history for the drawdown peak: {e}")
 
     def get_account(self):
-        """Fetches account information."""
-        return self.client.get_account()
+        """Fetches account information (from the local mirror)."""
+        return self.mirror.get_account()
 
     def get_positions(self):
-        """Fetches all open positions."""
-        return self.client.get_all_positions()
+        """Fetches all open positions (from the local mirror)."""
+        return self.mirror.get_positions()
+
+    def refresh(self):
+        """Reconciles the local mirror with Alpaca now."""
+        self.mirror.reconcile()
 
     @property
     def portfolio(self) -> Portfolio:
-        """Fetches current portfolio state from Alpaca."""
-        account = self.client.get_account()
-        positions = self.client.get_all_positions()
-        
-        portfolio_positions = {}
-        for p in positions:
-            portfolio_positions[p.symbol] = Position(
-                symbol=p.symbol,
-                quantity=int(float(p.qty)),
-                average_price=float(p.avg_entry_price),
-                current_price=float(p.current_price)
-            )
-            
-        return Portfolio(
-            cash=float(account.cash),
-            positions=portfolio_positions
-        )
+        """Current portfolio state, from the local mirror."""
+        return self.mirror.portfolio()
+
+    def place_order(self, symbol: str, side: OrderSide, quantity: int, order_type: OrderType = OrderType.MARKET, price: Optional[float] = None,
+                    client_order_id: Optional[str] = None) -> Order:
+        """Places an order on Alpaca (with retries; `client_order_id` makes a resubmit idempotent)."""
+        request = OrderRequest(symbol=symbol, side=side, quantity=quantity, order_type=order_type, price=price)
+        if client_order_id:
+            request.client_order_id = client_order_id
+        self._check_trading_enabled()
+        # Risk Checks: all RiskSettings limits, from in-memory state (no broker round trip)
+        self.mirror.ensure_fresh()
+        self.risk.check(symbol, side, quantity, price)
+
+        result = self.router.route([request])[0]
+        if not result.ok:
+            self._release(request)
+            raise RuntimeError(f"Failed to place Alpaca order: {result.error}")
+        return result.order
+
+    def place_orders(self, requests: List[OrderRequest], risk_checks: bool = True) -> List[OrderResult]:
+        """
+        Submits a batch concurrently (see BatchOrderRouter). Risk rejections and
+        failed submits are reported per order instead of raising. Each accepted buy
+        is reserved as it is checked, so later requests in the batch see it.
+        """
+        self._check_trading_enabled()
+        self.mirror.ensure_fresh()
+        results: List[Optional[OrderResult]] = [None] * len(requests)
+        accepted = []
+        for i, request in enumerate(requests):
+            try:
+                if risk_checks:
+                    self.risk.check(request.symbol, request.side, request.quantity, request.price)
+                accepted.append(i)
+            except RiskRejected as e:
+                results[i] = OrderResult(request=request, error=str(e), risk_rejected=True)
+        for i, result in zip(accepted, self.router.route([requests[i] for i in accepted])):
+            results[i] = result
+            if risk_checks and not result.ok:
+                self._release(result.request)
+        return results
+
+    def liquidate_all(self) -> List[OrderResult]:
+        """
+        Cancels open orders, waits for the cancels to settle (until then their
+        shares stay held and a full-size sell is refused), then closes every
+        position in one concurrent batch. Refused while the kill switch is on.
+        """
+        self._check_trading_enabled()
+        self.client.cancel_orders()
+        self._await_no_open_orders(self.CANCEL_SETTLE_SECONDS)
+        self.mirror.invalidate()
+        requests = [
+            OrderRequest(symbol=p.symbol, side=OrderSide.SELL if p.qty > 0 else OrderSide.BUY, quantity=abs(p.qty))
+            for p in self.mirror.get_positions() if p.qty
+        ]
+        return self.place_orders(requests, risk_checks=False) # Exits must not be blocked
+
+    def _await_no_open_orders(self, timeout: float, poll_seconds: float = 0.25):
+        """Polls until the broker lists no open (incl. pending_cancel) orders, or `timeout` passes."""
+        deadline = time.monotonic() + timeout
+        while True:
+            open_orders = self.client.get_orders(filter=GetOrdersRequest(status=QueryOrderStatus.OPEN))
+            if not open_orders:
+                return
+            if time.monotonic() >= deadline:
+                logger.warning(f"{len(open_orders)} orders still open after cancel; liquidating anyway")
+                return
+            time.sleep(poll_seconds)
 
-    def place_order(self, symbol: str, side: OrderSide, quantity: int, order_type: OrderType = OrderType.MARKET, price: Optional[float] = None) -> Order:
-        """Places an order on Alpaca."""
-        # Safety Checks
+    def _release(self, request: OrderRequest):
+        """Drops the risk reservation of a checked order that never reached the broker."""
+        if request.side == OrderSide.BUY:
+            self.risk.release(request.symbol, request.quantity)
+
+    def _check_trading_enabled(self):
         if not settings.TRADING_ENABLED:
             logger.warning("Order rejected: Trading is disabled (Kill Switch).")
             raise RuntimeError("Trading is disabled.")
-            
-        # Risk Checks
-        # 1. Max Positions
-        current_positions = len(self.client.get_all_positions())
-        if side == OrderSide.BUY and current_positions >= settings.RISK_SETTINGS.max_open_positions:
-             # Check if we already hold this symbol (adding to position) vs new position
-             # For simplicity, strict count check
-             logger.warning(f"Order rejected: Max open positions reached ({settings.RISK_SETTINGS.max_open_positions}).")
-             raise RuntimeError("Max open positions reached.")
-
-        # 2. Max Position Size (Approximate check using current price if available, else skip or fetch)
-        # We'll skip strict pre-trade value check here to avoid extra API call latency, 
-        # but ideally we'd check (quantity * price) <= max_position_size
-        
-        req = MarketOrderRequest(
-            symbol=symbol,
-            qty=quantity,
-            side=AlpacaOrderSide.BUY if side == OrderSide.BUY else AlpacaOrderSide.SELL,
-            time_in_force=TimeInForce.DAY
-        )
-        
+
+    def _submit(self, request: OrderRequest) -> Order:
+        """One submit_order call; used by the router (which retries it)."""
+        side = AlpacaOrderSide.BUY if request.side == OrderSide.BUY else AlpacaOrderSide.SELL
+        if request.order_type == OrderType.LIMIT:
+            req = LimitOrderRequest(symbol=request.symbol, qty=request.quantity, side=side, time_in_force=TimeInForce.DAY,
+                                    limit_price=request.price, client_order_id=request.client_order_id)
+        elif request.order_type == OrderType.MARKET:
+            req = MarketOrderRequest(symbol=request.symbol, qty=request.quantity, side=side, time_in_force=TimeInForce.DAY,
+                                     client_order_id=request.client_order_id)
+        else:
+            raise ValueError(f"Unsupported order type for Alpaca: {request.order_type.value}")
+
+        submitted_at = time.monotonic()
         try:
             alpaca_order = self.client.submit_order(order_data=req)
-            logger.info(f"Placed Alpaca order: {alpaca_order.id}")
-            
-            return Order(
-                id=str(alpaca_order.id),
-                symbol=symbol,
-                side=side,
-                order_type=order_type,
-                quantity=quantity,
-                status=OrderStatus.PENDING # Alpaca returns pending initially
-            )
-        except Exception as e:
-            logger.error(f"Failed to place Alpaca order: {e}")
-            raise e
+        except APIError as e:
+            # A retry after a lost response: the first attempt went through
+            if http_status(e) == 422 and "client_order_id" in str(e):
+                alpaca_order = self.client.get_order_by_client_id(request.client_order_id)
+            else:
+                raise
+        logger.info(f"Placed Alpaca order: {alpaca_order.id}")
+
+        order = Order(
+            id=str(alpaca_order.id),
+            client_order_id=request.client_order_id,
+            symbol=request.symbol,
+            side=request.side,
+            order_type=request.order_type,
+            quantity=int(request.quantity),
+            price=request.price,
+            status=OrderStatus.PENDING # Alpaca returns pending initially; the tracker keeps it current
+        )
+        self.mirror.record_ack(order.id, request.symbol, request.side, request.quantity)
+        self.tracker.track(order, submitted_at)
+        filled_qty = float(alpaca_order.filled_qty or 0)
+        if filled_qty:
+            # Filled before the response came back: same path as a streamed fill (applied once)
+            event = OrderEventType.FILL if filled_qty >= request.quantity else OrderEventType.PARTIAL_FILL
+            self.tracker.on_event(event_from_alpaca(alpaca_order, event))
+        return order
+
+    def get_order(self, order_id: str) -> Optional[Order]:
+        """Live state of an order we placed (from the trade-updates stream)."""
+        return self.tracker.get(order_id)
+
+    def close(self):
+        """Stops the trade-updates stream and the order router."""
+        self.tracker.stop()
+        self.router.shutdown()
@@ -0,0 +1,145 @@
+import itertools
+from datetime import datetime
+from typing import Dict, List, Optional
+from src.models.trading import Portfolio, PortfolioValuation, Order, Trade, Position, OrderSide, OrderType, OrderStatus
+from src.execution.order_book import OrderBook
+from src.execution.paper_engine import PaperTradingEngine
+from src.execution.fill_model import FillModel, fill_model_from_settings
+
+
+class SimOrder:
+    """Slotted stand-in for Order in simulations (integer id, no validation)."""
+
+    __slots__ = ("id", "symbol", "side", "order_type", "quantity", "price", "status", "created_at",
+                 "filled_at", "filled_price", "filled_quantity", "stop_price", "trail_amount", "trail_percent", "oco_group", "parent_id")
+
+    def __init__(self, id: int, symbol: str, side: OrderSide, order_type: OrderType, quantity: int,
+                 price: Optional[float] = None, created_at: Optional[datetime] = None, stop_price: Optional[float] = None,
+                 trail_amount: Optional[float] = None, trail_percent: Optional[float] = None,
+                 oco_group=None, parent_id=None):
+        self.id = id
+        self.symbol = symbol
+        self.side = side
+        self.order_type = order_type
+        self.quantity = quantity
+        self.price = price
+        self.status = OrderStatus.PENDING
+        self.created_at = created_at
+        self.filled_at = None
+        self.filled_price = None
+        self.filled_quantity = 0
+        self.stop_price = stop_price
+        self.trail_amount = trail_amount
+        self.trail_percent = trail_percent
+        self.oco_group = oco_group
+        self.parent_id = parent_id
+
+    def to_order(self) -> Order:
+        return Order(
+            id=str(self.id), symbol=self.symbol, side=self.side, order_type=self.order_type,
+            quantity=self.quantity, price=self.price, status=self.status,
+            created_at=self.created_at or datetime.min, filled_at=self.filled_at, filled_price=self.filled_price,
+            filled_quantity=self.filled_quantity,
+            stop_price=self.stop_price, trail_amount=self.trail_amount, trail_percent=self.trail_percent,
+            oco_group=str(self.oco_group) if self.oco_group is not None else None,
+            parent_id=str(self.parent_id) if self.parent_id is not None else None
+        )
+
+
+class SimFill:
+    __slots__ = ("id", "order_id", "symbol", "side", "quantity", "price", "timestamp")
+
+    def __init__(self, id: int, order_id: int, symbol: str, side: OrderSide, quantity: int, price: float,
+                 timestamp: Optional[datetime]):
+        self.id = id
+        self.order_id = order_id
+        self.symbol = symbol
+        self.side = side
+        self.quantity = quantity
+        self.price = price
+        self.timestamp = timestamp
+
+    def to_trade(self) -> Trade:
+        return Trade(id=str(self.id), order_id=str(self.order_id), symbol=self.symbol, side=self.side,
+                     quantity=self.quantity, price=self.price, timestamp=self.timestamp or datetime.min)
+
+
+class SimPosition:
+    __slots__ = ("symbol", "quantity", "average_price", "current_price")
+
+    def __init__(self, symbol: str, quantity: int, average_price: float, current_price: float):
+        self.symbol = symbol
+        self.quantity = quantity
+        self.average_price = average_price
+        self.current_price = current_price
+
+    @property
+    def market_value(self) -> float:
+        return self.quantity * self.current_price
+
+    @property
+    def unrealized_pnl(self) -> float:
+        return (self.current_price - self.average_price) * self.quantity
+
+    def to_position(self) -> Position:
+        return Position(symbol=self.symbol, quantity=self.quantity, average_price=self.average_price,
+                        current_price=self.current_price)
+
+
+class SimPortfolio(PortfolioValuation):
+    __slots__ = ("cash", "positions", "realized_pnl", "_market_value", "_cost_basis")
+
+    def __init__(self, cash: float):
+        self.cash = cash
+        self.positions: Dict[str, SimPosition] = {}
+        self.realized_pnl = 0.0
+        self._market_value = 0.0
+        self._cost_basis = 0.0
+
+    def _new_position(self, symbol: str, quantity: int, price: float) -> SimPosition:
+        return SimPosition(symbol, quantity, price, price)
+
+    def to_portfolio(self) -> Portfolio:
+        return Portfolio(cash=self.cash, positions={s: p.to_position() for s, p in self.positions.items()},
+                         realized_pnl=self.realized_pnl)
+
+
+class FastSimEngine(PaperTradingEngine):
+    """
+    PaperTradingEngine for backtests and parameter sweeps: same order types and
+    matching (OrderBook), but orders, fills and positions are slotted records with
+    integer ids, and fills are stamped with the simulation clock (`clock`, set to
+    the bar time) instead of wall-clock time. Pydantic models are only built for
+    reporting (`trades`, `to_portfolio`, SimOrder.to_order).
+    """
+
+    def __init__(self, initial_cash: float = 100000.0, fill_model: Optional[FillModel] = None):
+        self.portfolio = SimPortfolio(initial_cash)
+        self.book = OrderBook()
+        self.fill_model = fill_model or fill_model_from_settings()
+        self.fills: List[SimFill] = []
+        self.clock: Optional[datetime] = None
+        self.risk = None # Backtests don't apply live risk limits
+        self.ledger = None
+        self._ids = itertools.count(1)
+
+    @property
+    def trades(self) -> List[Trade]:
+        return [f.to_trade() for f in self.fills]
+
+    def to_portfolio(self) -> Portfolio:
+        return self.portfolio.to_portfolio()
+
+    def place_order(self, symbol: str, side: OrderSide, quantity: int, order_type: OrderType = OrderType.MARKET, price: Optional[float] = None,
+                    stop_price: Optional[float] = None, trail_amount: Optional[float] = None, trail_percent: Optional[float] = None,
+                    oco_group=None, parent_id=None) -> SimOrder:
+        order = SimOrder(next(self._ids), symbol, side, order_type, quantity, price, self.clock, stop_price,
+                         trail_amount, trail_percent, oco_group, parent_id)
+        self.book.add(order, delay=self.fill_model.latency_ticks)
+        return order
+
+    def _now(self) -> Optional[datetime]:
+        return self.clock
+
+    def _record_trade(self, order: SimOrder, price: float, quantity: int):
+        self.fills.append(SimFill(next(self._ids), order.id, order.symbol, order.side, quantity, price, self.clock))
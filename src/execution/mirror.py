@@ -0,0 +1,183 @@
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+import logging
+
+from alpaca.trading.requests import GetOrdersRequest
+from alpaca.trading.enums import QueryOrderStatus
+from src.models.trading import Portfolio, Position, OrderSide
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AccountMirror:
+    """
+    In-memory copy of the broker account, positions and open orders.
+
+    Loaded once, kept current from our own order acks and fills, and reconciled
+    with the broker at most every `reconcile_seconds`. Risk checks and UI reads are
+    served from memory, so they cost no REST round trips between reconciles.
+    Positions and the account are exposed with Alpaca's field names (as floats).
+    """
+
+    def __init__(self, client, reconcile_seconds: Optional[float] = None):
+        self.client = client
+        self.reconcile_seconds = settings.BROKER_RECONCILE_SECONDS if reconcile_seconds is None else reconcile_seconds
+        self.lock = threading.RLock()
+        self.account: Optional[SimpleNamespace] = None
+        self.positions: Dict[str, SimpleNamespace] = {}
+        self.open_orders: Dict[str, SimpleNamespace] = {} # order id -> symbol/side/qty of acked, unfilled orders
+        self.last_sync: Optional[float] = None
+        self.broker_calls = 0
+        self.risk = None # Optional RiskEngine kept in step with reconciles, fills and marks
+
+    # --- Broker sync ---
+
+    def reconcile(self):
+        """Replaces the mirror with the broker's view (account, positions, open orders)."""
+        account = self.client.get_account()
+        positions = self.client.get_all_positions()
+        orders = self.client.get_orders(filter=GetOrdersRequest(status=QueryOrderStatus.OPEN))
+        with self.lock:
+            self.broker_calls += 3
+            self.account = SimpleNamespace(
+                equity=float(account.equity),
+                cash=float(account.cash),
+                buying_power=float(account.buying_power),
+                last_equity=float(account.last_equity),
+                status=str(account.status)
+            )
+            self.positions = {
+                p.symbol: SimpleNamespace(
+                    symbol=p.symbol,
+                    qty=float(p.qty),
+                    avg_entry_price=float(p.avg_entry_price),
+                    current_price=float(p.current_price),
+                    market_value=float(p.market_value),
+                    unrealized_pl=float(p.unrealized_pl),
+                    unrealized_plpc=float(p.unrealized_plpc)
+                )
+                for p in positions
+            }
+            self.open_orders = {
+                str(o.id): SimpleNamespace(
+                    symbol=o.symbol,
+                    side=OrderSide.BUY if str(o.side).lower().endswith("buy") else OrderSide.SELL,
+                    qty=float(o.qty or 0) - float(o.filled_qty or 0)
+                )
+                for o in orders
+            }
+            self.last_sync = time.monotonic()
+            if self.risk:
+                self.risk.sync(self.account.cash,
+                               [(p.symbol, p.qty, p.avg_entry_price, p.current_price) for p in self.positions.values()],
+                               day_start_equity=self.account.last_equity,
+                               open_buys=[(o.symbol, o.qty) for o in self.open_orders.values() if o.side == OrderSide.BUY])
+        logger.debug(f"Mirror reconciled: {len(self.positions)} positions, {len(self.open_orders)} open orders")
+
+    def invalidate(self):
+        """Forces a reconcile on the next read."""
+        with self.lock:
+            self.last_sync = None
+
+    def ensure_fresh(self):
+        with self.lock:
+            stale = self.last_sync is None or time.monotonic() - self.last_sync >= self.reconcile_seconds
+        if stale:
+            self.reconcile()
+
+    # --- Local updates ---
+
+    def record_ack(self, order_id: str, symbol: str, side: OrderSide, quantity: float):
+        """Tracks an order the broker accepted but has not filled yet."""
+        with self.lock:
+            self.open_orders[order_id] = SimpleNamespace(symbol=symbol, side=side, qty=float(quantity))
+
+    def drop_order(self, order_id: str):
+        """Forgets an open order the broker cancelled, rejected or expired."""
+        with self.lock:
+            order = self.open_orders.pop(order_id, None)
+            if order and order.side == OrderSide.BUY and self.risk:
+                self.risk.release(order.symbol, order.qty)
+
+    def apply_fill(self, order_id: Optional[str], symbol: str, side: OrderSide, quantity: float, price: float):
+        """Applies a (partial) fill of one of our orders to positions and cash."""
+        with self.lock:
+            if order_id in self.open_orders:
+                remaining = self.open_orders[order_id].qty - quantity
+                if remaining > 0:
+                    self.open_orders[order_id].qty = remaining
+                else:
+                    del self.open_orders[order_id]
+
+            signed = quantity if side == OrderSide.BUY else -quantity
+            pos = self.positions.get(symbol)
+            if pos is None:
+                pos = SimpleNamespace(symbol=symbol, qty=0.0, avg_entry_price=price, current_price=price,
+                                      market_value=0.0, unrealized_pl=0.0, unrealized_plpc=0.0)
+                self.positions[symbol] = pos
+
+            new_qty = pos.qty + signed
+            if pos.qty >= 0 and signed > 0:
+                # Adding to a long: blend the entry price
+                pos.avg_entry_price = (pos.qty * pos.avg_entry_price + signed * price) / new_qty
+            pos.qty = new_qty
+            pos.current_price = price
+            self._revalue(pos)
+            if pos.qty == 0:
+                del self.positions[symbol]
+
+            if self.account:
+                self.account.cash -= signed * price
+                self.account.buying_power -= signed * price
+            if self.risk:
+                self.risk.on_fill(symbol, side, quantity, price)
+
+    def mark_price(self, symbol: str, price: float):
+        """Updates a held symbol's last price (e.g. from a fresh quote)."""
+        with self.lock:
+            pos = self.positions.get(symbol)
+            if pos:
+                pos.current_price = price
+                self._revalue(pos)
+            if self.risk:
+                self.risk.mark(symbol, price)
+
+    @staticmethod
+    def _revalue(pos: SimpleNamespace):
+        pos.market_value = pos.qty * pos.current_price
+        pos.unrealized_pl = (pos.current_price - pos.avg_entry_price) * pos.qty
+        cost = pos.qty * pos.avg_entry_price
+        pos.unrealized_plpc = (pos.unrealized_pl / cost) if cost else 0.0
+
+    # --- Reads ---
+
+    def get_account(self) -> SimpleNamespace:
+        self.ensure_fresh()
+        with self.lock:
+            account = SimpleNamespace(**vars(self.account))
+            account.equity = account.cash + sum(p.market_value for p in self.positions.values())
+            return account
+
+    def get_positions(self) -> List[SimpleNamespace]:
+        self.ensure_fresh()
+        with self.lock:
+            return [SimpleNamespace(**vars(p)) for p in self.positions.values()]
+
+    def portfolio(self) -> Portfolio:
+        self.ensure_fresh()
+        with self.lock:
+            return Portfolio(
+                cash=self.account.cash,
+                positions={
+                    p.symbol: Position(
+                        symbol=p.symbol,
+                        quantity=int(p.qty),
+                        average_price=p.avg_entry_price,
+                        current_price=p.current_price
+                    )
+                    for p in self.positions.values()
+                }
+            )
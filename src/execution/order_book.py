@@ -0,0 +1,260 @@
+import heapq
+import itertools
+import math
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+from src.models.trading import Order, OrderSide, OrderType, OrderStatus
+
+
+class OrderBook:
+    """
+    Pending orders indexed by symbol.
+
+    Market orders wait in a FIFO per symbol. Limit orders sit in per-symbol heaps
+    keyed by limit price (best price first, then time), so a price update pops only
+    the orders it can fill and stops at the first one it can't. Stop orders sit in
+    the same kind of heap keyed by stop price; a triggered STOP/TRAILING_STOP fills
+    like a market order, a triggered STOP_LIMIT moves to the limit heaps.
+    Trailing stops are also kept in a heap of their best price so far, and only
+    those the new price improves on are re-priced.
+
+    Cancelled or re-priced orders are dropped from the heaps lazily. Orders that
+    reach a final status move to `archive`, so matching cost does not grow with
+    history. Bracket exits wait (unindexed) until their parent fills, and filling
+    one order of an OCO group cancels the others.
+
+    Orders added with a `delay` sit out that many price updates for their symbol
+    (simulated order-to-fill latency). Partially filled orders are requeued and
+    keep working.
+    """
+
+    def __init__(self):
+        self.pending: Dict[str, Order] = {}
+        self.archive: List[Order] = []
+        self.last_prices: Dict[str, float] = {}
+        self._market: Dict[str, Deque[str]] = {}
+        self._buy_limits: Dict[str, List[Tuple[float, int, str]]] = {} # (-limit, seq, id): highest bid first
+        self._sell_limits: Dict[str, List[Tuple[float, int, str]]] = {} # (limit, seq, id): lowest ask first
+        self._sell_stops: Dict[str, List[Tuple[float, int, str, float]]] = {} # (-stop, seq, id, stop): fire at price <= stop
+        self._buy_stops: Dict[str, List[Tuple[float, int, str, float]]] = {} # (stop, seq, id, stop): fire at price >= stop
+        self._sell_trails: Dict[str, List[Tuple[float, int, str]]] = {} # (high, seq, id): lowest high first
+        self._buy_trails: Dict[str, List[Tuple[float, int, str]]] = {} # (-low, seq, id): highest low first
+        self._best: Dict[str, float] = {} # trailing order id -> best price seen since placement
+        self._held: Dict[str, List[Order]] = {} # parent id -> bracket exits waiting for its fill
+        self._groups: Dict[str, Set[str]] = {} # OCO group -> pending order ids
+        self._delayed: Dict[str, List[List]] = {} # symbol -> [ticks left, order] not yet matchable (latency)
+        self._seq = itertools.count()
+        self.on_close: Optional[Callable[[Order], None]] = None # Called for every order that leaves the book
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    @staticmethod
+    def validate(order: Order):
+        if order.order_type in (OrderType.LIMIT, OrderType.STOP_LIMIT) and order.price is None:
+            raise ValueError(f"{order.order_type.value} orders need a price")
+        if order.order_type in (OrderType.STOP, OrderType.STOP_LIMIT) and order.stop_price is None:
+            raise ValueError(f"{order.order_type.value} orders need a stop_price")
+        if order.order_type == OrderType.TRAILING_STOP and not (order.trail_amount or order.trail_percent):
+            raise ValueError("TRAILING_STOP orders need trail_amount or trail_percent")
+
+    def add(self, order: Order, delay: int = 0):
+        self.validate(order)
+        self.pending[order.id] = order
+        if order.oco_group:
+            self._groups.setdefault(order.oco_group, set()).add(order.id)
+        if order.parent_id and order.parent_id in self.pending:
+            self._held.setdefault(order.parent_id, []).append(order)
+        elif delay:
+            self._delayed.setdefault(order.symbol, []).append([delay, order])
+        else:
+            self._index(order)
+
+    def _index(self, order: Order):
+        symbol = order.symbol
+        if order.filled_quantity and order.order_type != OrderType.LIMIT:
+            self.requeue(order) # A stop that already triggered and partly filled (restored from a snapshot)
+        elif order.order_type == OrderType.MARKET:
+            self._market.setdefault(symbol, deque()).append(order.id)
+        elif order.order_type == OrderType.LIMIT:
+            self._push_limit(order)
+        elif order.order_type == OrderType.TRAILING_STOP:
+            # Trails from the last known price, or from the next tick if there is none yet
+            if order.side == OrderSide.SELL:
+                best = self.last_prices.get(symbol, -math.inf)
+                heapq.heappush(self._sell_trails.setdefault(symbol, []), (best, next(self._seq), order.id))
+            else:
+                best = self.last_prices.get(symbol, math.inf)
+                heapq.heappush(self._buy_trails.setdefault(symbol, []), (-best, next(self._seq), order.id))
+            self._best[order.id] = best
+            if order.stop_price is not None: # Restored order: keep the level it had already reached
+                self._push_stop(order)
+            if math.isfinite(best):
+                self._set_trailing_stop(order, best)
+        else:
+            self._push_stop(order)
+
+    def _push_limit(self, order: Order):
+        if order.side == OrderSide.BUY:
+            heapq.heappush(self._buy_limits.setdefault(order.symbol, []), (-order.price, next(self._seq), order.id))
+        else:
+            heapq.heappush(self._sell_limits.setdefault(order.symbol, []), (order.price, next(self._seq), order.id))
+
+    def _push_stop(self, order: Order):
+        stop = order.stop_price
+        if order.side == OrderSide.SELL:
+            heapq.heappush(self._sell_stops.setdefault(order.symbol, []), (-stop, next(self._seq), order.id, stop))
+        else:
+            heapq.heappush(self._buy_stops.setdefault(order.symbol, []), (stop, next(self._seq), order.id, stop))
+
+    def _set_trailing_stop(self, order: Order, best: float):
+        trail = order.trail_amount if order.trail_amount else best * order.trail_percent / 100
+        stop = best - trail if order.side == OrderSide.SELL else best + trail
+        # Stops only ever tighten
+        if order.stop_price is None or (stop > order.stop_price if order.side == OrderSide.SELL else stop < order.stop_price):
+            order.stop_price = stop
+            self._push_stop(order)
+
+    def requeue(self, order: Order):
+        """Puts a partially filled order back to be matched on later updates: limits at their limit, the rest at market."""
+        if order.order_type in (OrderType.LIMIT, OrderType.STOP_LIMIT):
+            self._push_limit(order)
+        else:
+            self._market.setdefault(order.symbol, deque()).append(order.id)
+
+    def partial_fill(self, order: Order, quantity: int):
+        """Keeps a partially filled order working and shrinks its OCO siblings by `quantity`."""
+        self.requeue(order)
+        for sibling_id in list(self._groups.get(order.oco_group, ())) if order.oco_group else ():
+            sibling = self.pending.get(sibling_id)
+            if sibling is not None and sibling is not order:
+                sibling.quantity -= quantity
+                if sibling.quantity <= sibling.filled_quantity:
+                    self.cancel(sibling_id)
+
+    def _release_delayed(self, symbol: str):
+        waiting = []
+        for entry in self._delayed.pop(symbol):
+            if entry[0] > 0:
+                entry[0] -= 1
+                waiting.append(entry)
+            elif entry[1].id in self.pending: # Otherwise cancelled while waiting
+                self._index(entry[1])
+        if waiting:
+            self._delayed[symbol] = waiting
+
+    def get(self, order_id: str) -> Optional[Order]:
+        order = self.pending.get(order_id)
+        if order:
+            return order
+        return next((o for o in reversed(self.archive) if o.id == order_id), None)
+
+    def open_orders(self, symbol: str = None) -> List[Order]:
+        return [o for o in self.pending.values() if symbol is None or o.symbol == symbol]
+
+    def cancel(self, order_id: str) -> bool:
+        order = self.pending.get(order_id)
+        if not order:
+            return False
+        order.status = OrderStatus.CANCELLED
+        self.close(order)
+        return True
+
+    def close(self, order: Order):
+        """
+        Moves an order with a final status out of the pending index. A filled order
+        releases its bracket exits and cancels the rest of its OCO group; any other
+        final status cancels its bracket exits.
+        """
+        if self.pending.pop(order.id, None) is None:
+            return
+        self.archive.append(order)
+        self._best.pop(order.id, None)
+        filled = order.status == OrderStatus.FILLED
+        for child in self._held.pop(order.id, []):
+            if filled:
+                self._index(child)
+            elif order.filled_quantity:
+                # Cancelled after a partial fill: protect the shares that did fill
+                child.quantity = min(child.quantity, int(order.filled_quantity))
+                self._index(child)
+            else:
+                child.status = OrderStatus.CANCELLED
+                self.close(child)
+        group = self._groups.get(order.oco_group) if order.oco_group else None
+        if group is not None:
+            group.discard(order.id)
+            if filled:
+                for sibling_id in list(group):
+                    self.cancel(sibling_id)
+            if not group:
+                self._groups.pop(order.oco_group, None)
+        if self.on_close:
+            self.on_close(order)
+
+    def _ratchet_trailing(self, symbol: str, price: float):
+        """Re-prices only the trailing stops whose best price `price` improves on."""
+        sells = self._sell_trails.get(symbol)
+        while sells and sells[0][0] < price:
+            _, seq, order_id = heapq.heappop(sells)
+            if order_id in self._best: # Otherwise filled or cancelled
+                self._best[order_id] = price
+                self._set_trailing_stop(self.pending[order_id], price)
+                heapq.heappush(sells, (price, seq, order_id))
+        buys = self._buy_trails.get(symbol)
+        while buys and -buys[0][0] > price:
+            _, seq, order_id = heapq.heappop(buys)
+            if order_id in self._best:
+                self._best[order_id] = price
+                self._set_trailing_stop(self.pending[order_id], price)
+                heapq.heappush(buys, (-price, seq, order_id))
+
+    def _pop_stops(self, symbol: str, price: float) -> List[Order]:
+        fired = []
+        sells = self._sell_stops.get(symbol)
+        while sells and sells[0][3] >= price:
+            _, _, order_id, stop = heapq.heappop(sells)
+            order = self.pending.get(order_id)
+            if order and order.stop_price == stop: # Otherwise cancelled or re-priced
+                fired.append(order)
+        buys = self._buy_stops.get(symbol)
+        while buys and buys[0][3] <= price:
+            _, _, order_id, stop = heapq.heappop(buys)
+            order = self.pending.get(order_id)
+            if order and order.stop_price == stop:
+                fired.append(order)
+        return fired
+
+    def triggerable(self, symbol: str, price: float) -> List[Order]:
+        """
+        Removes and returns the orders `price` can fill: queued market orders and
+        triggered stops, then marketable limits (including just-triggered stop
+        limits) in price-time priority. Callers must `close` each order once it is
+        filled or rejected, or `partial_fill` it if some of it is left.
+        """
+        self.last_prices[symbol] = price
+        if symbol in self._delayed:
+            self._release_delayed(symbol)
+        due = []
+        market = self._market.pop(symbol, None)
+        if market:
+            due.extend(self.pending[i] for i in market if i in self.pending)
+        if symbol in self._sell_trails or symbol in self._buy_trails:
+            self._ratchet_trailing(symbol, price)
+        for order in self._pop_stops(symbol, price):
+            self._best.pop(order.id, None) # Stop trailing once triggered
+            if order.order_type == OrderType.STOP_LIMIT:
+                self._push_limit(order)
+            else:
+                due.append(order)
+        buys = self._buy_limits.get(symbol)
+        while buys and -buys[0][0] >= price:
+            order_id = heapq.heappop(buys)[2]
+            if order_id in self.pending:
+                due.append(self.pending[order_id])
+        sells = self._sell_limits.get(symbol)
+        while sells and sells[0][0] <= price:
+            order_id = heapq.heappop(sells)[2]
+            if order_id in self.pending:
+                due.append(self.pending[order_id])
+        return due
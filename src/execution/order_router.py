@@ -0,0 +1,111 @@
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+import logging
+
+from pydantic import BaseModel, Field
+
+from src.models.trading import Order, OrderSide, OrderType
+from src.infrastructure.throttling import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class OrderRequest(BaseModel):
+    """One order for the router. `client_order_id` makes resubmission idempotent."""
+    symbol: str
+    side: OrderSide
+    quantity: float
+    order_type: OrderType = OrderType.MARKET
+    price: Optional[float] = None
+    client_order_id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+
+
+class OrderResult(BaseModel):
+    """Outcome of one routed order."""
+    request: OrderRequest
+    order: Optional[Order] = None
+    error: Optional[str] = None
+    risk_rejected: bool = False # Stopped by a pre-trade risk check (never sent)
+    attempts: int = 0
+    latency_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.order is not None
+
+    def to_row(self) -> dict:
+        return {
+            "symbol": self.request.symbol,
+            "side": self.request.side.value,
+            "qty": self.request.quantity,
+            "status": self.order.status.value if self.order else "FAILED",
+            "order_id": self.order.id if self.order else None,
+            "error": self.error,
+            "attempts": self.attempts,
+            "latency_ms": round(self.latency_ms, 1),
+        }
+
+
+def http_status(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Throttling (429), server errors (5xx) and network failures are worth another try."""
+    status = http_status(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, (ConnectionError, TimeoutError, OSError))
+
+
+class BatchOrderRouter:
+    """
+    Submits many orders concurrently through `submit` (one REST call per order),
+    within a client-side request budget. Failed submits that are retryable back
+    off exponentially (with jitter) and are resent with the same client order id,
+    so `submit` can recognise a duplicate instead of placing the order twice.
+    A batch takes about one round trip, not one per order.
+    """
+
+    def __init__(self, submit: Callable[[OrderRequest], Order], max_workers: int = 8,
+                 max_calls_per_minute: int = 200, max_attempts: int = 4, backoff_seconds: float = 0.5,
+                 retryable: Callable[[Exception], bool] = is_retryable):
+        self.submit = RateLimiter(max_calls=max_calls_per_minute, period=60)(submit)
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.retryable = retryable
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="order-router")
+
+    def route(self, requests: List[OrderRequest]) -> List[OrderResult]:
+        """Submits all `requests` and returns one result per request, in the same order."""
+        if len(requests) == 1:
+            return [self._submit_one(requests[0])]
+        return list(self.executor.map(self._submit_one, requests))
+
+    def _submit_one(self, request: OrderRequest) -> OrderResult:
+        result = OrderResult(request=request)
+        start = time.perf_counter()
+        while True:
+            result.attempts += 1
+            try:
+                result.order = self.submit(request)
+                result.error = None
+                break
+            except Exception as e:
+                result.error = str(e)
+                if result.attempts >= self.max_attempts or not self.retryable(e):
+                    logger.error(f"Order {request.side.value} {request.quantity} {request.symbol} failed: {e}")
+                    break
+                delay = self.backoff_seconds * 2 ** (result.attempts - 1) * random.uniform(0.5, 1.5)
+                logger.warning(f"Order {request.client_order_id} attempt {result.attempts} failed ({e}); retrying in {delay:.2f}s")
+                time.sleep(delay)
+        result.latency_ms = (time.perf_counter() - start) * 1000
+        return result
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
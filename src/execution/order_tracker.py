@@ -0,0 +1,250 @@
+import asyncio
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional
+import logging
+
+from src.models.trading import Order, OrderEvent, OrderEventType, OrderSide, OrderStatus
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[OrderEvent], None]
+OrderListener = Callable[[Order, OrderEvent], None]
+
+# Alpaca trade-update event -> ours; the rest (accepted, pending_*, replaced...) carry no fill or final status
+ALPACA_EVENTS = {
+    "new": OrderEventType.NEW,
+    "partial_fill": OrderEventType.PARTIAL_FILL,
+    "fill": OrderEventType.FILL,
+    "canceled": OrderEventType.CANCELED,
+    "rejected": OrderEventType.REJECTED,
+    "expired": OrderEventType.EXPIRED,
+}
+
+FINAL_STATUS = {
+    OrderEventType.FILL: OrderStatus.FILLED,
+    OrderEventType.CANCELED: OrderStatus.CANCELLED,
+    OrderEventType.EXPIRED: OrderStatus.CANCELLED,
+    OrderEventType.REJECTED: OrderStatus.REJECTED,
+}
+
+
+def event_from_alpaca(order, event: OrderEventType, price: Optional[float] = None, timestamp=None) -> OrderEvent:
+    """Builds an OrderEvent from an Alpaca order (REST response or the order inside a trade update)."""
+    avg = float(order.filled_avg_price) if order.filled_avg_price else None
+    fields = dict(
+        event=event,
+        order_id=str(order.id),
+        symbol=order.symbol,
+        side=OrderSide.BUY if str(getattr(order.side, "value", order.side)).lower() == "buy" else OrderSide.SELL,
+        filled_quantity=float(order.filled_qty or 0),
+        filled_avg_price=avg,
+        price=price if price is not None else avg,
+    )
+    if timestamp is not None:
+        fields["timestamp"] = timestamp
+    return OrderEvent(**fields)
+
+
+class OrderEventStream:
+    """Source of order updates. `start` delivers every event to `handler` (from a background thread)."""
+
+    def start(self, handler: EventHandler):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+
+class AlpacaTradeUpdateStream(OrderEventStream):
+    """Alpaca's trade-updates websocket, run on its own thread."""
+
+    def __init__(self, api_key: str, secret_key: str, paper: bool = True):
+        from alpaca.trading.stream import TradingStream
+        self.stream = TradingStream(api_key, secret_key, paper=paper)
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self, handler: EventHandler):
+        async def on_update(update):
+            event = ALPACA_EVENTS.get(str(getattr(update.event, "value", update.event)))
+            if event is None:
+                return
+            price = float(update.price) if update.price is not None else None
+            handler(event_from_alpaca(update.order, event, price, update.timestamp))
+
+        self.stream.subscribe_trade_updates(on_update)
+        self.thread = threading.Thread(target=self._run, name="alpaca-trade-updates", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            self.stream.run()
+        except Exception as e:
+            logger.error(f"Trade update stream stopped: {e}")
+
+    def stop(self):
+        try:
+            self.stream.stop()
+        except (RuntimeError, asyncio.CancelledError) as e:
+            logger.debug(f"Trade update stream stop: {e}")
+
+
+class SimulatedOrderStream(OrderEventStream):
+    """
+    Local stand-in for the broker stream (tests, offline runs). Events passed to
+    `publish` (or built by `fill`/`cancel`) are delivered on a background thread
+    after `latency_ms`, like real updates.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.events: "queue.Queue[Optional[OrderEvent]]" = queue.Queue()
+        self.thread: Optional[threading.Thread] = None
+        self._filled: Dict[str, float] = {}
+        self._cost: Dict[str, float] = {}
+
+    def start(self, handler: EventHandler):
+        self.thread = threading.Thread(target=self._run, args=(handler,), name="simulated-order-stream", daemon=True)
+        self.thread.start()
+
+    def _run(self, handler: EventHandler):
+        while True:
+            event = self.events.get()
+            if event is None:
+                return
+            if self.latency_ms:
+                time.sleep(self.latency_ms / 1000)
+            try:
+                handler(event)
+            except Exception as e:
+                logger.error(f"Order event handler failed: {e}")
+
+    def publish(self, event: OrderEvent):
+        self.events.put(event)
+
+    def fill(self, order: Order, price: float, quantity: Optional[float] = None):
+        """Fills `quantity` more of `order` (default: the rest) at `price`."""
+        filled = self._filled.get(order.id, order.filled_quantity)
+        quantity = order.quantity - filled if quantity is None else min(quantity, order.quantity - filled)
+        filled += quantity
+        self._filled[order.id] = filled
+        self._cost[order.id] = self._cost.get(order.id, 0.0) + quantity * price
+        self.publish(OrderEvent(
+            event=OrderEventType.FILL if filled >= order.quantity else OrderEventType.PARTIAL_FILL,
+            order_id=order.id, symbol=order.symbol, side=order.side,
+            filled_quantity=filled, filled_avg_price=self._cost[order.id] / filled, price=price
+        ))
+
+    def cancel(self, order: Order):
+        filled = self._filled.get(order.id, order.filled_quantity)
+        self.publish(OrderEvent(event=OrderEventType.CANCELED, order_id=order.id, symbol=order.symbol,
+                                side=order.side, filled_quantity=filled))
+
+    def stop(self):
+        self.events.put(None)
+
+
+class OrderTracker:
+    """
+    Live state of the orders we placed, driven by an OrderEventStream instead of
+    polling. Fills (the increase in cumulative filled quantity) go to the account
+    mirror; cancels and rejects release the order there. Listeners (e.g. the
+    agent's decision log) are told about every fill and final status.
+
+    Updates can arrive before `track` is called (a market order often fills before
+    its REST response returns); the latest one per order is held until then.
+    """
+
+    MAX_EARLY = 256
+    MAX_DONE = 500
+
+    def __init__(self, mirror=None, stream: Optional[OrderEventStream] = None):
+        self.mirror = mirror
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.orders: Dict[str, Order] = {} # Open orders by id
+        self.done: deque = deque(maxlen=self.MAX_DONE) # Recently finished orders
+        self.listeners: List[OrderListener] = []
+        self.fill_latency_ms: deque = deque(maxlen=1000) # Submit -> first fill
+        self._submitted: Dict[str, float] = {}
+        self._early: "OrderedDict[str, OrderEvent]" = OrderedDict()
+        if stream:
+            stream.start(self.on_event)
+
+    def subscribe(self, listener: OrderListener):
+        self.listeners.append(listener)
+
+    def track(self, order: Order, submitted_at: Optional[float] = None):
+        """Starts following `order` (`submitted_at` is a time.monotonic() stamp, default now)."""
+        with self.lock:
+            self.orders[order.id] = order
+            self._submitted[order.id] = time.monotonic() if submitted_at is None else submitted_at
+            early = self._early.pop(order.id, None)
+        if early:
+            self.on_event(early)
+
+    def on_event(self, event: OrderEvent):
+        with self.lock:
+            order = self.orders.get(event.order_id)
+            if order is None:
+                # Not tracked (yet): keep the latest update in case its order shows up
+                self._early[event.order_id] = event
+                self._early.move_to_end(event.order_id)
+                while len(self._early) > self.MAX_EARLY:
+                    self._early.popitem(last=False)
+                return
+
+            delta = event.filled_quantity - order.filled_quantity
+            if delta > 0:
+                if order.filled_quantity == 0 and order.id in self._submitted:
+                    self.fill_latency_ms.append((time.monotonic() - self._submitted[order.id]) * 1000)
+                order.filled_quantity = event.filled_quantity
+                order.filled_price = event.filled_avg_price or event.price
+                order.filled_at = event.timestamp
+                order.status = OrderStatus.PARTIALLY_FILLED
+            status = FINAL_STATUS.get(event.event)
+            if status:
+                # A cancel after partial fills keeps what filled; only a full fill counts as FILLED
+                order.status = status
+                self.orders.pop(order.id, None)
+                self._submitted.pop(order.id, None)
+                self.done.append(order)
+            elif delta <= 0:
+                return # Nothing new (NEW, or a duplicate)
+
+        if delta > 0 and self.mirror:
+            self.mirror.apply_fill(order.id, order.symbol, order.side, delta, event.price or order.filled_price)
+        if status and status != OrderStatus.FILLED and self.mirror:
+            self.mirror.drop_order(order.id)
+        for listener in self.listeners:
+            try:
+                listener(order, event)
+            except Exception as e:
+                logger.error(f"Order listener failed: {e}")
+
+    def get(self, order_id: str) -> Optional[Order]:
+        with self.lock:
+            return self.orders.get(order_id) or next((o for o in reversed(self.done) if o.id == order_id), None)
+
+    def open_orders(self) -> List[Order]:
+        with self.lock:
+            return list(self.orders.values())
+
+    def latency_stats(self) -> Dict[str, float]:
+        """Fill latency (submit -> first fill) in ms."""
+        with self.lock:
+            samples = sorted(self.fill_latency_ms)
+        if not samples:
+            return {"fills": 0}
+        return {
+            "fills": len(samples),
+            "p50_ms": round(samples[len(samples) // 2], 1),
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1),
+            "max_ms": round(samples[-1], 1),
+        }
+
+    def stop(self):
+        if self.stream:
+            self.stream.stop()
@@ -1,16 +1,55 @@
 import uuid
 from datetime import datetime
 from typing import List, Optional
-from src.models.trading import Portfolio, Order, Trade, Position, OrderSide, OrderType, OrderStatus
+from src.models.trading import Portfolio, Order, Trade, Position, OrderSide, OrderType, OrderStatus, OPEN_STATUSES
 from src.models.domain import Stock
+from src.execution.order_book import OrderBook
+from src.execution.risk_engine import RiskEngine, RiskRejected
+from src.execution.order_router import OrderRequest, OrderResult
+from src.execution.fill_model import FillModel, fill_model_from_settings
+from src.infrastructure.ledger import PaperLedger
+from src.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
 
 class PaperTradingEngine:
-    """Simulates trade execution without real money."""
+    """
+    Simulates trade execution without real money.
+    With a `ledger`, the account survives restarts: orders, fills and status
+    changes are logged as they happen and the engine restores itself on startup.
+    How much of an order fills, at what price and after how many price updates is
+    up to the `fill_model` (default: settings.FILL_MODEL_SETTINGS).
+    """
+
+    SNAPSHOT_TRADES = 200 # Recent trades kept in snapshots (the full history stays in the ledger)
     
-    def __init__(self, initial_cash: float = 100000.0):
+    def __init__(self, initial_cash: float = 100000.0, risk_checks: bool = True, ledger: Optional[PaperLedger] = None,
+                 fill_model: Optional[FillModel] = None):
         self.portfolio = Portfolio(cash=initial_cash)
-        self.orders: List[Order] = []
+        self.book = OrderBook()
+        self.fill_model = fill_model or fill_model_from_settings()
         self.trades: List[Trade] = []
+        self.ledger = ledger
+        self._replaying = False
+        self._restored_risk: Optional[dict] = None
+        # Same pre-trade checks as the Alpaca engine; backtests turn them off
+        self.risk: Optional[RiskEngine] = RiskEngine() if risk_checks else None
+        self.book.on_close = self._on_close
+        if ledger:
+            self._restore()
+        if self.risk:
+            if self._restored_risk:
+                self.risk.restore(self._restored_risk) # Peak and day start survive restarts
+            self.risk.sync(self.portfolio.cash, [(p.symbol, p.quantity, p.average_price, p.current_price)
+                                                 for p in self.portfolio.positions.values()],
+                           open_buys=[(o.symbol, o.quantity - o.filled_quantity)
+                                      for o in self.book.pending.values() if o.side == OrderSide.BUY])
+
+    @property
+    def orders(self) -> List[Order]:
+        """Every order placed: archived (filled, rejected, cancelled) then pending."""
+        return self.book.archive + list(self.book.pending.values())
 
     def get_account(self):
         """Returns a mock account object matching Alpaca's structure."""
@@ -44,105 +83,271 @@ class PaperTradingEngine:
             ))
         return result
 
-    def place_order(self, symbol: str, side: OrderSide, quantity: int, order_type: OrderType = OrderType.MARKET, price: Optional[float] = None) -> Order:
+    def place_order(self, symbol: str, side: OrderSide, quantity: int, order_type: OrderType = OrderType.MARKET, price: Optional[float] = None,
+                    stop_price: Optional[float] = None, trail_amount: Optional[float] = None, trail_percent: Optional[float] = None,
+                    oco_group: Optional[str] = None, parent_id: Optional[str] = None) -> Order:
+        if self.risk:
+            self.risk.check(symbol, side, quantity, price or stop_price)
         order = Order(
             id=str(uuid.uuid4()),
             symbol=symbol,
             side=side,
             order_type=order_type,
             quantity=quantity,
-            price=price
+            price=price,
+            stop_price=stop_price,
+            trail_amount=trail_amount,
+            trail_percent=trail_percent,
+            oco_group=oco_group,
+            parent_id=parent_id
         )
-        self.orders.append(order)
+        try:
+            self.book.add(order, delay=self.fill_model.latency_ticks)
+        except ValueError:
+            if self.risk and side == OrderSide.BUY:
+                self.risk.release(symbol, quantity)
+            raise
+        self._log("order", order.model_dump(mode='json'))
         
         # In paper trading, we try to fill immediately if MARKET, or check price if LIMIT
         # For simplicity in this iteration, we'll assume immediate fill at "current price" provided externally
         return order
 
-    def process_orders(self, current_prices: dict[str, float]):
+    def place_oco_order(self, symbol: str, side: OrderSide, quantity: int, take_profit: Optional[float] = None,
+                        stop_loss: Optional[float] = None, trail_percent: Optional[float] = None,
+                        parent_id: Optional[str] = None) -> List[Order]:
         """
-        Process pending orders based on current market prices.
+        Take-profit limit plus protective stop (fixed, or trailing by `trail_percent`)
+        for the same shares; whichever fills first cancels the other.
+        """
+        if take_profit is None and stop_loss is None and not trail_percent:
+            raise ValueError("OCO orders need a take-profit, a stop-loss or a trailing stop")
+        group = parent_id or str(uuid.uuid4())
+        exits = []
+        if take_profit is not None:
+            exits.append(self.place_order(symbol, side, quantity, OrderType.LIMIT, price=take_profit,
+                                          oco_group=group, parent_id=parent_id))
+        if trail_percent:
+            exits.append(self.place_order(symbol, side, quantity, OrderType.TRAILING_STOP, trail_percent=trail_percent,
+                                          oco_group=group, parent_id=parent_id))
+        elif stop_loss is not None:
+            exits.append(self.place_order(symbol, side, quantity, OrderType.STOP, stop_price=stop_loss,
+                                          oco_group=group, parent_id=parent_id))
+        return exits
+
+    def place_bracket_order(self, symbol: str, side: OrderSide, quantity: int, take_profit: Optional[float] = None,
+                            stop_loss: Optional[float] = None, trail_percent: Optional[float] = None,
+                            order_type: OrderType = OrderType.MARKET, price: Optional[float] = None) -> List[Order]:
+        """Entry order plus OCO exits that only become active once the entry fills. Returns [entry, *exits]."""
+        entry = self.place_order(symbol, side, quantity, order_type, price=price)
+        exit_side = OrderSide.SELL if side == OrderSide.BUY else OrderSide.BUY
+        try:
+            exits = self.place_oco_order(symbol, exit_side, quantity, take_profit, stop_loss, trail_percent, parent_id=entry.id)
+        except ValueError:
+            self.book.cancel(entry.id)
+            raise
+        return [entry] + exits
+
+    def place_orders(self, requests: List[OrderRequest]) -> List[OrderResult]:
+        """Same contract as AlpacaExecutionEngine.place_orders (placing is local, so no concurrency needed)."""
+        results = []
+        for request in requests:
+            try:
+                order = self.place_order(request.symbol, request.side, int(request.quantity), request.order_type, request.price)
+                order.client_order_id = request.client_order_id
+                results.append(OrderResult(request=request, order=order, attempts=1))
+            except RiskRejected as e:
+                results.append(OrderResult(request=request, error=str(e), risk_rejected=True, attempts=1))
+            except (RuntimeError, ValueError) as e:
+                results.append(OrderResult(request=request, error=str(e), attempts=1))
+        return results
+
+    def liquidate_all(self) -> List[OrderResult]:
         """
-        for order in self.orders:
-            if order.status == OrderStatus.PENDING:
-                current_price = current_prices.get(order.symbol)
-                if not current_price:
+        Cancels every pending order and sells every position at its last price
+        (through the fill model). Like the Alpaca engine, refused while the kill switch is on.
+        """
+        if not settings.TRADING_ENABLED:
+            logger.warning("Liquidation rejected: Trading is disabled (Kill Switch).")
+            raise RuntimeError("Trading is disabled.")
+        for order in self.book.open_orders():
+            self.book.cancel(order.id)
+        positions = [p for p in self.portfolio.positions.values() if p.quantity > 0]
+        requests = [OrderRequest(symbol=p.symbol, side=OrderSide.SELL, quantity=p.quantity) for p in positions]
+        results = self.place_orders(requests)
+        self.process_orders({p.symbol: p.current_price for p in positions})
+        return results
+
+    def cancel_order(self, order_id: str) -> bool:
+        return self.book.cancel(order_id)
+
+    def cancel_orders(self, symbol: str) -> int:
+        """Cancels every pending order for `symbol` (e.g. protective exits before a manual sell)."""
+        return sum(self.book.cancel(o.id) for o in self.book.open_orders(symbol))
+
+    def process_orders(self, current_prices: dict[str, float], volumes: Optional[dict[str, float]] = None):
+        """
+        Process pending orders based on current market prices (and, if known, the
+        bar volume per symbol, which caps fills in the fill model).
+        Only orders the new prices can fill or trigger are visited (see OrderBook),
+        and the fill model prices all of them in one batch.
+        """
+        due, prices, bar_volumes = [], [], []
+        for symbol, current_price in current_prices.items():
+            if not current_price:
+                continue
+            volume = volumes.get(symbol) if volumes else None
+            for order in self.book.triggerable(symbol, current_price):
+                due.append(order)
+                prices.append(current_price)
+                bar_volumes.append(volume)
+        if due:
+            quantities, fill_prices = self.fill_model.fill(due, prices, bar_volumes)
+            for order, quantity, fill_price in zip(due, quantities, fill_prices):
+                if order.status not in OPEN_STATUSES:
+                    continue # Cancelled by an OCO sibling earlier in this tick
+                if quantity <= 0:
+                    self.book.requeue(order) # No liquidity left this bar
                     continue
-                    
-                should_fill = False
-                fill_price = current_price
-                
-                if order.order_type == OrderType.MARKET:
-                    should_fill = True
-                elif order.order_type == OrderType.LIMIT:
-                    if order.side == OrderSide.BUY and current_price <= order.price:
-                        should_fill = True
-                        fill_price = order.price # Or current_price, usually limit price is better or equal
-                    elif order.side == OrderSide.SELL and current_price >= order.price:
-                        should_fill = True
-                        fill_price = order.price
-                
-                if should_fill:
-                    self._execute_trade(order, fill_price)
+                self._execute_trade(order, fill_price, quantity)
+                if order.status == OrderStatus.PARTIALLY_FILLED:
+                    self.book.partial_fill(order, quantity)
+                else:
+                    self.book.close(order)
+        self.portfolio.mark_many(current_prices)
+        if self.risk:
+            self.risk.mark_many(current_prices)
 
-    def _execute_trade(self, order: Order, price: float):
-        cost = price * order.quantity
+    def _execute_trade(self, order: Order, price: float, quantity: int):
+        cost = price * quantity
         
         if order.side == OrderSide.BUY:
             if self.portfolio.cash >= cost:
                 self.portfolio.cash -= cost
-                self._update_position(order.symbol, order.quantity, price, OrderSide.BUY)
-                order.status = OrderStatus.FILLED
-                order.filled_at = datetime.now()
-                order.filled_price = price
-                self._record_trade(order, price)
+                self._update_position(order.symbol, quantity, price, OrderSide.BUY)
+                self._fill(order, price, quantity)
             else:
                 order.status = OrderStatus.REJECTED # Insufficient funds
                 
         elif order.side == OrderSide.SELL:
             position = self.portfolio.positions.get(order.symbol)
-            if position and position.quantity >= order.quantity:
+            if position and position.quantity >= quantity:
                 self.portfolio.cash += cost
-                self._update_position(order.symbol, order.quantity, price, OrderSide.SELL)
-                order.status = OrderStatus.FILLED
-                order.filled_at = datetime.now()
-                order.filled_price = price
-                self._record_trade(order, price)
+                self._update_position(order.symbol, quantity, price, OrderSide.SELL)
+                self._fill(order, price, quantity)
             else:
                 order.status = OrderStatus.REJECTED # Insufficient shares
 
+    def _fill(self, order: Order, price: float, quantity: int):
+        self._apply_fill(order, price, quantity, self._now())
+        self._record_trade(order, price, quantity)
+
+    @staticmethod
+    def _apply_fill(order: Order, price: float, quantity: int, at: Optional[datetime]):
+        """Adds a fill to the order's filled quantity and average price; FILLED once nothing is left."""
+        previous = order.filled_quantity
+        order.filled_price = (previous * order.filled_price + quantity * price) / (previous + quantity) if previous else price
+        order.filled_quantity = previous + quantity
+        order.status = OrderStatus.FILLED if order.filled_quantity >= order.quantity else OrderStatus.PARTIALLY_FILLED
+        order.filled_at = at
+
     def _update_position(self, symbol: str, quantity: int, price: float, side: OrderSide):
-        position = self.portfolio.positions.get(symbol)
-        
-        if side == OrderSide.BUY:
-            if position:
-                total_cost = (position.quantity * position.average_price) + (quantity * price)
-                total_qty = position.quantity + quantity
-                position.average_price = total_cost / total_qty
-                position.quantity = total_qty
-                position.current_price = price
-            else:
-                self.portfolio.positions[symbol] = Position(
-                    symbol=symbol,
-                    quantity=quantity,
-                    average_price=price,
-                    current_price=price
-                )
-        elif side == OrderSide.SELL:
-            if position:
-                position.quantity -= quantity
-                position.current_price = price
-                if position.quantity == 0:
-                    del self.portfolio.positions[symbol]
-
-    def _record_trade(self, order: Order, price: float):
+        self.portfolio.apply_fill(symbol, side, quantity, price)
+        if self.risk:
+            self.risk.on_fill(symbol, side, quantity, price)
+
+    def _on_close(self, order: Order):
+        """An order left the book: log it and release the risk reservation of whatever did not fill."""
+        if self.risk and order.side == OrderSide.BUY:
+            self.risk.release(order.symbol, order.quantity - order.filled_quantity)
+        self._log("close", {
+            "id": order.id, "status": order.status.value,
+            "filled_price": order.filled_price, "filled_at": order.filled_at
+        })
+
+    def _now(self) -> datetime:
+        """Fill timestamp; simulations override this with the bar time."""
+        return datetime.now()
+
+    def _record_trade(self, order: Order, price: float, quantity: int):
         trade = Trade(
             id=str(uuid.uuid4()),
             order_id=order.id,
             symbol=order.symbol,
             side=order.side,
-            quantity=order.quantity,
+            quantity=quantity,
             price=price,
-            timestamp=datetime.now()
+            timestamp=self._now()
         )
         self.trades.append(trade)
+        self._log("fill", trade.model_dump(mode='json'))
+
+    # --- Ledger ---
+
+    def _log(self, kind: str, payload: dict):
+        if self.ledger and not self._replaying:
+            self.ledger.append(kind, payload)
+            if self.ledger.snapshot_due:
+                self.snapshot()
+
+    def snapshot(self):
+        """Writes the current account state to the ledger; restarts replay only what comes after."""
+        self.ledger.write_snapshot({
+            "portfolio": self.portfolio.model_dump(mode='json'),
+            "pending": [o.model_dump(mode='json') for o in self.book.pending.values()],
+            "last_prices": self.book.last_prices,
+            "trades": [t.model_dump(mode='json') for t in self.trades[-self.SNAPSHOT_TRADES:]],
+            "risk": self.risk.state() if self.risk else None,
+        })
+
+    def _restore(self):
+        seq, state = self.ledger.latest_snapshot()
+        if state is None and not self.ledger.count():
+            self.snapshot() # New ledger: record the opening balance
+            return
+        if state:
+            self.portfolio = Portfolio(**state["portfolio"])
+            self.book.last_prices.update(state["last_prices"])
+            for data in state["pending"]:
+                self.book.add(Order(**data))
+            self.trades = [Trade(**t) for t in state["trades"]]
+            self._restored_risk = state.get("risk")
+        self._replaying = True
+        replayed = 0
+        try:
+            for _, kind, payload in self.ledger.events_after(seq):
+                self._replay(kind, payload)
+                replayed += 1
+        finally:
+            self._replaying = False
+        # A crash between a fill and its status change leaves a finished order in the book
+        for order in [o for o in self.book.pending.values() if o.status not in OPEN_STATUSES]:
+            self.book.close(order)
+        logger.info(f"Paper account restored: {len(self.portfolio.positions)} positions, "
+                    f"{len(self.book)} open orders, {replayed} events replayed")
+
+    def _replay(self, kind: str, payload: dict):
+        if kind == "order":
+            self.book.add(Order(**payload))
+        elif kind == "fill":
+            trade = Trade(**payload)
+            signed = trade.quantity * trade.price
+            self.portfolio.cash += -signed if trade.side == OrderSide.BUY else signed
+            self.portfolio.apply_fill(trade.symbol, trade.side, trade.quantity, trade.price)
+            order = self.book.pending.get(trade.order_id)
+            if order:
+                self._apply_fill(order, trade.price, trade.quantity, trade.timestamp)
+            self.trades.append(trade)
+        elif kind == "close":
+            order = self.book.pending.get(payload["id"])
+            if order:
+                order.status = OrderStatus(payload["status"])
+                order.filled_price = payload["filled_price"]
+                order.filled_at = datetime.fromisoformat(payload["filled_at"]) if payload["filled_at"] else None
+                self.book.close(order)
+
+    def close(self):
+        """Snapshots and closes the ledger (if any)."""
+        if self.ledger:
+            self.snapshot()
+            self.ledger.close()
@@ -0,0 +1,217 @@
+import threading
+from collections import deque
+from datetime import date, datetime
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
+import logging
+
+from src.models.risk import RiskSettings, RiskRejection
+from src.models.trading import OrderSide
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RiskRejected(RuntimeError):
+    """An order failed a pre-trade risk check."""
+
+    def __init__(self, rejection: RiskRejection):
+        super().__init__(f"Risk check failed ({rejection.rule}): {rejection.detail}")
+        self.rejection = rejection
+
+
+class RiskEngine:
+    """
+    In-memory pre-trade checks for every RiskSettings limit.
+
+    Keeps running exposure, cash, day-start and peak equity, updated from fills
+    (`on_fill`) and price marks (`mark`/`mark_many`), so `check` is a few dict
+    lookups and never calls the broker. Both engines feed it the same way: the
+    paper engine directly, Alpaca through its AccountMirror (which also re-`sync`s
+    it on every reconcile). Rejections are kept in `rejections` as an audit trail.
+
+    Only buys are checked; sells reduce risk and are always allowed. Buys of a
+    symbol with no known price skip the position-size check. An accepted buy is
+    reserved until it fills (`on_fill`) or leaves the book unfilled (`release`), so
+    buys that are working but not filled yet count toward max_open_positions and
+    max_position_size.
+    """
+
+    def __init__(self, risk_settings: Callable[[], RiskSettings] = None, audit_size: int = 500):
+        self.risk_settings = risk_settings or (lambda: settings.RISK_SETTINGS)
+        self.lock = threading.Lock()
+        self.cash = 0.0
+        self.quantities: Dict[str, float] = {}
+        self.marks: Dict[str, float] = {}
+        self.exposure = 0.0 # Sum of quantity * last mark over held symbols
+        self.day: Optional[date] = None
+        self.day_start_equity = 0.0
+        self.peak_equity = 0.0
+        self.realized_today = 0.0
+        self.avg_prices: Dict[str, float] = {}
+        self.reserved: Dict[str, float] = {} # Shares of accepted, unfilled buys per symbol
+        self.rejections: Deque[RiskRejection] = deque(maxlen=audit_size)
+        self.checks = 0
+
+    @property
+    def equity(self) -> float:
+        return self.cash + self.exposure
+
+    def sync(self, cash: float, positions: Iterable[Tuple[str, float, float, float]], day_start_equity: float = None,
+             open_buys: Optional[Iterable[Tuple[str, float]]] = None):
+        """
+        Resets state from the engine's view: cash and (symbol, quantity, average
+        price, last price) per position. `open_buys` ((symbol, unfilled quantity) per
+        working buy order), if given, replaces the reservations.
+        """
+        with self.lock:
+            if open_buys is not None:
+                self.reserved = {}
+                for symbol, quantity in open_buys:
+                    self._reserve(symbol, quantity)
+            self.cash = cash
+            self.quantities, self.avg_prices, self.exposure = {}, {}, 0.0
+            for symbol, quantity, average_price, price in positions:
+                self.quantities[symbol] = quantity
+                self.avg_prices[symbol] = average_price
+                self.marks[symbol] = price
+                self.exposure += quantity * price
+            self._roll_day()
+            if day_start_equity is not None:
+                self.day_start_equity = day_start_equity
+            self.peak_equity = max(self.peak_equity, self.equity)
+
+    def state(self) -> Dict:
+        """The limits' history that current positions can't rebuild (peak, day start, realized P&L), for persisting."""
+        with self.lock:
+            return {
+                "day": self.day.isoformat() if self.day else None,
+                "day_start_equity": self.day_start_equity,
+                "peak_equity": self.peak_equity,
+                "realized_today": self.realized_today,
+            }
+
+    def restore(self, state: Dict):
+        """Reloads a `state()` (call before `sync`, which keeps it if it is from today)."""
+        with self.lock:
+            self.day = date.fromisoformat(state["day"]) if state.get("day") else None
+            self.day_start_equity = state.get("day_start_equity", 0.0)
+            self.peak_equity = state.get("peak_equity", 0.0)
+            self.realized_today = state.get("realized_today", 0.0)
+
+    def seed_peak(self, equity: float):
+        """Raises the drawdown peak to `equity` (e.g. the high in the broker's equity history)."""
+        with self.lock:
+            self.peak_equity = max(self.peak_equity, equity)
+
+    def _roll_day(self):
+        today = date.today()
+        if today != self.day:
+            self.day = today
+            self.day_start_equity = self.equity
+            self.realized_today = 0.0
+
+    def on_fill(self, symbol: str, side: OrderSide, quantity: float, price: float):
+        with self.lock:
+            self._roll_day()
+            held = self.quantities.get(symbol, 0.0)
+            signed = quantity if side == OrderSide.BUY else -quantity
+            if side == OrderSide.BUY:
+                self._reserve(symbol, -quantity)
+            if side == OrderSide.BUY and held >= 0:
+                self.avg_prices[symbol] = (held * self.avg_prices.get(symbol, price) + quantity * price) / (held + quantity)
+            elif side == OrderSide.SELL and held > 0:
+                self.realized_today += (price - self.avg_prices.get(symbol, price)) * min(quantity, held)
+            self.exposure += (held + signed) * price - held * self.marks.get(symbol, price)
+            self.cash -= signed * price
+            self.marks[symbol] = price
+            if held + signed:
+                self.quantities[symbol] = held + signed
+            else:
+                self.quantities.pop(symbol, None)
+                self.avg_prices.pop(symbol, None)
+            self.peak_equity = max(self.peak_equity, self.equity)
+
+    def release(self, symbol: str, quantity: float):
+        """Drops the reservation for `quantity` shares of a buy that was cancelled, rejected or never sent."""
+        with self.lock:
+            self._reserve(symbol, -quantity)
+
+    def _reserve(self, symbol: str, quantity: float):
+        reserved = self.reserved.get(symbol, 0.0) + quantity
+        if reserved > 0:
+            self.reserved[symbol] = reserved
+        else:
+            self.reserved.pop(symbol, None)
+
+    def mark(self, symbol: str, price: float):
+        with self.lock:
+            self._mark(symbol, price)
+            self.peak_equity = max(self.peak_equity, self.equity)
+
+    def mark_many(self, prices: Dict[str, float]):
+        with self.lock:
+            for symbol, price in prices.items():
+                if price:
+                    self._mark(symbol, price)
+            self.peak_equity = max(self.peak_equity, self.equity)
+
+    def _mark(self, symbol: str, price: float):
+        held = self.quantities.get(symbol)
+        if held:
+            self.exposure += held * (price - self.marks.get(symbol, price))
+        self.marks[symbol] = price
+
+    def check(self, symbol: str, side: OrderSide, quantity: float, price: Optional[float] = None):
+        """
+        Raises RiskRejected (and records it) if the order breaks a limit. An accepted
+        buy is reserved; the caller must `release` it if the order is never placed.
+        """
+        if side != OrderSide.BUY:
+            return
+        limits = self.risk_settings()
+        with self.lock:
+            self.checks += 1
+            self._roll_day()
+            price = price or self.marks.get(symbol)
+            equity = self.equity
+            held = self.quantities.get(symbol, 0.0) + self.reserved.get(symbol, 0.0)
+            open_symbols = len(self.quantities.keys() | self.reserved.keys())
+            rule = detail = None
+            daily_pnl = equity - self.day_start_equity
+            drawdown = (self.peak_equity - equity) / self.peak_equity if self.peak_equity > 0 else 0.0
+            if daily_pnl <= -limits.max_daily_loss:
+                rule, detail = "max_daily_loss", f"today's P&L ${daily_pnl:,.2f} is beyond -${limits.max_daily_loss:,.2f}"
+            elif drawdown >= limits.max_drawdown_pct:
+                rule, detail = "max_drawdown_pct", f"drawdown {drawdown:.2%} from peak ${self.peak_equity:,.2f} >= {limits.max_drawdown_pct:.2%}"
+            elif not held and open_symbols >= limits.max_open_positions:
+                rule, detail = "max_open_positions", f"{open_symbols} positions open or pending (max {limits.max_open_positions})"
+            elif price and (held + quantity) * price > limits.max_position_size:
+                rule, detail = "max_position_size", f"{symbol} would be ${(held + quantity) * price:,.2f} (max ${limits.max_position_size:,.2f})"
+            if rule is None:
+                self._reserve(symbol, quantity)
+                return
+            rejection = RiskRejection(timestamp=datetime.now(), symbol=symbol, side=side.value, quantity=quantity,
+                                      price=price, rule=rule, detail=detail)
+            self.rejections.append(rejection)
+        logger.warning(f"Order rejected by risk engine: {side.value} {quantity} {symbol}: {detail}")
+        raise RiskRejected(rejection)
+
+    def snapshot(self) -> Dict:
+        """Current risk state for display."""
+        with self.lock:
+            equity = self.equity
+            return {
+                "equity": equity,
+                "exposure": self.exposure,
+                "open_positions": len(self.quantities),
+                "pending_buys": len(self.reserved.keys() - self.quantities.keys()),
+                "daily_pnl": equity - self.day_start_equity,
+                "realized_today": self.realized_today,
+                "peak_equity": self.peak_equity,
+                "drawdown_pct": (self.peak_equity - equity) / self.peak_equity if self.peak_equity > 0 else 0.0,
+                "checks": self.checks,
+            }
+
+    def recent_rejections(self, limit: int = 50) -> List[RiskRejection]:
+        with self.lock:
+            return list(self.rejections)[-limit:][::-1]
@@ -2,6 +2,7 @@ import json
 import os
 from typing import Optional, Any
 from datetime import timedelta, datetime
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,9 +10,14 @@ logger = logging.getLogger(__name__)
 class RedisCache:
     """Wrapper for Redis caching with fallback to in-memory cache."""
     
-    def __init__(self, host: str = 'localhost', port: int = 6379, db: int = 0):
+    def __init__(self, host: str = 'localhost', port: int = 6379, db: int = 0, use_redis: bool = True):
         self.use_redis = False
         self.memory_cache = {}  # Fallback in-memory cache
+        self.memory_lock = threading.Lock()  # Shared across sessions/threads
+        self.client = None
+        
+        if not use_redis:
+            return
         
         try:
             import redis
@@ -40,11 +46,11 @@ class RedisCache:
                 logger.error(f"Redis get error: {e}")
         
         # Fallback to memory cache
-        if key in self.memory_cache:
-            item = self.memory_cache[key]
-            if item['expires_at'] > datetime.now():
-                return item['value']
-            else:
+        with self.memory_lock:
+            item = self.memory_cache.get(key)
+            if item:
+                if item['expires_at'] > datetime.now():
+                    return item['value']
                 del self.memory_cache[key]
         return None
 
@@ -57,10 +63,11 @@ class RedisCache:
                 logger.error(f"Redis set error: {e}")
         
         # Fallback to memory cache
-        self.memory_cache[key] = {
-            'value': value,
-            'expires_at': datetime.now() + timedelta(seconds=expire)
-        }
+        with self.memory_lock:
+            self.memory_cache[key] = {
+                'value': value,
+                'expires_at': datetime.now() + timedelta(seconds=expire)
+            }
         
     def exists(self, key: str) -> bool:
         if self.use_redis:
@@ -70,9 +77,10 @@ class RedisCache:
                 logger.error(f"Redis exists error: {e}")
         
         # Fallback to memory cache
-        if key in self.memory_cache:
-            if self.memory_cache[key]['expires_at'] > datetime.now():
-                return True
-            else:
+        with self.memory_lock:
+            item = self.memory_cache.get(key)
+            if item:
+                if item['expires_at'] > datetime.now():
+                    return True
                 del self.memory_cache[key]
         return False
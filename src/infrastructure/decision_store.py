@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+import logging
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+
+class StoredDecision(BaseModel):
+    """An AI persona decision for one symbol on one historical day."""
+    symbol: str
+    date: date
+    persona: str
+    model: str
+    input_hash: str = Field(description="Hash of the exact prompt, i.e. of every input the model saw")
+    signal: str
+    confidence: float
+    insight: str
+    created_at: datetime = Field(default_factory=datetime.now)
+
+
+class AIDecisionStore:
+    """
+    Persistent SQLite store of AI decisions keyed by (symbol, date, persona, model, input_hash).
+    Filled once by the replay runner; backtests then read it back at disk speed.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS ai_decisions (
+                symbol TEXT NOT NULL,
+                date TEXT NOT NULL,
+                persona TEXT NOT NULL,
+                model TEXT NOT NULL,
+                input_hash TEXT NOT NULL,
+                signal TEXT NOT NULL,
+                confidence REAL NOT NULL,
+                insight TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (symbol, date, persona, model, input_hash)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_decisions_lookup ON ai_decisions (symbol, persona, date)")
+        self.conn.commit()
+
+    def put(self, decision: StoredDecision):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ai_decisions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (decision.symbol, decision.date.isoformat(), decision.persona, decision.model, decision.input_hash,
+                 decision.signal, decision.confidence, decision.insight, decision.created_at.isoformat())
+            )
+            self.conn.commit()
+
+    def get(self, symbol: str, day: date, persona: str, input_hash: str, model: Optional[str] = None) -> Optional[StoredDecision]:
+        """Looks up one decision. If `model` is None, any model's answer for these inputs is accepted."""
+        query = "SELECT * FROM ai_decisions WHERE symbol = ? AND date = ? AND persona = ? AND input_hash = ?"
+        params = [symbol, day.isoformat(), persona, input_hash]
+        if model:
+            query += " AND model = ?"
+            params.append(model)
+        with self.lock:
+            row = self.conn.execute(query + " ORDER BY created_at DESC LIMIT 1", params).fetchone()
+        return self._to_decision(row) if row else None
+
+    def load(self, symbol: str, persona: str, model: Optional[str] = None,
+             start: Optional[date] = None, end: Optional[date] = None) -> Dict[Tuple[date, str], StoredDecision]:
+        """Bulk-loads decisions for a symbol/persona keyed by (date, input_hash), for in-memory replay."""
+        query = "SELECT * FROM ai_decisions WHERE symbol = ? AND persona = ?"
+        params = [symbol, persona]
+        if model:
+            query += " AND model = ?"
+            params.append(model)
+        if start:
+            query += " AND date >= ?"
+            params.append(start.isoformat())
+        if end:
+            query += " AND date <= ?"
+            params.append(end.isoformat())
+        with self.lock:
+            rows = self.conn.execute(query + " ORDER BY created_at", params).fetchall()
+        decisions = (self._to_decision(row) for row in rows)
+        return {(d.date, d.input_hash): d for d in decisions}
+
+    def count(self, symbol: Optional[str] = None, persona: Optional[str] = None) -> int:
+        query = "SELECT COUNT(*) FROM ai_decisions WHERE (? IS NULL OR symbol = ?) AND (? IS NULL OR persona = ?)"
+        with self.lock:
+            return self.conn.execute(query, (symbol, symbol, persona, persona)).fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    @staticmethod
+    def _to_decision(row) -> StoredDecision:
+        symbol, day, persona, model, input_hash, signal, confidence, insight, created_at = row
+        return StoredDecision(
+            symbol=symbol, date=date.fromisoformat(day), persona=persona, model=model, input_hash=input_hash,
+            signal=signal, confidence=confidence, insight=insight, created_at=datetime.fromisoformat(created_at)
+        )
@@ -0,0 +1,97 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+from typing import Any, Iterable
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IPCError(RuntimeError):
+    """The remote side reported an error, or could not be reached."""
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                response = {"ok": True, "result": self.server.dispatch(request["method"], request.get("params") or {})}
+            except Exception as e:
+                response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write((json.dumps(response, default=str) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+class IPCServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    JSON-lines RPC over a Unix socket. Each request is {"method", "params"}; each
+    response is {"ok", "result"} or {"ok": false, "error"}. Only the listed methods
+    of `target` can be called.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: str, target: Any, methods: Iterable[str]):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path):
+            os.unlink(path) # Stale socket from a previous run
+        self.path = path
+        self.target = target
+        self.methods = set(methods)
+        super().__init__(path, _Handler)
+        os.chmod(path, 0o600)
+
+    def dispatch(self, method: str, params: dict) -> Any:
+        if method not in self.methods:
+            raise ValueError(f"Unknown method '{method}'")
+        return getattr(self.target, method)(**params)
+
+    def serve_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name="ipc-server", daemon=True)
+        thread.start()
+        return thread
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class IPCClient:
+    """Calls an IPCServer. Opens a short-lived connection per call, so it is thread-safe."""
+
+    def __init__(self, path: str, timeout: float = 5.0):
+        self.path = path
+        self.timeout = timeout
+
+    def call(self, method: str, **params) -> Any:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.path)
+                sock.sendall((json.dumps({"method": method, "params": params}, default=str) + "\n").encode("utf-8"))
+                with sock.makefile("rb") as reader:
+                    line = reader.readline()
+        except OSError as e:
+            raise IPCError(f"Agent worker unreachable at {self.path}: {e}") from e
+        if not line:
+            raise IPCError("Agent worker closed the connection")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise IPCError(response.get("error", "Unknown error"))
+        return response.get("result")
+
+    def ping(self) -> bool:
+        try:
+            return self.call("status") is not None
+        except IPCError:
+            return False
@@ -0,0 +1,176 @@
+import os
+import queue
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+_STOP = object() # Writer shutdown sentinel
+
+# Every action the agent journals: cycle decisions, then order outcomes (PortfolioManager.on_order_event)
+JOURNAL_ACTIONS = ("BUY", "SELL", "HOLD", "PASS", "SKIP", "SKIP BUY", "RISK REJECT", "ERROR",
+                   "FILLED", "PARTIAL FILL", "CANCELLED", "REJECTED")
+
+
+class JournalEntry(BaseModel):
+    """One agent decision."""
+    timestamp: datetime = Field(default_factory=datetime.now)
+    symbol: str
+    action: str
+    reason: str
+    persona: Optional[str] = None
+
+    def to_row(self) -> Dict:
+        """Flat dict for the Agent Command Center table."""
+        return {
+            "time": self.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+            "symbol": self.symbol,
+            "action": self.action,
+            "persona": self.persona,
+            "reason": self.reason
+        }
+
+
+class DecisionJournal:
+    """
+    Append-only SQLite (WAL) journal of agent decisions.
+
+    `append` only touches memory: entries go into a ring buffer that serves the UI and
+    onto a queue drained by a background writer in batches, so cycles never wait on disk.
+    Indexed by time, symbol, action and persona for queries over long histories.
+    """
+
+    def __init__(self, path: str, ring_size: int = 200, batch_size: int = 100, flush_interval: float = 1.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS decisions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                action TEXT NOT NULL,
+                persona TEXT,
+                reason TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_decisions_ts ON decisions (ts)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_decisions_symbol ON decisions (symbol, ts)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_decisions_action ON decisions (action, ts)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_decisions_persona ON decisions (persona, ts)")
+        self.conn.commit()
+
+        # Newest first; seeded from disk so the view survives restarts
+        self.ring: deque = deque(maxlen=ring_size)
+        self.ring_lock = threading.Lock()
+        for entry in self.query(limit=ring_size):
+            self.ring.append(entry)
+
+        self.queue: queue.Queue = queue.Queue()
+        self.writer = threading.Thread(target=self._write_loop, name="decision-journal-writer", daemon=True)
+        self.writer.start()
+
+    def append(self, entry: JournalEntry):
+        with self.ring_lock:
+            self.ring.appendleft(entry)
+        self.queue.put(entry)
+
+    def recent(self, limit: Optional[int] = None) -> List[JournalEntry]:
+        """Most recent entries, newest first, from memory."""
+        with self.ring_lock:
+            entries = list(self.ring)
+        return entries[:limit] if limit else entries
+
+    def query(self, symbol: Optional[str] = None, action: Optional[str] = None, persona: Optional[str] = None,
+              start: Optional[datetime] = None, end: Optional[datetime] = None, limit: int = 500) -> List[JournalEntry]:
+        """Entries matching all given filters, newest first. Only sees entries already flushed to disk."""
+        clauses, params = [], []
+        for column, value in (("symbol", symbol), ("action", action), ("persona", persona)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if start:
+            clauses.append("ts >= ?")
+            params.append(start.isoformat())
+        if end:
+            clauses.append("ts <= ?")
+            params.append(end.isoformat())
+        sql = "SELECT ts, symbol, action, persona, reason FROM decisions"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [
+            JournalEntry(timestamp=datetime.fromisoformat(ts), symbol=sym, action=act, persona=per, reason=reason)
+            for ts, sym, act, per, reason in rows
+        ]
+
+    def last_seen(self, symbols: List[str]) -> Dict[str, datetime]:
+        """Time of the latest journaled decision per symbol (symbols never seen are absent)."""
+        if not symbols:
+            return {}
+        placeholders = ", ".join("?" for _ in symbols)
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT symbol, MAX(ts) FROM decisions WHERE symbol IN ({placeholders}) GROUP BY symbol", list(symbols)
+            ).fetchall()
+        return {symbol: datetime.fromisoformat(ts) for symbol, ts in rows}
+
+    def count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+
+    def flush(self):
+        """Blocks until every appended entry is on disk."""
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(_STOP)
+        self.writer.join()
+        with self.lock:
+            self.conn.close()
+
+    def _write_loop(self):
+        while True:
+            item = self.queue.get()
+            batch = [item]
+            # Gather whatever else arrives shortly after, up to batch_size
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get(timeout=self.flush_interval))
+                except queue.Empty:
+                    break
+                if batch[-1] is _STOP:
+                    break
+
+            stop = batch[-1] is _STOP
+            entries = [e for e in batch if e is not _STOP]
+            if entries:
+                try:
+                    with self.lock:
+                        self.conn.executemany(
+                            "INSERT INTO decisions (ts, symbol, action, persona, reason) VALUES (?, ?, ?, ?, ?)",
+                            [(e.timestamp.isoformat(), e.symbol, e.action, e.persona, e.reason) for e in entries]
+                        )
+                        self.conn.commit()
+                except Exception as e:
+                    logger.error(f"Decision journal write failed ({len(entries)} entries lost): {e}")
+            for _ in batch:
+                self.queue.task_done()
+            if stop:
+                return
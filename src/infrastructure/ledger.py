@@ -0,0 +1,139 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Tuple
+import logging
+
+from src.config import settings
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None # Windows: no single-owner lock
+
+logger = logging.getLogger(__name__)
+
+
+class LedgerLocked(RuntimeError):
+    """Another process (or engine) already owns the ledger."""
+
+
+class PaperLedger:
+    """
+    Durable paper-trading account: an append-only SQLite (WAL) log of order,
+    fill and status events plus periodic state snapshots.
+
+    A restart loads the latest snapshot and replays only the events after it, so
+    restore time depends on `snapshot_every`, not on how many trades were made.
+    The full event history stays in the log.
+
+    A ledger has one owner: opening it takes an exclusive lock on `<path>.lock`
+    (held until `close`) and raises LedgerLocked if someone else holds it, since
+    two engines appending to one log would each snapshot events they never applied.
+    """
+
+    KEEP_SNAPSHOTS = 3
+
+    def __init__(self, path: str, snapshot_every: int = 200):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self._lock_file = self._acquire_owner(path + ".lock")
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                seq INTEGER PRIMARY KEY, -- last event included in the state
+                ts TEXT NOT NULL,
+                state TEXT NOT NULL
+            )
+        """)
+        self.conn.commit()
+        self.since_snapshot = 0
+
+    @staticmethod
+    def _acquire_owner(lock_path: str):
+        if fcntl is None:
+            return None
+        lock_file = open(lock_path, "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise LedgerLocked(f"Paper ledger {lock_path[:-5]} is already open (another process or engine owns it)")
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        return lock_file
+
+    def append(self, kind: str, payload: Dict[str, Any]) -> int:
+        """Writes one event and returns its sequence number."""
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO events (ts, kind, payload) VALUES (?, ?, ?)",
+                (datetime.now().isoformat(), kind, json.dumps(payload, default=str))
+            )
+            self.conn.commit()
+            self.since_snapshot += 1
+            return cursor.lastrowid
+
+    @property
+    def snapshot_due(self) -> bool:
+        return self.since_snapshot >= self.snapshot_every
+
+    def last_seq(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM events").fetchone()[0]
+
+    def write_snapshot(self, state: Dict[str, Any], seq: Optional[int] = None):
+        """Stores `state` as of event `seq` (default: the latest) and prunes older snapshots."""
+        seq = self.last_seq() if seq is None else seq
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO snapshots (seq, ts, state) VALUES (?, ?, ?)",
+                              (seq, datetime.now().isoformat(), json.dumps(state, default=str)))
+            self.conn.execute(
+                "DELETE FROM snapshots WHERE seq NOT IN (SELECT seq FROM snapshots ORDER BY seq DESC LIMIT ?)",
+                (self.KEEP_SNAPSHOTS,)
+            )
+            self.conn.commit()
+            self.since_snapshot = 0
+
+    def latest_snapshot(self) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """(seq, state) of the newest snapshot, or (0, None) for a new ledger."""
+        with self.lock:
+            row = self.conn.execute("SELECT seq, state FROM snapshots ORDER BY seq DESC LIMIT 1").fetchone()
+        return (row[0], json.loads(row[1])) if row else (0, None)
+
+    def events_after(self, seq: int) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+        with self.lock:
+            rows = self.conn.execute("SELECT seq, kind, payload FROM events WHERE seq > ? ORDER BY seq", (seq,)).fetchall()
+        for row_seq, kind, payload in rows:
+            yield row_seq, kind, json.loads(payload)
+
+    def count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+        if self._lock_file:
+            self._lock_file.close() # Releases the owner lock
+
+
+def default_paper_ledger(name: str = "paper_ledger.db") -> PaperLedger:
+    """The paper account ledger `name` under settings.DATA_DIR (the agent's account by default)."""
+    return PaperLedger(os.path.join(settings.DATA_DIR, name))
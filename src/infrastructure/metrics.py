@@ -0,0 +1,140 @@
+import csv
+import json
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+import logging
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+# Approximate list prices in USD per 1K tokens (prompt, completion).
+# Used only for cost estimates in the metrics view; update as pricing changes.
+MODEL_PRICING = {
+    "gemini-2.0-flash": (0.0001, 0.0004),
+    "gpt-4o": (0.0025, 0.01),
+}
+
+
+def percentiles(values: Sequence[float], qs: Sequence[float] = (50, 95, 99)) -> Dict[str, Optional[float]]:
+    """Returns {"p50": ..., "p95": ..., "p99": ...} for the given values (None if empty)."""
+    if not values:
+        return {f"p{int(q)}": None for q in qs}
+    result = np.percentile(np.asarray(values, dtype=float), qs)
+    return {f"p{int(q)}": float(v) for q, v in zip(qs, result)}
+
+
+def estimate_cost(model: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> Optional[float]:
+    """Estimates the USD cost of a call from token counts, if the model is priced."""
+    pricing = MODEL_PRICING.get(model)
+    if not pricing or prompt_tokens is None:
+        return None
+    prompt_price, completion_price = pricing
+    return (prompt_tokens / 1000) * prompt_price + ((completion_tokens or 0) / 1000) * completion_price
+
+
+class LLMCallRecord(BaseModel):
+    """A single LLM provider call as seen by the analyst."""
+    timestamp: datetime = Field(default_factory=datetime.now)
+    provider: str
+    model: str
+    persona: str
+    symbol: Optional[str] = None
+    latency_ms: float = 0.0
+    ttft_ms: Optional[float] = Field(default=None, description="Time to first token for streamed calls")
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cost_usd: Optional[float] = None
+    cache_hit: bool = False
+    failover: bool = Field(default=False, description="True if this call was made after the primary provider failed")
+    error: Optional[str] = Field(default=None, description="Exception class name if the call failed")
+
+
+class LLMMetrics:
+    """
+    Thread-safe rolling store of LLM call records.
+    Keeps the last `max_records` calls and computes latency/token aggregates on demand.
+    """
+
+    GROUP_FIELDS = ("provider", "model", "persona")
+
+    def __init__(self, max_records: int = 5000):
+        self.records: deque = deque(maxlen=max_records)
+        self.lock = threading.Lock()
+
+    def record(self, record: LLMCallRecord):
+        with self.lock:
+            self.records.append(record)
+
+    def reset(self):
+        with self.lock:
+            self.records.clear()
+
+    def get_records(self, provider: Optional[str] = None, persona: Optional[str] = None,
+                    since: Optional[datetime] = None) -> List[LLMCallRecord]:
+        """Returns records matching the given filters, oldest first."""
+        with self.lock:
+            records = list(self.records)
+        return [
+            r for r in records
+            if (provider is None or r.provider == provider)
+            and (persona is None or r.persona == persona)
+            and (since is None or r.timestamp >= since)
+        ]
+
+    def summary(self, group_by: Sequence[str] = ("provider", "persona"),
+                since: Optional[datetime] = None) -> List[Dict]:
+        """
+        Aggregates records into one row per group.
+
+        Each row has call/error/failover/cache-hit counts, p50/p95/p99 latency (ms)
+        over successful non-cached calls, average token counts and total cost.
+        """
+        for field in group_by:
+            if field not in self.GROUP_FIELDS:
+                raise ValueError(f"Cannot group by '{field}'")
+
+        groups: Dict[tuple, List[LLMCallRecord]] = {}
+        for r in self.get_records(since=since):
+            key = tuple(getattr(r, field) for field in group_by)
+            groups.setdefault(key, []).append(r)
+
+        rows = []
+        for key, records in sorted(groups.items()):
+            live = [r for r in records if not r.cache_hit]
+            ok = [r for r in live if r.error is None]
+            prompt_tokens = [r.prompt_tokens for r in ok if r.prompt_tokens is not None]
+            completion_tokens = [r.completion_tokens for r in ok if r.completion_tokens is not None]
+            row = dict(zip(group_by, key))
+            row.update({
+                "calls": len(records),
+                "errors": len(live) - len(ok),
+                "error_rate": (len(live) - len(ok)) / len(live) if live else 0.0,
+                "failovers": sum(1 for r in records if r.failover),
+                "cache_hits": len(records) - len(live),
+                **{f"{k}_ms": v for k, v in percentiles([r.latency_ms for r in ok]).items()},
+                "avg_prompt_tokens": float(np.mean(prompt_tokens)) if prompt_tokens else None,
+                "avg_completion_tokens": float(np.mean(completion_tokens)) if completion_tokens else None,
+                "total_cost_usd": sum((r.cost_usd or 0.0 for r in ok), 0.0),
+            })
+            rows.append(row)
+        return rows
+
+    def export_json(self, path: str):
+        """Writes all records to `path` as a JSON array."""
+        records = [r.model_dump(mode='json') for r in self.get_records()]
+        with open(path, "w") as f:
+            json.dump(records, f, indent=2)
+        logger.info(f"Exported {len(records)} LLM call records to {path}")
+
+    def export_csv(self, path: str):
+        """Writes all records to `path` as CSV."""
+        records = [r.model_dump(mode='json') for r in self.get_records()]
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(LLMCallRecord.model_fields.keys()))
+            writer.writeheader()
+            writer.writerows(records)
+        logger.info(f"Exported {len(records)} LLM call records to {path}")
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Union
 from pydantic import BaseModel, Field
 
 class Price(BaseModel):
@@ -33,9 +33,10 @@ class Stock(BaseModel):
     history: List[Price] = []
     indicators: Optional[TechnicalIndicators] = None
     valuation_metrics: Dict[str, float] = {}
-    fundamentals: Dict[str, float] = Field(default_factory=dict, description="Key fundamental metrics like PE, EPS")
+    fundamentals: Dict[str, Union[float, str]] = Field(default_factory=dict, description="Key fundamental metrics like PE, EPS (plus Sector/Industry names)")
     sentiment_score: Optional[float] = Field(None, description="News sentiment score (-1 to 1)")
     sentiment_summary: Optional[str] = Field(None, description="Summary of news sentiment")
+    latest_news_id: Optional[str] = Field(None, description="Id of the most recent news item seen")
     last_updated: datetime = Field(default_factory=datetime.now)
 
     class Config:
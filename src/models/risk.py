@@ -1,3 +1,5 @@
+from datetime import datetime
+from typing import Optional
 from pydantic import BaseModel, Field
 
 class RiskSettings(BaseModel):
@@ -6,3 +8,23 @@ class RiskSettings(BaseModel):
     max_daily_loss: float = Field(default=500.0, description="Maximum allowable loss per day before stopping trading")
     max_drawdown_pct: float = Field(default=0.02, description="Maximum portfolio drawdown percentage (e.g., 0.02 for 2%)")
     max_open_positions: int = Field(default=5, description="Maximum number of concurrent open positions")
+
+class AllocationSettings(BaseModel):
+    """How the agent sizes the buys of a cycle (see src/analysis/allocation.py)."""
+    method: str = Field(default="vol_target", description="'vol_target', 'kelly', 'mean_variance' or 'fixed' (one $1,000 buy per cycle)")
+    target_volatility: float = Field(default=0.10, description="Annualized volatility of a cycle's buys, as a fraction of equity (vol_target)")
+    kelly_fraction: float = Field(default=0.25, description="Fraction of the full Kelly bet to take (kelly)")
+    view_sharpe: float = Field(default=1.0, description="Annualized Sharpe ratio implied by a 100%-confidence AI buy (kelly, mean_variance)")
+    max_gross_pct: float = Field(default=0.25, description="Most of equity one cycle can commit (also capped by buying power)")
+    lookback_days: int = Field(default=60, description="Daily returns used to estimate volatility and correlation")
+    shrinkage: float = Field(default=0.2, description="Weight of the diagonal in the shrunk covariance estimate")
+
+class RiskRejection(BaseModel):
+    """An order the pre-trade risk checks refused."""
+    timestamp: datetime
+    symbol: str
+    side: str
+    quantity: float
+    price: Optional[float] = None
+    rule: str # max_position_size, max_daily_loss, max_drawdown_pct, max_open_positions
+    detail: str
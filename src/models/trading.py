@@ -1,7 +1,8 @@
 from datetime import datetime
 from typing import List, Dict, Optional
 from enum import Enum
-from pydantic import BaseModel, Field
+import numpy as np
+from pydantic import BaseModel, Field, PrivateAttr
 
 class OrderSide(str, Enum):
     BUY = "BUY"
@@ -10,25 +11,66 @@ class OrderSide(str, Enum):
 class OrderType(str, Enum):
     MARKET = "MARKET"
     LIMIT = "LIMIT"
+    STOP = "STOP" # Market order once the stop price trades
+    STOP_LIMIT = "STOP_LIMIT" # Limit order at `price` once the stop price trades
+    TRAILING_STOP = "TRAILING_STOP" # Stop that follows the best price by trail_amount/trail_percent
 
 class OrderStatus(str, Enum):
     PENDING = "PENDING"
+    PARTIALLY_FILLED = "PARTIALLY_FILLED" # Still working; filled_quantity < quantity
     FILLED = "FILLED"
     CANCELLED = "CANCELLED"
     REJECTED = "REJECTED"
 
+OPEN_STATUSES = (OrderStatus.PENDING, OrderStatus.PARTIALLY_FILLED)
+
 class Order(BaseModel):
     """Represents a trading order."""
     id: str
+    client_order_id: Optional[str] = None # Our idempotency key at the broker
     symbol: str
     side: OrderSide
     order_type: OrderType
     quantity: int
-    price: Optional[float] = None # Required for LIMIT orders
+    price: Optional[float] = None # Required for LIMIT and STOP_LIMIT orders
+    stop_price: Optional[float] = None # Trigger for STOP/STOP_LIMIT; current level for TRAILING_STOP
+    trail_amount: Optional[float] = None # TRAILING_STOP distance in dollars...
+    trail_percent: Optional[float] = None # ...or in percent of the best price
+    oco_group: Optional[str] = None # Filling one order of the group cancels the rest
+    parent_id: Optional[str] = None # Bracket exit: inactive until the parent order fills
     status: OrderStatus = OrderStatus.PENDING
     created_at: datetime = Field(default_factory=datetime.now)
     filled_at: Optional[datetime] = None
-    filled_price: Optional[float] = None
+    filled_price: Optional[float] = None # Average price of the fills so far
+    filled_quantity: float = 0.0
+
+class OrderEventType(str, Enum):
+    NEW = "NEW"
+    PARTIAL_FILL = "PARTIAL_FILL"
+    FILL = "FILL"
+    CANCELED = "CANCELED"
+    REJECTED = "REJECTED"
+    EXPIRED = "EXPIRED"
+
+class OrderEvent(BaseModel):
+    """A broker update for one order. Fill quantities are cumulative, so replays and duplicates are harmless."""
+    event: OrderEventType
+    order_id: str
+    symbol: str
+    side: OrderSide
+    filled_quantity: float = 0.0 # Total filled so far
+    filled_avg_price: Optional[float] = None
+    price: Optional[float] = None # Price of the fill that triggered this event
+    timestamp: datetime = Field(default_factory=datetime.now)
+
+class FillModelSettings(BaseModel):
+    """How the paper engine and backtests fill orders (see src/execution/fill_model.py)."""
+    model: str = Field(default="realistic", description="'realistic' (costs, partial fills, latency) or 'ideal' (fill everything at the quoted price)")
+    spread_bps: float = Field(default=2.0, description="Quoted bid/ask spread; market orders pay half of it")
+    slippage_bps: float = Field(default=10.0, description="Slippage at 100% of bar volume, scaled linearly by participation")
+    impact_bps: float = Field(default=50.0, description="Market impact at 100% of bar volume, scaled by the square root of participation")
+    max_participation: float = Field(default=0.1, description="Largest fraction of a bar's volume one symbol's orders can fill; the rest waits")
+    latency_ticks: int = Field(default=0, description="Price updates (bars) an order waits before it can fill")
 
 class Trade(BaseModel):
     """Represents a completed trade."""
@@ -56,11 +98,99 @@ class Position(BaseModel):
     def unrealized_pnl(self) -> float:
         return (self.current_price - self.average_price) * self.quantity
 
-class Portfolio(BaseModel):
+class PortfolioValuation:
+    """
+    Incremental accounting for a portfolio with `cash` and `positions`.
+
+    Market value and cost basis are running totals updated by each fill and price
+    mark, so valuation reads are O(1); `mark_many` re-marks a batch of symbols in
+    one NumPy pass. Positions must be changed through `apply_fill`/`mark` for the
+    totals to stay right (`revalue` recomputes them from scratch).
+    """
+
+    __slots__ = ()
+    VECTORIZE_MIN = 16 # Below this many symbols a plain loop beats NumPy's call overhead
+
+    def _new_position(self, symbol: str, quantity: int, price: float):
+        return Position(symbol=symbol, quantity=quantity, average_price=price, current_price=price)
+
+    def revalue(self):
+        positions = self.positions.values()
+        self._market_value = sum(p.quantity * p.current_price for p in positions)
+        self._cost_basis = sum(p.quantity * p.average_price for p in positions)
+
+    def apply_fill(self, symbol: str, side: OrderSide, quantity: int, price: float) -> float:
+        """Updates the position for a fill (cash is the caller's) and returns the realized P&L."""
+        position = self.positions.get(symbol)
+        realized = 0.0
+        if side == OrderSide.BUY:
+            if position:
+                self._market_value -= position.quantity * position.current_price
+                total_qty = position.quantity + quantity
+                position.average_price = (position.quantity * position.average_price + quantity * price) / total_qty
+                position.quantity = total_qty
+                position.current_price = price
+            else:
+                position = self.positions[symbol] = self._new_position(symbol, quantity, price)
+            self._market_value += position.quantity * price
+            self._cost_basis += quantity * price
+        elif position:
+            self._market_value -= position.quantity * position.current_price
+            self._cost_basis -= quantity * position.average_price
+            realized = (price - position.average_price) * quantity
+            position.quantity -= quantity
+            position.current_price = price
+            self._market_value += position.quantity * price
+            if position.quantity == 0:
+                del self.positions[symbol]
+        self.realized_pnl += realized
+        return realized
+
+    def mark(self, symbol: str, price: float):
+        position = self.positions.get(symbol)
+        if position:
+            self._market_value += position.quantity * (price - position.current_price)
+            position.current_price = price
+
+    def mark_many(self, prices: Dict[str, float]):
+        """Re-marks every held symbol in `prices` at once."""
+        held = [(self.positions[s], p) for s, p in prices.items() if p and s in self.positions]
+        if len(held) < self.VECTORIZE_MIN:
+            for pos, price in held:
+                if price != pos.current_price:
+                    self._market_value += pos.quantity * (price - pos.current_price)
+                    pos.current_price = price
+            return
+        quantity = np.fromiter((pos.quantity for pos, _ in held), dtype=float, count=len(held))
+        old = np.fromiter((pos.current_price for pos, _ in held), dtype=float, count=len(held))
+        new = np.fromiter((p for _, p in held), dtype=float, count=len(held))
+        self._market_value += float(quantity @ (new - old))
+        for (pos, _), price in zip(held, new.tolist()):
+            pos.current_price = price
+
+    @property
+    def market_value(self) -> float:
+        return self._market_value
+
+    @property
+    def cost_basis(self) -> float:
+        return self._cost_basis
+
+    @property
+    def unrealized_pnl(self) -> float:
+        return self._market_value - self._cost_basis
+
+    @property
+    def total_value(self) -> float:
+        return self.cash + self._market_value
+
+class Portfolio(PortfolioValuation, BaseModel):
     """Represents the trader's portfolio."""
     cash: float
     positions: Dict[str, Position] = {}
-    
-    @property
-    def total_value(self) -> float:
-        return self.cash + sum(p.market_value for p in self.positions.values())
+    realized_pnl: float = 0.0
+    _market_value: float = PrivateAttr(0.0)
+    _cost_basis: float = PrivateAttr(0.0)
+
+    def model_post_init(self, __context):
+        self.revalue()
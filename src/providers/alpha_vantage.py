@@ -9,6 +9,8 @@ from src.infrastructure.throttling import RateLimiter
 class AlphaVantageProvider(StockDataProvider):
     """Implementation of StockDataProvider using Alpha Vantage."""
 
+    BASE_URL = "https://www.alphavantage.co/query"
+
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or os.getenv('ALPHA_VANTAGE_API_KEY')
         
@@ -67,14 +69,12 @@ class AlphaVantageProvider(StockDataProvider):
         if not self.api_key:
             return []
             
-        import requests
-        url = f"https://www.alphavantage.co/query?function=NEWS_SENTIMENT&apikey={self.api_key}&limit={limit}"
+        params = {"function": "NEWS_SENTIMENT", "limit": limit}
         if symbol:
-            url += f"&tickers={symbol}"
+            params["tickers"] = symbol
             
         try:
-            response = requests.get(url)
-            data = response.json()
+            data = self.query(**params)
             if "feed" not in data:
                 # Log error or rate limit message
                 if "Note" in data:
@@ -91,12 +91,8 @@ class AlphaVantageProvider(StockDataProvider):
         if not self.api_key:
             return {}
             
-        import requests
-        url = f"https://www.alphavantage.co/query?function=OVERVIEW&symbol={symbol}&apikey={self.api_key}"
-        
         try:
-            response = requests.get(url)
-            data = response.json()
+            data = self.query(function="OVERVIEW", symbol=symbol)
             
             if not data or "Symbol" not in data:
                 return {}
@@ -116,6 +112,12 @@ class AlphaVantageProvider(StockDataProvider):
             print(f"Error fetching fundamentals: {e}")
             return {}
 
+    def query(self, **params) -> dict:
+        """Calls the Alpha Vantage query endpoint and returns the decoded JSON payload."""
+        import requests
+        response = requests.get(self.BASE_URL, params={**params, "apikey": self.api_key})
+        return response.json()
+
     def get_current_price(self, symbol: str) -> float:
         # Global Quote endpoint for current price
         # Note: This requires a separate call and might hit rate limits on free tier
@@ -0,0 +1,174 @@
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+from src.config import settings
+from src.execution.alpaca_engine import AlpacaExecutionEngine
+from src.infrastructure.ipc import IPCClient
+from src.models.risk import RiskSettings, AllocationSettings
+from src.services.job_queue import AgentJobQueue
+from src.services.portfolio_manager import PortfolioManager
+from src.services.scheduler import AgentScheduler
+
+# Calls the UI may make on the agent; also the worker's IPC whitelist
+AGENT_METHODS = (
+    "status", "submit_cycle", "cancel_job", "jobs", "decisions", "query_journal",
+    "cycle_report", "llm_summary", "llm_records", "set_trading_enabled", "set_risk_settings",
+    "risk_report", "order_report", "set_allocation_settings", "account", "positions", "sync_broker", "liquidate_all",
+    "set_alpaca_mode",
+)
+
+
+def _as_datetime(value: Union[datetime, str, None]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+class LocalAgent:
+    """
+    The agent API over an in-process stack (PortfolioManager, job queue, scheduler).
+    The headless worker serves exactly this object over IPC; results are plain JSON-able data.
+    """
+
+    def __init__(self, portfolio_manager: PortfolioManager, job_queue: AgentJobQueue, scheduler: AgentScheduler):
+        self.portfolio_manager = portfolio_manager
+        self.job_queue = job_queue
+        self.scheduler = scheduler
+
+    def status(self) -> Dict:
+        next_run = self.scheduler.get_next_run()
+        return {
+            "pid": os.getpid(),
+            "trading_enabled": settings.TRADING_ENABLED,
+            "broker": "alpaca" if isinstance(self.portfolio_manager.engine, AlpacaExecutionEngine) else "paper",
+            "alpaca_paper": settings.ALPACA_PAPER,
+            "next_run": next_run.isoformat() if next_run else None,
+            "warmup": self.scheduler.warmer.last_report,
+        }
+
+    def submit_cycle(self, persona: str = "General", watchlist: List[str] = None, max_stocks: Optional[int] = 10,
+                     budget_seconds: Optional[float] = None, name: str = "Manual") -> Dict:
+        job = self.job_queue.submit(name, persona=persona, watchlist=watchlist or [], max_stocks=max_stocks,
+                                    budget_seconds=budget_seconds)
+        return job.to_row()
+
+    def cancel_job(self, job_id: int) -> bool:
+        return self.job_queue.cancel(job_id)
+
+    def jobs(self, limit: int = 10) -> Dict[str, List[Dict]]:
+        return {
+            "pending": [j.to_row() for j in self.job_queue.pending()],
+            "recent": [j.to_row() for j in self.job_queue.recent(limit) if not j.active],
+        }
+
+    def decisions(self, limit: Optional[int] = None) -> List[Dict]:
+        return self.portfolio_manager.decisions_log[:limit] if limit else self.portfolio_manager.decisions_log
+
+    def query_journal(self, symbol: str = None, action: str = None, persona: str = None,
+                      start: Union[datetime, str, None] = None, end: Union[datetime, str, None] = None,
+                      limit: int = 500) -> Dict:
+        journal = self.portfolio_manager.journal
+        entries = journal.query(symbol=symbol, action=action, persona=persona,
+                                start=_as_datetime(start), end=_as_datetime(end), limit=limit)
+        return {"entries": [e.to_row() for e in entries], "total": journal.count()}
+
+    def cycle_report(self) -> Dict:
+        return {"stats": self.portfolio_manager.last_cycle_stats, "skipped": self.portfolio_manager.last_cycle_skipped}
+
+    def llm_summary(self) -> List[Dict]:
+        return self.portfolio_manager.ai_analyst.metrics.summary()
+
+    def llm_records(self) -> List[Dict]:
+        return [r.model_dump(mode='json') for r in self.portfolio_manager.ai_analyst.metrics.get_records()]
+
+    def risk_report(self) -> Dict:
+        risk = getattr(self.portfolio_manager.engine, "risk", None)
+        if not risk:
+            return {"state": None, "rejections": []}
+        return {"state": risk.snapshot(), "rejections": [r.model_dump(mode='json') for r in risk.recent_rejections()]}
+
+    def order_report(self) -> Dict:
+        """Live broker orders and fill latency, when the engine tracks orders from a stream."""
+        tracker = getattr(self.portfolio_manager.engine, "tracker", None)
+        if not tracker:
+            return {"open": None, "latency": {}}
+        columns = ("id", "symbol", "side", "quantity", "filled_quantity", "filled_price", "status", "created_at")
+        return {
+            "open": [o.model_dump(mode='json', include=set(columns)) for o in tracker.open_orders()],
+            "latency": tracker.latency_stats(),
+        }
+
+    def account(self) -> Dict:
+        """The agent's trading account (the broker's, or its durable paper account)."""
+        account = self.portfolio_manager.engine.get_account()
+        return {
+            "equity": float(account.equity),
+            "buying_power": float(account.buying_power),
+            "last_equity": float(account.last_equity),
+            "status": str(account.status),
+        }
+
+    def positions(self) -> List[Dict]:
+        columns = ("symbol", "qty", "market_value", "unrealized_pl", "unrealized_plpc", "current_price", "avg_entry_price")
+        return [{c: getattr(p, c) for c in columns} for p in self.portfolio_manager.engine.get_positions()]
+
+    def sync_broker(self) -> bool:
+        """Reconciles the engine with the broker now; False if it has nothing to sync (paper)."""
+        engine = self.portfolio_manager.engine
+        if not hasattr(engine, "refresh"):
+            return False
+        engine.refresh()
+        return True
+
+    def liquidate_all(self) -> List[Dict]:
+        return [r.to_row() for r in self.portfolio_manager.engine.liquidate_all()]
+
+    def set_alpaca_mode(self, paper: bool) -> Dict:
+        """Switches the agent to a fresh Alpaca engine for paper or live trading; returns the new status."""
+        previous_mode = settings.ALPACA_PAPER
+        settings.ALPACA_PAPER = paper
+        try:
+            engine = AlpacaExecutionEngine()
+        except Exception:
+            settings.ALPACA_PAPER = previous_mode
+            raise
+        self.use_engine(engine)
+        return self.status()
+
+    def use_engine(self, engine):
+        """Points the agent (cycles, order events, cache warm-up) at `engine` and closes the Alpaca engine it replaces."""
+        previous = self.portfolio_manager.engine
+        self.portfolio_manager.engine = engine
+        self.portfolio_manager.watch_orders(engine)
+        self.scheduler.warmer.engine = engine
+        if isinstance(previous, AlpacaExecutionEngine) and previous is not engine:
+            previous.close() # Its trade-updates stream
+
+    def set_trading_enabled(self, enabled: bool) -> bool:
+        settings.TRADING_ENABLED = enabled
+        return settings.TRADING_ENABLED
+
+    def set_risk_settings(self, **risk) -> Dict:
+        settings.RISK_SETTINGS = RiskSettings(**{**settings.RISK_SETTINGS.model_dump(), **risk})
+        return settings.RISK_SETTINGS.model_dump()
+
+    def set_allocation_settings(self, **allocation) -> Dict:
+        settings.ALLOCATION_SETTINGS = AllocationSettings(**{**settings.ALLOCATION_SETTINGS.model_dump(), **allocation})
+        return settings.ALLOCATION_SETTINGS.model_dump()
+
+
+class RemoteAgent:
+    """The same API as LocalAgent, forwarded to the headless worker (src/worker.py) over its Unix socket."""
+
+    # Calls that outlast the default timeout: liquidation waits for cancels, then retries
+    # rate-limited submits, and must not be reported as failed while the worker is still at it
+    SLOW_METHODS = {"liquidate_all": 180.0}
+
+    def __init__(self, socket_path: str, timeout: float = 5.0):
+        self.client = IPCClient(socket_path, timeout=timeout)
+        self.slow_clients = {m: IPCClient(socket_path, timeout=t) for m, t in self.SLOW_METHODS.items()}
+
+    def __getattr__(self, method: str):
+        if method not in AGENT_METHODS:
+            raise AttributeError(method)
+        client = self.slow_clients.get(method, self.client)
+        return lambda **params: client.call(method, **params)
@@ -0,0 +1,86 @@
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+
+from src.services.market_data import MarketDataService
+from src.services.scanner import MarketScanner
+
+logger = logging.getLogger(__name__)
+
+
+class CacheWarmer:
+    """
+    Prefetches what the next agent cycle will read (bars, fundamentals, news and
+    indicators) for holdings, the watchlist and the predicted scan list.
+
+    Symbols are warmed most-important-first through the normal provider path, so the
+    providers' own rate limiters pace the calls; warming stops once the next symbol
+    would not finish before `deadline`, leaving the rate-limit budget to the cycle.
+    """
+
+    def __init__(self, market_data: MarketDataService, engine, scanner: MarketScanner):
+        self.market_data = market_data
+        self.engine = engine
+        self.scanner = scanner
+        self.lock = threading.Lock()
+        self.last_report: Optional[Dict] = None
+
+    def predict_symbols(self, watchlist: List[str] = None, max_candidates: Optional[int] = None) -> List[str]:
+        """Holdings first, then the scan list the cycle is expected to walk."""
+        symbols = []
+        try:
+            symbols.extend(p.symbol for p in self.engine.get_positions())
+        except Exception as e:
+            logger.warning(f"Warm-up could not load positions: {e}")
+        try:
+            symbols.extend(self.scanner.get_scan_list(watchlist)[:max_candidates])
+        except Exception as e:
+            logger.warning(f"Warm-up could not build scan list: {e}")
+        return list(dict.fromkeys(symbols))
+
+    def warm(self, deadline: datetime, watchlist: List[str] = None, max_candidates: Optional[int] = None) -> Dict:
+        """
+        Warms the cache until `deadline` (aware or naive datetime, compared in its own timezone).
+        Entries are kept until a little after the deadline so the cycle still finds them.
+        """
+        if not self.lock.acquire(blocking=False):
+            logger.warning("Warm-up skipped: already running.")
+            return {}
+        try:
+            start = time.monotonic()
+            now = datetime.now(deadline.tzinfo)
+            seconds_left = (deadline - now).total_seconds()
+            ttl = int(seconds_left + self.market_data.ANALYSIS_TTL)
+            report = {"started": now.strftime("%H:%M:%S"), "warmed": [], "already_warm": [], "failed": [], "skipped": []}
+
+            symbols = self.predict_symbols(watchlist, max_candidates)
+            durations = []
+            for i, symbol in enumerate(symbols):
+                if self.market_data.get_cached_analysis(symbol):
+                    report["already_warm"].append(symbol)
+                    continue
+                # Stop once the next fetch would not finish in time (median of fetches so far)
+                expected = sorted(durations)[len(durations) // 2] if durations else 0.0
+                if time.monotonic() - start + expected > seconds_left:
+                    report["skipped"] = symbols[i:]
+                    break
+                fetch_start = time.monotonic()
+                try:
+                    self.market_data.analyze_and_cache(self.market_data.fetch_stock(symbol), ttl=ttl)
+                    report["warmed"].append(symbol)
+                except Exception as e:
+                    logger.warning(f"Warm-up failed for {symbol}: {e}")
+                    report["failed"].append(symbol)
+                durations.append(time.monotonic() - fetch_start)
+
+            report["elapsed_s"] = round(time.monotonic() - start, 1)
+            logger.info(
+                f"Cache warm-up: {len(report['warmed'])} warmed, {len(report['already_warm'])} already warm, "
+                f"{len(report['failed'])} failed, {len(report['skipped'])} skipped in {report['elapsed_s']}s"
+            )
+            self.last_report = report
+            return report
+        finally:
+            self.lock.release()
@@ -0,0 +1,195 @@
+import heapq
+import itertools
+import threading
+from datetime import datetime
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from src.services.portfolio_manager import PortfolioManager
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first. Scheduled runs are tied to the market clock, so they go ahead of clicks.
+PRIORITY_SCHEDULED = 0
+PRIORITY_MANUAL = 1
+
+
+class JobStatus(str, Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+    SKIPPED = "SKIPPED" # run_cycle declined to run (kill switch, another cycle busy)
+    CANCELLED = "CANCELLED"
+
+
+class AgentJob:
+    """One requested agent cycle and its progress."""
+
+    def __init__(self, job_id: int, name: str, priority: int, params: Dict):
+        self.id = job_id
+        self.name = name
+        self.priority = priority
+        self.params = params
+        self.status = JobStatus.QUEUED
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.progress = 0.0
+        self.message = "Queued"
+        self.merged = 0 # Identical requests folded into this job
+        self.error: Optional[str] = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def key(self) -> Tuple:
+        """Jobs with the same key do the same work and can be coalesced."""
+        return tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in self.params.items()))
+
+    @property
+    def active(self) -> bool:
+        return self.status in (JobStatus.QUEUED, JobStatus.RUNNING)
+
+    def to_row(self) -> Dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status.value,
+            "progress": self.progress,
+            "message": self.message,
+            "merged": self.merged,
+            "created": self.created_at.strftime("%H:%M:%S"),
+            "finished": self.finished_at.strftime("%H:%M:%S") if self.finished_at else ""
+        }
+
+
+class AgentJobQueue:
+    """
+    Serializes manual and scheduled agent cycles through one worker thread.
+
+    `submit` returns immediately. A request identical to one still queued is merged into
+    it instead of being dropped or run twice; queued jobs can be cancelled, and running
+    ones stop before starting further work.
+    """
+
+    def __init__(self, portfolio_manager: PortfolioManager, history_size: int = 50):
+        self.portfolio_manager = portfolio_manager
+        self.history_size = history_size
+        self.heap: List[Tuple[int, int, AgentJob]] = []
+        self.jobs: Dict[int, AgentJob] = {}
+        self.ids = itertools.count(1)
+        self.cond = threading.Condition()
+        self.current: Optional[AgentJob] = None
+        self.running = True
+        self.thread = threading.Thread(target=self._run_loop, name="agent-job-worker", daemon=True)
+        self.thread.start()
+
+    def submit(self, name: str, priority: int = PRIORITY_MANUAL, **params) -> AgentJob:
+        """Queues an agent cycle (run_cycle keyword arguments) and returns its job."""
+        with self.cond:
+            job = AgentJob(0, name, priority, params)
+            for _, _, queued in self.heap:
+                if queued.status == JobStatus.QUEUED and queued.key == job.key:
+                    queued.merged += 1
+                    if priority < queued.priority:
+                        # Re-queue at the more urgent priority; the old heap entry is skipped as stale
+                        queued.priority = priority
+                        heapq.heappush(self.heap, (priority, queued.id, queued))
+                    logger.info(f"Job '{name}' merged into queued job #{queued.id}")
+                    return queued
+
+            job.id = next(self.ids)
+            self.jobs[job.id] = job
+            heapq.heappush(self.heap, (priority, job.id, job))
+            self._trim_history()
+            self.cond.notify()
+        logger.info(f"Queued agent job #{job.id} '{name}'")
+        return job
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancels a queued job, or asks a running one to stop. Returns False if it already finished."""
+        with self.cond:
+            job = self.jobs.get(job_id)
+            if not job or not job.active:
+                return False
+            job.cancel_event.set()
+            if job.status == JobStatus.QUEUED:
+                self._finish(job, JobStatus.CANCELLED, "Cancelled before start")
+            else:
+                job.message = "Cancelling..."
+            return True
+
+    def get(self, job_id: int) -> Optional[AgentJob]:
+        return self.jobs.get(job_id)
+
+    def recent(self, limit: int = 20) -> List[AgentJob]:
+        """Jobs newest first."""
+        with self.cond:
+            return sorted(self.jobs.values(), key=lambda j: j.id, reverse=True)[:limit]
+
+    def pending(self) -> List[AgentJob]:
+        """Running job first, then queued jobs in run order."""
+        with self.cond:
+            queued = sorted({j.id: j for _, _, j in self.heap if j.status == JobStatus.QUEUED}.values(),
+                            key=lambda j: (j.priority, j.id))
+            return ([self.current] if self.current else []) + queued
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        self.thread.join(timeout=1)
+
+    def _next_job(self) -> Optional[AgentJob]:
+        with self.cond:
+            while self.running:
+                while self.heap:
+                    priority, _, job = heapq.heappop(self.heap)
+                    # Skip cancelled jobs and stale entries left behind by a priority bump
+                    if job.status == JobStatus.QUEUED and priority == job.priority:
+                        job.status = JobStatus.RUNNING
+                        job.started_at = datetime.now()
+                        job.message = "Starting"
+                        self.current = job
+                        return job
+                self.cond.wait()
+        return None
+
+    def _run_loop(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+
+            def progress(finished: int, submitted: int, scan_done: bool, job=job):
+                job.progress = finished / submitted if scan_done and submitted else finished / (submitted + 1)
+                job.message = f"{finished}/{submitted}{'' if scan_done else '+'} symbols processed"
+
+            try:
+                skipped = self.portfolio_manager.run_cycle(progress=progress, cancel_event=job.cancel_event, **job.params)
+                if skipped:
+                    self._finish(job, JobStatus.SKIPPED, f"Skipped: {skipped}")
+                elif job.cancel_event.is_set():
+                    self._finish(job, JobStatus.CANCELLED, f"Cancelled ({job.message})")
+                else:
+                    self._finish(job, JobStatus.DONE, job.message if job.progress else "Done")
+            except Exception as e:
+                logger.error(f"Agent job #{job.id} failed: {e}")
+                job.error = str(e)
+                self._finish(job, JobStatus.FAILED, str(e))
+
+    def _finish(self, job: AgentJob, status: JobStatus, message: str):
+        with self.cond:
+            job.status = status
+            job.message = message
+            job.finished_at = datetime.now()
+            if status == JobStatus.DONE:
+                job.progress = 1.0
+            if self.current is job:
+                self.current = None
+
+    def _trim_history(self):
+        finished = sorted((j for j in self.jobs.values() if not j.active), key=lambda j: j.id)
+        for job in finished[:max(0, len(self.jobs) - self.history_size)]:
+            del self.jobs[job.id]
@@ -0,0 +1,108 @@
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+MARKET_TZ = ZoneInfo("America/New_York")
+
+REGULAR_OPEN = time(9, 30)
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th given weekday (Mon=0) of a month; n=-1 for the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _observed(day: date) -> date:
+    """Saturday holidays are observed on Friday, Sunday holidays on Monday."""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+class MarketCalendar:
+    """
+    NYSE trading calendar: weekends, full-day holidays and 13:00 early closes,
+    computed from the exchange's rules (no data files or network calls).
+    All times are in America/New_York.
+    """
+
+    tz = MARKET_TZ
+
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def holidays(year: int) -> Dict[date, str]:
+        days = {
+            _nth_weekday(year, 1, 0, 3): "Martin Luther King Jr. Day",
+            _nth_weekday(year, 2, 0, 3): "Washington's Birthday",
+            _easter(year) - timedelta(days=2): "Good Friday",
+            _nth_weekday(year, 5, 0, -1): "Memorial Day",
+            _observed(date(year, 7, 4)): "Independence Day",
+            _nth_weekday(year, 9, 0, 1): "Labor Day",
+            _nth_weekday(year, 11, 3, 4): "Thanksgiving Day",
+            _observed(date(year, 12, 25)): "Christmas Day",
+        }
+        # New Year's Day on a Saturday is not observed on the prior Friday (NYSE rule)
+        new_year = date(year, 1, 1)
+        if new_year.weekday() != 5:
+            days[_observed(new_year)] = "New Year's Day"
+        if year >= 2022:
+            days[_observed(date(year, 6, 19))] = "Juneteenth"
+        return days
+
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def early_closes(year: int) -> Dict[date, str]:
+        days = {_nth_weekday(year, 11, 3, 4) + timedelta(days=1): "Day after Thanksgiving"}
+        christmas_eve = date(year, 12, 24)
+        if christmas_eve.weekday() < 5:
+            days[christmas_eve] = "Christmas Eve"
+        july_3 = date(year, 7, 3)
+        if july_3.weekday() < 4: # Mon-Thu; a Friday July 3rd is the observed holiday itself
+            days[july_3] = "Independence Day Eve"
+        return {d: name for d, name in days.items() if d not in MarketCalendar.holidays(year)}
+
+    def is_trading_day(self, day: date) -> bool:
+        return day.weekday() < 5 and day not in self.holidays(day.year)
+
+    def session(self, day: date) -> Optional[Tuple[datetime, datetime]]:
+        """Regular session (open, close) for a day, or None if the market is closed."""
+        if not self.is_trading_day(day):
+            return None
+        close = EARLY_CLOSE if day in self.early_closes(day.year) else REGULAR_CLOSE
+        return datetime.combine(day, REGULAR_OPEN, self.tz), datetime.combine(day, close, self.tz)
+
+    def is_open(self, moment: Optional[datetime] = None) -> bool:
+        moment = self.now() if moment is None else moment.astimezone(self.tz)
+        session = self.session(moment.date())
+        return bool(session) and session[0] <= moment < session[1]
+
+    def next_trading_day(self, day: date) -> date:
+        """The first trading day on or after `day`."""
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return day
+
+    def now(self) -> datetime:
+        return datetime.now(self.tz)
@@ -4,6 +4,7 @@ from src.models.domain import Stock
 from src.providers.base import StockDataProvider
 from src.providers.yahoo import YahooFinanceProvider
 from src.analysis.technical import TechnicalAnalyzer
+from src.analysis.fingerprint import news_id
 from src.infrastructure.cache import RedisCache
 import logging
 
@@ -15,12 +16,16 @@ from src.providers.alpha_vantage import AlphaVantageProvider
 class MarketDataService:
     """Service to fetch market data with caching and analysis."""
     
-    def __init__(self, provider: StockDataProvider = None, cache: RedisCache = None):
-        self.yahoo_provider = YahooFinanceProvider()
+    ANALYSIS_TTL = 300 # 5 min cache for analyzed stocks
+    
+    def __init__(self, provider: StockDataProvider = None, cache: RedisCache = None, fallback_provider: StockDataProvider = None):
+        self.yahoo_provider = fallback_provider or YahooFinanceProvider()
         self.av_provider = None
         
         if provider:
             self.primary_provider = provider
+            if isinstance(provider, AlphaVantageProvider):
+                self.av_provider = provider
         elif settings.ALPHA_VANTAGE_API_KEY:
             logger.info("Using Alpha Vantage Provider as Primary")
             self.av_provider = AlphaVantageProvider(api_key=settings.ALPHA_VANTAGE_API_KEY)
@@ -36,17 +41,29 @@ class MarketDataService:
         Get stock data with full analysis. Tries cache first.
         Implements failover: Alpha Vantage -> Yahoo Finance.
         """
-        cache_key = f"stock_analysis:{symbol}"
-        
         if not force_refresh:
-            try:
-                cached_data = self.cache.get(cache_key)
-                if cached_data:
-                    logger.info(f"Cache hit for {symbol}")
-                    return Stock.model_validate(cached_data)
-            except Exception as e:
-                logger.warning(f"Cache read failed: {e}")
+            cached = self.get_cached_analysis(symbol)
+            if cached:
+                return cached
                 
+        return self.analyze_and_cache(self.fetch_stock(symbol))
+
+    def get_cached_analysis(self, symbol: str) -> Optional[Stock]:
+        """Returns the cached analyzed stock, or None on a miss."""
+        try:
+            cached_data = self.cache.get(f"stock_analysis:{symbol}")
+            if cached_data:
+                logger.info(f"Cache hit for {symbol}")
+                return Stock.model_validate(cached_data)
+        except Exception as e:
+            logger.warning(f"Cache read failed: {e}")
+        return None
+
+    def fetch_stock(self, symbol: str) -> Stock:
+        """
+        Fetches raw stock data (prices, plus fundamentals and sentiment when available)
+        from the providers, without indicators or caching.
+        """
         logger.info(f"Fetching fresh data for {symbol}")
         
         stock = None
@@ -68,6 +85,7 @@ class MarketDataService:
                         stock.sentiment_score = sum(scores) / len(scores) if scores else 0
                         # Use the summary of the most relevant/recent news
                         stock.sentiment_summary = sentiment_data[0].get('summary', '') if sentiment_data else None
+                        stock.latest_news_id = news_id(sentiment_data[0])
                         
                 except Exception as e:
                     logger.warning(f"Failed to fetch rich data from Alpha Vantage: {e}")
@@ -88,21 +106,24 @@ class MarketDataService:
         
         if not stock:
             raise Exception(f"Failed to fetch data for {symbol}")
+        return stock
 
+    def analyze_and_cache(self, stock: Stock, ttl: Optional[int] = None) -> Stock:
+        """Calculates indicators for a fetched stock and caches the result for `ttl` seconds."""
         try:
             # Run analysis
             stock.indicators = TechnicalAnalyzer.calculate_indicators(stock)
             
             # Cache result (serialize to dict/json)
             try:
-                self.cache.set(cache_key, stock.model_dump(mode='json'), expire=300) # 5 min cache
+                self.cache.set(f"stock_analysis:{stock.symbol}", stock.model_dump(mode='json'), expire=ttl or self.ANALYSIS_TTL)
             except Exception as e:
                 logger.warning(f"Cache write failed: {e}")
             
             return stock
             
         except Exception as e:
-            logger.error(f"Analysis failed for {symbol}: {e}")
+            logger.error(f"Analysis failed for {stock.symbol}: {e}")
             raise e
 
     def get_market_news(self, symbol: str = None, limit: int = 5) -> list:
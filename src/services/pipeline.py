@@ -0,0 +1,270 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+
+from src.infrastructure.metrics import percentiles
+
+logger = logging.getLogger(__name__)
+
+_DONE = object() # Shutdown sentinel passed down the queues
+
+
+class StageStats:
+    """Timing counters for one pipeline stage."""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.processed = 0
+        self.dropped = 0
+        self.skipped = 0 # Not started because it would not finish before the deadline
+        self.errors = 0
+        self.busy_s = 0.0
+        self.blocked_s = 0.0 # Time spent waiting on a full downstream queue (backpressure)
+        self.latencies: List[float] = []
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def summary(self) -> Dict:
+        wall = (self.finished_at - self.started_at) if self.started_at and self.finished_at else 0.0
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "wall_s": wall,
+            "busy_s": self.busy_s,
+            "blocked_s": self.blocked_s,
+            **{f"{k}_ms": (v * 1000 if v is not None else None) for k, v in percentiles(self.latencies).items()},
+        }
+
+
+class Stage:
+    """
+    One step of a Pipeline.
+    `func(item)` returns the item to forward, None to drop it, or raises (reported via on_error).
+    `estimate_s` is the assumed per-item latency for deadline checks until real timings exist;
+    stages with no estimate are cheap and always run, so started work is never cut off mid-way.
+    """
+
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int = 1, queue_size: int = 8,
+                 estimate_s: float = 0.0):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.queue_size = queue_size
+        self.estimate_s = estimate_s
+
+
+class Pipeline:
+    """
+    Runs items through stages linked by bounded queues.
+
+    Every stage has its own worker threads, so a fast stage keeps working while a slow
+    one is busy; a full queue blocks the upstream stage (backpressure) instead of
+    buffering unbounded work. Setting `cancel_event` drops all not-yet-started work.
+
+    With a `deadline` (time.monotonic() value), a stage only starts an item if the
+    expected latency of the rest of the pipeline (median so far per stage, else the
+    stage estimate) fits in the time left;
+    otherwise the item is skipped and listed in `skipped` as (stage name, item).
+
+    `on_progress(finished, submitted, source_done)` is called whenever an item leaves
+    the pipeline (completed, dropped, skipped or failed).
+    """
+
+    def __init__(self, stages: List[Stage], on_error: Callable[[str, Any, Exception], None] = None,
+                 cancel_event: threading.Event = None, deadline: Optional[float] = None,
+                 on_progress: Callable[[int, int, bool], None] = None):
+        self.stages = stages
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.cancel_event = cancel_event or threading.Event()
+        self.deadline = deadline
+        self.stats: Dict[str, StageStats] = {}
+        self.skipped: List[Tuple[str, Any]] = []
+        self._skipped_lock = threading.Lock()
+        self._submitted = 0
+        self._finished = 0
+        self._source_done = False
+        self._progress_lock = threading.Lock()
+
+    def _item_finished(self):
+        with self._progress_lock:
+            self._finished += 1
+            finished, submitted, source_done = self._finished, self._submitted, self._source_done
+        if self.on_progress:
+            try:
+                self.on_progress(finished, submitted, source_done)
+            except Exception as e:
+                logger.error(f"Pipeline progress callback failed: {e}")
+
+    def _fits(self, index: int) -> bool:
+        """Whether an item entering stage `index` can still get through the remaining stages in time."""
+        if self.deadline is None or not self.stages[index].estimate_s:
+            return True
+        expected = 0.0
+        for stage in self.stages[index:]:
+            stats = self.stats[stage.name]
+            with stats.lock:
+                expected += sorted(stats.latencies)[len(stats.latencies) // 2] if stats.latencies else stage.estimate_s
+        return time.monotonic() + expected <= self.deadline
+
+    def _skip(self, name: str, item: Any, stats: StageStats):
+        with stats.lock:
+            stats.skipped += 1
+        with self._skipped_lock:
+            self.skipped.append((name, item))
+
+    def _report_error(self, stage_name: str, item: Any, error: Exception):
+        if not self.on_error:
+            logger.error(f"Pipeline stage {stage_name} failed: {error}")
+            return
+        try:
+            self.on_error(stage_name, item, error)
+        except Exception as e:
+            # A failing handler (e.g. the journal write) must not kill the worker
+            logger.error(f"Pipeline stage {stage_name} failed: {error} (error handler also failed: {e})")
+
+    def run(self, source: Iterable, source_name: str = "source") -> List[Any]:
+        """Feeds `source` through all stages and returns the items emitted by the last stage."""
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        results: List[Any] = []
+        results_lock = threading.Lock()
+
+        source_stats = StageStats(source_name, 1)
+        self.stats = {source_name: source_stats}
+        self.skipped = []
+        self._submitted, self._finished, self._source_done = 0, 0, False
+        for stage in self.stages:
+            self.stats[stage.name] = StageStats(stage.name, stage.workers)
+
+        remaining = [stage.workers for stage in self.stages]
+        remaining_lock = threading.Lock()
+
+        def forward(index: int, item: Any, stats: StageStats):
+            if index + 1 < len(self.stages):
+                start = time.perf_counter()
+                queues[index + 1].put(item)
+                with stats.lock:
+                    stats.blocked_s += time.perf_counter() - start
+            else:
+                with results_lock:
+                    results.append(item)
+                self._item_finished()
+
+        def worker(index: int):
+            try:
+                work(index)
+            except Exception as e:
+                # Keep taking this stage's input until it closes, so upstream put()s never block on a dead worker
+                logger.error(f"Pipeline worker for {self.stages[index].name} died: {e}")
+                while queues[index].get() is not _DONE:
+                    self._item_finished()
+            finally:
+                # Last worker out closes the next stage (even if this one died), so run() can't hang
+                with remaining_lock:
+                    remaining[index] -= 1
+                    last = remaining[index] == 0
+                if last and index + 1 < len(self.stages):
+                    for _ in range(self.stages[index + 1].workers):
+                        queues[index + 1].put(_DONE)
+
+        def work(index: int):
+            stage = self.stages[index]
+            stats = self.stats[stage.name]
+            while True:
+                item = queues[index].get()
+                if item is _DONE:
+                    break
+                if self.cancel_event.is_set():
+                    with stats.lock:
+                        stats.dropped += 1
+                    self._item_finished()
+                    continue
+                if not self._fits(index):
+                    self._skip(stage.name, item, stats)
+                    self._item_finished()
+                    continue
+
+                start = time.perf_counter()
+                with stats.lock:
+                    if stats.started_at is None:
+                        stats.started_at = start
+                try:
+                    result = stage.func(item)
+                except Exception as e:
+                    result = None
+                    with stats.lock:
+                        stats.errors += 1
+                    self._report_error(stage.name, item, e)
+                elapsed = time.perf_counter() - start
+                with stats.lock:
+                    stats.busy_s += elapsed
+                    stats.latencies.append(elapsed)
+                    stats.finished_at = time.perf_counter()
+                    if result is None:
+                        stats.dropped += 1
+                    else:
+                        stats.processed += 1
+
+                if result is not None:
+                    forward(index, result, stats)
+                else:
+                    self._item_finished()
+
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                thread = threading.Thread(target=worker, args=(index,), name=f"pipeline-{stage.name}-{n}", daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        # Feed the first stage from the calling thread
+        source_stats.started_at = time.perf_counter()
+        iterator = iter(source)
+        while not self.cancel_event.is_set():
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            except Exception as e:
+                source_stats.errors += 1
+                self._report_error(source_name, None, e)
+                break
+            source_stats.busy_s += time.perf_counter() - start
+            source_stats.latencies.append(time.perf_counter() - start)
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                # Keep draining the (cheap) source so the skip report is complete
+                self._skip(source_name, item, source_stats)
+                continue
+            source_stats.processed += 1
+            with self._progress_lock:
+                self._submitted += 1
+            if self.stages:
+                forward(-1, item, source_stats)
+            else:
+                results.append(item)
+        source_stats.finished_at = time.perf_counter()
+        with self._progress_lock:
+            self._source_done = True
+            finished, submitted = self._finished, self._submitted
+        if self.on_progress:
+            self.on_progress(finished, submitted, True)
+
+        if self.stages:
+            for _ in range(self.stages[0].workers):
+                queues[0].put(_DONE)
+        for thread in threads:
+            thread.join()
+        return results
+
+    def summary(self) -> List[Dict]:
+        """Per-stage timing rows in pipeline order."""
+        return [stats.summary() for stats in self.stats.values()]
@@ -1,167 +1,403 @@
+import os
+import time
 import logging
-from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional, Any, Callable
 from src.services.market_data import MarketDataService
 from src.analysis.ai_analyst import AIAnalyst
+from src.analysis.fingerprint import input_fingerprint
+from src.analysis.ensemble import explicit_verdict
+from src.strategies.base import SignalType
+from src.analysis.allocation import PositionAllocator
 from src.execution.alpaca_engine import AlpacaExecutionEngine
+from src.execution.risk_engine import RiskRejected
+from src.execution.order_router import OrderRequest
 from src.services.scanner import MarketScanner
+from src.services.pipeline import Pipeline, Stage
+from src.services.prioritizer import CandidatePrioritizer
+from src.infrastructure.journal import DecisionJournal, JournalEntry
 from src.config import settings
-from src.models.trading import OrderSide, OrderType
+from src.models.domain import Stock
+from src.models.trading import Order, OrderEvent, OrderEventType, OrderSide, OrderStatus, OrderType
 
 import threading
 
 logger = logging.getLogger(__name__)
 
+HOLDING = "holding"
+CANDIDATE = "candidate"
+
+
+class CycleItem:
+    """A symbol moving through the agent cycle pipeline."""
+
+    def __init__(self, symbol: str, kind: str, position: Any = None):
+        self.symbol = symbol
+        self.kind = kind # HOLDING or CANDIDATE
+        self.position = position
+        self.stock: Optional[Stock] = None
+        self.insight: Optional[str] = None
+        self.side: Optional[OrderSide] = None
+        self.quantity = 0
+        self.price: Optional[float] = None # Last price seen by the cycle (reference for risk checks)
+        self.reason = ""
+        self.reused = False # Insight reused from a previous cycle with identical inputs
+
+
 class PortfolioManager:
     """
     Autonomous Agent that manages the portfolio.
     1. Reviews Holdings (Sell Logic)
     2. Scans Market (Buy Logic)
+
+    A cycle runs as a staged pipeline:
+    scan -> fetch -> indicators -> screen -> llm -> decide -> execute
+    with bounded queues between stages and per-stage concurrency.
+
+    With a time budget, candidates are ranked by expected value and the cycle only
+    starts work that fits before the deadline; the rest is reported as skipped.
+
+    Bullish candidates are sized together once the pipeline finishes (see
+    PositionAllocator and settings.ALLOCATION_SETTINGS); the "fixed" method keeps
+    the original single $1,000 buy per cycle.
     """
-    
-    def __init__(self, market_data: MarketDataService, ai_analyst: AIAnalyst, engine: AlpacaExecutionEngine, scanner: MarketScanner):
+
+    # Worker threads per stage; fetch/llm are I/O bound, the rest are cheap or must stay ordered
+    STAGE_WORKERS = {"fetch": 4, "indicators": 2, "screen": 1, "llm": 4, "decide": 1, "execute": 1}
+    QUEUE_SIZE = 8
+    # Assumed per-item latency (seconds) for deadline checks until the cycle has real timings
+    STAGE_ESTIMATES = {"fetch": 2.0, "llm": 5.0}
+    # How long a symbol's last insight can be reused while its input fingerprint is unchanged
+    DECISION_REUSE_TTL = 24 * 3600
+    # v2: insights start with a VERDICT line; earlier memos have none, so they are not reused
+    INSIGHT_MEMO_KEY = "agent_insight:v2:{symbol}:{persona}"
+
+    def __init__(self, market_data: MarketDataService, ai_analyst: AIAnalyst, engine: AlpacaExecutionEngine, scanner: MarketScanner,
+                 journal: Optional[DecisionJournal] = None):
         self.market_data = market_data
         self.ai_analyst = ai_analyst
         self.engine = engine
         self.scanner = scanner
-        self.decisions_log: List[Dict] = []
+        self.journal = journal or DecisionJournal(os.path.join(settings.DATA_DIR, "decision_journal.db"))
+        self.prioritizer = CandidatePrioritizer(market_data.get_cached_analysis, self.journal.last_seen)
         self.lock = threading.Lock()
-        
-    def log_decision(self, symbol: str, action: str, reason: str):
-        """Logs a decision for the UI."""
-        log_entry = {
-            "time": datetime.now().strftime("%H:%M:%S"),
-            "symbol": symbol,
-            "action": action,
-            "reason": reason
-        }
-        self.decisions_log.insert(0, log_entry) # Prepend
-        # Keep log size manageable
-        if len(self.decisions_log) > 50:
-            self.decisions_log.pop()
-            
-    def run_cycle(self, persona: str = "General", watchlist: List[str] = None, max_stocks: int = 10):
-        """Runs a full agent cycle."""
-        if not settings.TRADING_ENABLED:
-            self.log_decision("SYSTEM", "SKIP", "Trading Disabled (Kill Switch)")
+        self.last_cycle_stats: List[Dict] = []
+        self.last_cycle_skipped: List[Dict] = []
+        self.watch_orders(engine)
+
+    def watch_orders(self, engine):
+        """Journals fills and cancels streamed for `engine`'s orders (engines without a tracker fill synchronously)."""
+        tracker = getattr(engine, "tracker", None)
+        if tracker:
+            tracker.subscribe(self.on_order_event)
+
+    def on_order_event(self, order: Order, event: OrderEvent):
+        if event.event == OrderEventType.NEW:
             return
+        action = {OrderStatus.FILLED: "FILLED", OrderStatus.PARTIALLY_FILLED: "PARTIAL FILL"}.get(order.status, order.status.value)
+        price = f" @ ${order.filled_price:,.2f}" if order.filled_price else ""
+        self.log_decision(order.symbol, action, f"{order.side.value} {order.filled_quantity:g}/{order.quantity}{price}")
+
+    def log_decision(self, symbol: str, action: str, reason: str, persona: Optional[str] = None):
+        """Logs a decision to the journal (and the UI's recent-activity buffer)."""
+        self.journal.append(JournalEntry(symbol=symbol, action=action, reason=reason, persona=persona))
+
+    @property
+    def decisions_log(self) -> List[Dict]:
+        """Recent decisions, newest first, as rows for the UI."""
+        return [entry.to_row() for entry in self.journal.recent()]
+
+    def run_cycle(self, persona: str = "General", watchlist: List[str] = None, max_stocks: Optional[int] = 10,
+                  budget_seconds: Optional[float] = None, progress: Callable[[int, int, bool], None] = None,
+                  cancel_event: threading.Event = None) -> Optional[str]:
+        """
+        Runs a full agent cycle; returns why it was skipped, or None if it ran.
+        If `budget_seconds` is set, the cycle is time-budgeted: candidates are ordered by
+        expected value and `max_stocks=None` lets it work through as many as fit.
+        `progress(finished, submitted, scan_done)` reports symbols done; setting
+        `cancel_event` stops the cycle before any further work starts.
+        """
+        if not settings.TRADING_ENABLED:
+            self.log_decision("SYSTEM", "SKIP", "Trading Disabled (Kill Switch)", persona)
+            return "Trading Disabled (Kill Switch)"
 
         # Concurrency Check
         if not self.lock.acquire(blocking=False):
             logger.warning("Agent cycle skipped: Already running.")
-            self.log_decision("SYSTEM", "SKIP", "Agent Busy")
-            return
+            self.log_decision("SYSTEM", "SKIP", "Agent Busy", persona)
+            return "Agent Busy"
 
         try:
-            logger.info(f"Starting Agent Cycle ({persona}, max_stocks={max_stocks})")
-            
-            # 1. Review Holdings (Sell Logic)
-            self.review_holdings(persona)
-            
-            # 2. Find Opportunities (Buy Logic)
-            self.find_opportunities(persona, watchlist, max_stocks)
-            
+            logger.info(f"Starting Agent Cycle ({persona}, max_stocks={max_stocks}, budget={budget_seconds}s)")
+            self._run_pipeline(persona, watchlist, max_stocks, budget_seconds=budget_seconds,
+                               progress=progress, cancel_event=cancel_event)
+            return None
         finally:
             self.lock.release()
-        
+
     def review_holdings(self, persona: str):
         """Analyzes current positions and sells if criteria met."""
-        try:
-            positions = self.engine.get_positions()
-            
-            for pos in positions:
-                symbol = pos.symbol
-                try:
-                    # Analyze
-                    stock = self.market_data.get_stock_analysis(symbol)
-                    insight = self.ai_analyst.analyze_stock(stock, persona=persona)
-                    
-                    # Decision Logic
-                    should_sell = False
-                    reason = ""
-                    
-                    # Technical Sell (Stop Loss / Take Profit - simplified)
-                    # In a real app, we'd check pos.unrealized_plpc
-                    
-                    # AI Sell
-                    if "bearish" in insight.lower() or "sell" in insight.lower():
-                        should_sell = True
-                        reason = f"AI ({persona}) Bearish Outlook"
-                        
-                    if should_sell:
-                        self.engine.place_order(
-                            symbol=symbol,
-                            side=OrderSide.SELL,
-                            quantity=abs(int(pos.qty)), # Sell all
-                            order_type=OrderType.MARKET
-                        )
-                        self.log_decision(symbol, "SELL", reason)
-                    else:
-                        self.log_decision(symbol, "HOLD", "AI Neutral/Bullish")
-                        
-                except Exception as e:
-                    logger.error(f"Error reviewing holding {symbol}: {e}")
-                    self.log_decision(symbol, "ERROR", str(e))
-                    
-        except Exception as e:
-            logger.error(f"Error getting positions: {e}")
+        self._run_pipeline(persona, include_candidates=False)
 
     def find_opportunities(self, persona: str, watchlist: List[str] = None, max_stocks: int = 10):
         """Scans market and buys if criteria met."""
-        
-        # Check Risk Limits (Max Open Positions)
-        try:
-            positions = self.engine.get_positions()
+        self._run_pipeline(persona, watchlist, max_stocks, include_holdings=False)
+
+    def _run_pipeline(self, persona: str, watchlist: List[str] = None, max_stocks: Optional[int] = 10,
+                      include_holdings: bool = True, include_candidates: bool = True,
+                      budget_seconds: Optional[float] = None, progress: Callable[[int, int, bool], None] = None,
+                      cancel_event: threading.Event = None):
+        deadline = time.monotonic() + budget_seconds if budget_seconds else None
+        # Set by the first buy decision; later candidates are dropped before their LLM call
+        buy_done = threading.Event()
+        # Unless sizing is "fixed", bullish candidates are collected and sized together after the pipeline
+        allocation = settings.ALLOCATION_SETTINGS.method
+        buys: List[CycleItem] = []
+        held = [0]
+
+        def scan():
+            # 1. Holdings (Sell Logic)
+            try:
+                positions = self.engine.get_positions()
+            except Exception as e:
+                logger.error(f"Error getting positions: {e}")
+                self.log_decision("SYSTEM", "ERROR", f"Could not load positions: {e}", persona)
+                return
+            held[0] = len(positions)
+
+            if include_holdings:
+                for pos in positions:
+                    yield CycleItem(pos.symbol, HOLDING, position=pos)
+
+            if not include_candidates:
+                return
+
+            # 2. Candidates (Buy Logic) - check risk limits (max open positions) first
             if len(positions) >= settings.RISK_SETTINGS.max_open_positions:
-                self.log_decision("SYSTEM", "SKIP BUY", "Max Open Positions Reached")
+                self.log_decision("SYSTEM", "SKIP BUY", "Max Open Positions Reached", persona)
                 return
-        except:
-            pass
-
-        # Get Scan List
-        scan_list = self.scanner.get_scan_list(watchlist)
-        
-        # Analyze Candidates (User-configurable limit)
-        for symbol in scan_list[:max_stocks]: 
+
+            owned = {p.symbol for p in positions}
+            # Skip if already owned
+            scan_list = [s for s in self.scanner.get_scan_list(watchlist) if s not in owned]
+            if deadline:
+                # Most valuable first, so the deadline cuts off the least valuable work
+                scan_list = [c.symbol for c in self.prioritizer.rank(scan_list, watchlist)]
+
+            # Analyze Candidates (User-configurable limit)
+            for symbol in scan_list[:max_stocks]:
+                yield CycleItem(symbol, CANDIDATE)
+
+        def fetch(item: CycleItem):
+            if item.kind == CANDIDATE and buy_done.is_set():
+                return None
+            item.stock = self.market_data.get_cached_analysis(item.symbol) or self.market_data.fetch_stock(item.symbol)
+            return item
+
+        def indicators(item: CycleItem):
+            if item.stock.indicators is None:
+                item.stock = self.market_data.analyze_and_cache(item.stock)
+            return item
+
+        def screen(item: CycleItem):
+            if item.kind == CANDIDATE:
+                if buy_done.is_set():
+                    return None
+                # Cheap technical gate before paying for an LLM call
+                rsi = item.stock.indicators.rsi if item.stock.indicators else None
+                if rsi is None:
+                    self.log_decision(item.symbol, "PASS", "Insufficient data (RSI)", persona)
+                    return None
+                if rsi >= 70:
+                    self.log_decision(item.symbol, "PASS", f"RSI Overbought ({rsi:.1f})", persona)
+                    return None
+            return item
+
+        def llm(item: CycleItem):
+            if item.kind == CANDIDATE and buy_done.is_set():
+                return None
+            fingerprint = input_fingerprint(item.stock, persona)
+            previous = self._previous_insight(item.symbol, persona, fingerprint)
+            if previous:
+                item.insight = previous
+                item.reused = True
+                return item
+            # The verdict line's confidence sizes the buys (see _size_buys)
+            item.insight = self.ai_analyst.analyze_stock(item.stock, persona=persona, verdict=True)
+            if AIAnalyst.is_model_output(item.insight):
+                self._remember_insight(item.symbol, persona, fingerprint, item.insight)
+            return item
+
+        def decide(item: CycleItem):
+            insight = item.insight.lower()
+            note = " (inputs unchanged)" if item.reused else ""
+            if item.kind == HOLDING:
+                # Technical Sell (Stop Loss / Take Profit - simplified)
+                # In a real app, we'd check pos.unrealized_plpc
+
+                # AI Sell
+                if "bearish" in insight or "sell" in insight:
+                    item.side = OrderSide.SELL
+                    item.quantity = abs(int(item.position.qty)) # Sell all
+                    item.reason = f"AI ({persona}) Bearish Outlook{note}"
+                    return item
+                self.log_decision(item.symbol, "HOLD", f"AI Neutral/Bullish{note}", persona)
+                return None
+
+            if buy_done.is_set():
+                return None
+
+            # AI Buy (RSI already screened)
+            if "bullish" in insight or "buy" in insight:
+                # Calculate Size
+                price = item.stock.current_price or (item.stock.history[-1].close if item.stock.history else None)
+                item.price = price
+                if allocation != "fixed":
+                    if price:
+                        item.side = OrderSide.BUY
+                        item.reason = f"AI ({persona}) Bullish + RSI OK{note}"
+                        buys.append(item) # Single decide worker, so no lock needed
+                    return None
+                position_value = min(1000, settings.RISK_SETTINGS.max_position_size)
+                item.quantity = int(position_value / price) if price else 0
+                if item.quantity > 0:
+                    item.side = OrderSide.BUY
+                    item.reason = f"AI ({persona}) Bullish + RSI OK{note}"
+                    # Stop after one buy per cycle to be conservative
+                    buy_done.set()
+                    return item
+                return None
+
+            self.log_decision(item.symbol, "PASS", f"AI Not Bullish enough{note}", persona)
+            return None
+
+        def execute(item: CycleItem):
+            risk = getattr(self.engine, "risk", None)
+            if risk and item.price:
+                risk.mark(item.symbol, item.price) # So the position-size check can price a new symbol
+            try:
+                self.engine.place_order(
+                    symbol=item.symbol,
+                    side=item.side,
+                    quantity=item.quantity,
+                    order_type=OrderType.MARKET
+                )
+            except RiskRejected as e:
+                self.log_decision(item.symbol, "RISK REJECT", str(e), persona)
+                return None
+            self.log_decision(item.symbol, item.side.value, item.reason, persona)
+            return item
+
+        def on_error(stage: str, item: Optional[CycleItem], error: Exception):
+            symbol = item.symbol if item else "SYSTEM"
+            kind = item.kind if item else "cycle"
+            logger.error(f"Error in {stage} stage for {kind} {symbol}: {error}")
+            self.log_decision(symbol, "ERROR", str(error), persona)
+
+        stage_funcs = [("fetch", fetch), ("indicators", indicators), ("screen", screen),
+                       ("llm", llm), ("decide", decide), ("execute", execute)]
+        pipeline = Pipeline(
+            [Stage(name, func, workers=self.STAGE_WORKERS[name], queue_size=self.QUEUE_SIZE,
+                   estimate_s=self.STAGE_ESTIMATES.get(name, 0.0)) for name, func in stage_funcs],
+            on_error=on_error,
+            deadline=deadline,
+            cancel_event=cancel_event,
+            on_progress=progress
+        )
+        executed = pipeline.run(scan(), source_name="scan")
+        if buys and not (cancel_event and cancel_event.is_set()):
             try:
-                # Skip if already owned
-                if any(p.symbol == symbol for p in positions):
-                    continue
-                    
-                # Analyze
-                stock = self.market_data.get_stock_analysis(symbol)
-                insight = self.ai_analyst.analyze_stock(stock, persona=persona)
-                
-                # Decision Logic
-                should_buy = False
-                reason = ""
-                
-                # AI Buy
-                if "bullish" in insight.lower() or "buy" in insight.lower():
-                    # Double check RSI isn't overbought
-                    if stock.indicators and stock.indicators.rsi < 70:
-                        should_buy = True
-                        reason = f"AI ({persona}) Bullish + RSI OK"
-                
-                if should_buy:
-                    # Calculate Size
-                    position_value = min(1000, settings.RISK_SETTINGS.max_position_size)
-                    quantity = int(position_value / stock.current_price)
-                    
-                    if quantity > 0:
-                        self.engine.place_order(
-                            symbol=symbol,
-                            side=OrderSide.BUY,
-                            quantity=quantity,
-                            order_type=OrderType.MARKET
-                        )
-                        self.log_decision(symbol, "BUY", reason)
-                        
-                        # Stop after one buy per cycle to be conservative
-                        return 
-                else:
-                    self.log_decision(symbol, "PASS", "AI Not Bullish enough")
-                    
+                sized = self._size_buys(buys, held[0], persona)
             except Exception as e:
-                logger.error(f"Error analyzing candidate {symbol}: {e}")
-                self.log_decision(symbol, "ERROR", str(e))
+                on_error("allocate", None, e)
+                sized = []
+            executed += self._place_buys(sized, persona)
+        self.last_cycle_stats = pipeline.summary()
+        self.last_cycle_skipped = [{"symbol": item.symbol, "kind": item.kind, "stage": stage} for stage, item in pipeline.skipped]
+        if self.last_cycle_skipped:
+            symbols = ", ".join(s["symbol"] for s in self.last_cycle_skipped)
+            self.log_decision("SYSTEM", "SKIP", f"Time budget ({budget_seconds:.0f}s) reached; skipped {len(self.last_cycle_skipped)}: {symbols}", persona)
+        return executed
+
+    def _place_buys(self, items: List[CycleItem], persona: str) -> List[CycleItem]:
+        """Submits the sized buys as one batch (engine.place_orders) and journals each result; never raises."""
+        if not items:
+            return []
+        risk = getattr(self.engine, "risk", None)
+        if risk:
+            risk.mark_many({item.symbol: item.price for item in items}) # So the position-size check can price new symbols
+        requests = [OrderRequest(symbol=item.symbol, side=item.side, quantity=item.quantity, order_type=OrderType.MARKET)
+                    for item in items]
+        try:
+            results = self.engine.place_orders(requests)
+        except Exception as e:
+            logger.error(f"Batch order submit failed: {e}")
+            for item in items:
+                self.log_decision(item.symbol, "ERROR", f"Order not placed: {e}", persona)
+            return []
+        placed = []
+        for item, result in zip(items, results):
+            if result.ok:
+                self.log_decision(item.symbol, item.side.value, item.reason, persona)
+                placed.append(item)
+            else:
+                self.log_decision(item.symbol, "RISK REJECT" if result.risk_rejected else "ERROR", result.error, persona)
+        return placed
+
+    def _size_buys(self, buys: List[CycleItem], held: int, persona: str) -> List[CycleItem]:
+        """
+        Sizes a cycle's buy candidates together (see PositionAllocator) and returns
+        those that get shares. Conviction is the confidence on the insight's verdict
+        line; a candidate without a BUY verdict is not allocated.
+        """
+        method = settings.ALLOCATION_SETTINGS.method
+        confidence = {}
+        for item in buys:
+            verdict = explicit_verdict(item.insight)
+            if verdict and verdict[0] == SignalType.BUY:
+                confidence[item.symbol] = verdict[1]
+            else:
+                reason = f"verdict {verdict[0].value}" if verdict else "no verdict line"
+                self.log_decision(item.symbol, "PASS", f"Bullish but not allocated ({method}, {reason})", persona)
+        buys = [item for item in buys if item.symbol in confidence]
+        if not buys:
+            return []
+        account = self.engine.get_account()
+        slots = settings.RISK_SETTINGS.max_open_positions - held
+        targets = PositionAllocator().allocate(
+            [item.symbol for item in buys],
+            [item.price for item in buys],
+            [[p.close for p in item.stock.history] for item in buys],
+            [confidence[item.symbol] for item in buys],
+            equity=float(account.equity), cash=float(account.buying_power), slots=slots
+        )
+        sized = []
+        for item in buys:
+            item.quantity = targets.get(item.symbol, 0)
+            if item.quantity:
+                item.reason += f"; {method} size ${item.quantity * item.price:,.0f}"
+                sized.append(item)
+            else:
+                self.log_decision(item.symbol, "PASS", f"Bullish but not allocated ({method}, {slots} open slots)", persona)
+        return sized
+
+    def _previous_insight(self, symbol: str, persona: str, fingerprint: str) -> Optional[str]:
+        """The insight from an earlier cycle if the symbol's inputs have not changed since."""
+        try:
+            memo = self.market_data.cache.get(self.INSIGHT_MEMO_KEY.format(symbol=symbol, persona=persona))
+        except Exception as e:
+            logger.warning(f"Insight memo read failed: {e}")
+            return None
+        if memo and memo.get("fingerprint") == fingerprint:
+            logger.info(f"Inputs unchanged for {symbol} ({persona}); reusing previous insight")
+            return memo.get("insight")
+        return None
+
+    def _remember_insight(self, symbol: str, persona: str, fingerprint: str, insight: str):
+        try:
+            self.market_data.cache.set(
+                self.INSIGHT_MEMO_KEY.format(symbol=symbol, persona=persona),
+                {"fingerprint": fingerprint, "insight": insight},
+                expire=self.DECISION_REUSE_TTL
+            )
+        except Exception as e:
+            logger.warning(f"Insight memo write failed: {e}")
@@ -0,0 +1,74 @@
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import logging
+
+from pydantic import BaseModel
+
+from src.models.domain import Stock
+
+logger = logging.getLogger(__name__)
+
+
+class CandidateScore(BaseModel):
+    """Expected-value score of analyzing one candidate this cycle."""
+    symbol: str
+    score: float
+    priority: float
+    technical: float
+    staleness: float
+
+
+class CandidatePrioritizer:
+    """
+    Orders scan candidates by how much an analysis is likely to be worth,
+    using only data that is already at hand (no provider or LLM calls):
+
+    - priority: watchlist symbols first, then scan-list order
+    - technical: oversold / near-trend setups from the cached analysis, neutral if none cached
+    - staleness: symbols the agent has not looked at recently
+    """
+
+    WEIGHTS = {"priority": 0.5, "technical": 0.3, "staleness": 0.2}
+    STALE_AFTER_HOURS = 24.0
+
+    def __init__(self, cached_analysis: Callable[[str], Optional[Stock]], last_seen: Callable[[List[str]], Dict[str, datetime]]):
+        self.cached_analysis = cached_analysis
+        self.last_seen = last_seen
+
+    def rank(self, symbols: List[str], watchlist: List[str] = None) -> List[CandidateScore]:
+        watchlist = set(watchlist or [])
+        try:
+            seen = self.last_seen(symbols)
+        except Exception as e:
+            logger.warning(f"Could not load last-seen times: {e}")
+            seen = {}
+        now = datetime.now()
+
+        scores = []
+        for rank, symbol in enumerate(symbols):
+            priority = 1.0 if symbol in watchlist else 0.5 * (1 - rank / len(symbols))
+            technical = self.technical_score(self.cached_analysis(symbol))
+            if symbol in seen:
+                hours = (now - seen[symbol]).total_seconds() / 3600
+                staleness = min(hours / self.STALE_AFTER_HOURS, 1.0)
+            else:
+                staleness = 1.0
+            score = (self.WEIGHTS["priority"] * priority + self.WEIGHTS["technical"] * technical
+                     + self.WEIGHTS["staleness"] * staleness)
+            scores.append(CandidateScore(symbol=symbol, score=score, priority=priority, technical=technical, staleness=staleness))
+
+        scores.sort(key=lambda s: s.score, reverse=True)
+        return scores
+
+    @staticmethod
+    def technical_score(stock: Optional[Stock]) -> float:
+        """0..1; higher for oversold RSI and price holding above its 50-day trend."""
+        if not stock or not stock.indicators or stock.indicators.rsi is None:
+            return 0.5
+        rsi = stock.indicators.rsi
+        if rsi >= 70:
+            return 0.0 # Would be screened out as overbought anyway
+        score = (70 - rsi) / 40 # 30 -> 1.0, 70 -> 0.0
+        if stock.indicators.sma_50 and stock.current_price:
+            score += 0.2 if stock.current_price >= stock.indicators.sma_50 else -0.2
+        return max(0.0, min(score, 1.0))
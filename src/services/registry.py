@@ -0,0 +1,61 @@
+import threading
+import logging
+from typing import Optional, Union
+
+from src.config import settings
+from src.services.market_data import MarketDataService
+from src.analysis.ai_analyst import AIAnalyst
+from src.execution.paper_engine import PaperTradingEngine
+from src.execution.alpaca_engine import AlpacaExecutionEngine
+from src.services.scanner import MarketScanner
+from src.services.portfolio_manager import PortfolioManager
+from src.services.job_queue import AgentJobQueue
+from src.services.scheduler import AgentScheduler
+from src.services.agent_client import LocalAgent, RemoteAgent
+from src.backtesting.replay import default_decision_store
+from src.infrastructure.ledger import default_paper_ledger
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """
+    The process-wide services shared by every UI session: market data (and its
+    cache), AI analyst, scanner, execution engine, decision store and the agent.
+    Per-user state (watchlist, persona) stays in each session.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.market_data = MarketDataService()
+        self.ai_analyst = AIAnalyst(cache=self.market_data.cache)
+        self.scanner = MarketScanner()
+        # The engine belongs to whichever process runs the agent: here, or the worker (then None here)
+        self.engine: Optional[Union[PaperTradingEngine, AlpacaExecutionEngine]] = (
+            None if settings.AGENT_WORKER_SOCKET else PaperTradingEngine(ledger=default_paper_ledger()))
+        self.decision_store = default_decision_store()
+        self.portfolio_manager: Optional[PortfolioManager] = None
+        self.agent: Union[LocalAgent, RemoteAgent] = self._build_agent()
+        logger.info("Shared services initialized")
+
+    def _build_agent(self) -> Union[LocalAgent, RemoteAgent]:
+        if settings.AGENT_WORKER_SOCKET:
+            # Headless worker owns the one agent; the UI only sends commands
+            return RemoteAgent(settings.AGENT_WORKER_SOCKET)
+        self.portfolio_manager = PortfolioManager(self.market_data, self.ai_analyst, self.engine, self.scanner)
+        job_queue = AgentJobQueue(self.portfolio_manager)
+        scheduler = AgentScheduler(self.portfolio_manager, job_queue)
+        scheduler.start()
+        return LocalAgent(self.portfolio_manager, job_queue, scheduler)
+
+    def use_alpaca(self) -> AlpacaExecutionEngine:
+        """
+        Switches every session and the in-process agent to a fresh Alpaca engine
+        for the current mode. Not for worker mode: the worker owns the engine there
+        (see RemoteAgent.set_alpaca_mode).
+        """
+        engine = AlpacaExecutionEngine()
+        with self.lock:
+            self.engine = engine
+            self.agent.use_engine(engine)
+        return engine
@@ -19,16 +19,11 @@ class MarketScanner:
     @RateLimiter(max_calls=5, period=60)
     def get_top_gainers_losers(self) -> List[str]:
         """Fetches top gainers, losers, and most active from Alpha Vantage."""
-        import requests
-        
         if not self.provider.api_key:
             return []
             
-        url = f"https://www.alphavantage.co/query?function=TOP_GAINERS_LOSERS&apikey={self.provider.api_key}"
-        
         try:
-            response = requests.get(url)
-            data = response.json()
+            data = self.provider.query(function="TOP_GAINERS_LOSERS")
             
             symbols = []
             
@@ -1,59 +1,232 @@
-import schedule
-import time
+import heapq
 import threading
 import logging
-from datetime import datetime
+from datetime import datetime, time, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
 from src.services.portfolio_manager import PortfolioManager
+from src.services.job_queue import AgentJobQueue, PRIORITY_SCHEDULED
+from src.services.market_calendar import MarketCalendar
+from src.services.cache_warmer import CacheWarmer
+from src.config import settings
 
 logger = logging.getLogger(__name__)
 
-class AgentScheduler:
+
+class DailyTrigger:
+    """Fires at a wall-clock time (market timezone) on trading days."""
+
+    def __init__(self, at: time, calendar: MarketCalendar, trading_days_only: bool = True):
+        self.at = at
+        self.calendar = calendar
+        self.trading_days_only = trading_days_only
+
+    def next_after(self, moment: datetime) -> datetime:
+        moment = moment.astimezone(self.calendar.tz)
+        day = moment.date()
+        while True:
+            candidate = datetime.combine(day, self.at, self.calendar.tz)
+            if candidate > moment and (not self.trading_days_only or self.calendar.is_trading_day(day)):
+                return candidate
+            day += timedelta(days=1)
+
+    def __repr__(self):
+        return f"daily at {self.at.strftime('%H:%M')} ET"
+
+
+class IntervalTrigger:
+    """Fires every `seconds`, aligned to the session open, while the market is open."""
+
+    def __init__(self, seconds: float, calendar: MarketCalendar):
+        self.seconds = seconds
+        self.calendar = calendar
+
+    def next_after(self, moment: datetime) -> datetime:
+        moment = moment.astimezone(self.calendar.tz)
+        day = moment.date()
+        while True:
+            session = self.calendar.session(day)
+            if session:
+                open_, close = session
+                if moment < open_:
+                    return open_
+                if moment < close:
+                    elapsed = (moment - open_).total_seconds()
+                    candidate = open_ + timedelta(seconds=(elapsed // self.seconds + 1) * self.seconds)
+                    if candidate < close:
+                        return candidate
+            day += timedelta(days=1)
+            moment = datetime.combine(day, time.min, self.calendar.tz)
+
+    def __repr__(self):
+        return f"every {self.seconds / 60:g} min during market hours"
+
+
+class ScheduledJob:
+    def __init__(self, job_id: str, trigger, func: Callable[[], None]):
+        self.id = job_id
+        self.trigger = trigger
+        self.func = func
+        self.next_run: Optional[datetime] = None
+
+
+class TimerScheduler:
     """
-    Runs the PortfolioManager on a schedule in a background thread.
+    Runs jobs from a heap of next-run times. The thread sleeps until the earliest
+    deadline (or until jobs change), so it uses no CPU while idle.
+    Job ids are unique: registering an existing id replaces that job instead of
+    adding a second copy.
     """
-    
-    def __init__(self, portfolio_manager: PortfolioManager):
-        self.portfolio_manager = portfolio_manager
+
+    # Runs more than this late (e.g. after a suspend) are skipped rather than fired
+    MISFIRE_GRACE = timedelta(minutes=5)
+
+    def __init__(self, calendar: MarketCalendar = None):
+        self.calendar = calendar or MarketCalendar()
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self.heap: List[Tuple[datetime, str]] = []
+        self.cond = threading.Condition()
+        self.thread: Optional[threading.Thread] = None
         self.running = False
-        self.thread = None
-        
+
+    def add_job(self, job_id: str, trigger, func: Callable[[], None]) -> ScheduledJob:
+        with self.cond:
+            job = ScheduledJob(job_id, trigger, func)
+            job.next_run = trigger.next_after(self.calendar.now())
+            if job_id in self.jobs:
+                logger.info(f"Replacing scheduled job '{job_id}'")
+            self.jobs[job_id] = job
+            heapq.heappush(self.heap, (job.next_run, job_id))
+            self.cond.notify()
+            return job
+
+    def remove_job(self, job_id: str):
+        with self.cond:
+            self.jobs.pop(job_id, None) # Its heap entry is dropped lazily
+            self.cond.notify()
+
+    def next_run(self, job_ids: List[str] = None) -> Optional[datetime]:
+        """Earliest upcoming run, optionally among `job_ids` only."""
+        with self.cond:
+            jobs = [self.jobs[j] for j in job_ids if j in self.jobs] if job_ids is not None else self.jobs.values()
+            return min((job.next_run for job in jobs), default=None)
+
     def start(self):
-        """Starts the scheduler in a background thread."""
-        if self.running:
-            return
-            
-        self.running = True
-        
-        # Define Schedule
-        # Note: System time must be correct.
-        schedule.every().day.at("09:25").do(self.run_job, "Pre-Market")
-        schedule.every().day.at("14:00").do(self.run_job, "Afternoon")
-        
-        # For testing/demo purposes, run every hour too? No, stick to request.
-        
-        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        with self.cond:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._run_loop, name="timer-scheduler", daemon=True)
         self.thread.start()
-        logger.info("Scheduler started.")
-        
+
     def stop(self):
-        """Stops the scheduler."""
-        self.running = False
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
         if self.thread:
             self.thread.join(timeout=1)
-        logger.info("Scheduler stopped.")
-        
+
     def _run_loop(self):
-        while self.running:
-            schedule.run_pending()
-            time.sleep(1)
-            
+        while True:
+            with self.cond:
+                due = None
+                while self.running and due is None:
+                    # Drop entries for removed or rescheduled jobs
+                    while self.heap and (self.heap[0][1] not in self.jobs or self.jobs[self.heap[0][1]].next_run != self.heap[0][0]):
+                        heapq.heappop(self.heap)
+                    if not self.heap:
+                        self.cond.wait()
+                        continue
+                    run_at, job_id = self.heap[0]
+                    wait = (run_at - self.calendar.now()).total_seconds()
+                    if wait > 0:
+                        self.cond.wait(timeout=wait)
+                        continue
+                    heapq.heappop(self.heap)
+                    due = self.jobs[job_id]
+                    now = self.calendar.now()
+                    due.next_run = due.trigger.next_after(now)
+                    heapq.heappush(self.heap, (due.next_run, job_id))
+                    late = now - run_at
+                if not self.running:
+                    return
+
+            if late > self.MISFIRE_GRACE:
+                logger.warning(f"Skipping scheduled job '{due.id}': {late} late")
+                continue
+            try:
+                due.func()
+            except Exception as e:
+                logger.error(f"Scheduled job '{due.id}' failed: {e}")
+
+
+# Shared by every AgentScheduler in the process, so sessions re-register jobs instead of duplicating them
+default_timer = TimerScheduler()
+
+
+class AgentScheduler:
+    """
+    Runs the PortfolioManager on a market-calendar schedule:
+    09:25 ET pre-market and 14:00 ET afternoon cycles on trading days, plus an
+    optional intraday interval (AGENT_INTERVAL_MINUTES).
+    Each daily cycle is preceded by a cache warm-up WARMUP_LEAD_MINUTES earlier.
+    """
+
+    def __init__(self, portfolio_manager: PortfolioManager, job_queue: AgentJobQueue = None,
+                 timer: TimerScheduler = None, warmer: CacheWarmer = None):
+        self.portfolio_manager = portfolio_manager
+        self.job_queue = job_queue
+        self.warmer = warmer or CacheWarmer(portfolio_manager.market_data, portfolio_manager.engine, portfolio_manager.scanner)
+        self.timer = timer or default_timer
+        self.calendar = self.timer.calendar
+        self.job_ids: List[str] = []
+
+    def start(self):
+        """Registers the agent jobs and starts the timer thread (both idempotent)."""
+        jobs = {
+            "agent:pre-market": (DailyTrigger(time(9, 25), self.calendar), "Pre-Market"),
+            "agent:afternoon": (DailyTrigger(time(14, 0), self.calendar), "Afternoon"),
+        }
+        if settings.WARMUP_LEAD_MINUTES:
+            for job_id, (trigger, name) in list(jobs.items()):
+                lead = datetime.combine(datetime.today(), trigger.at) - timedelta(minutes=settings.WARMUP_LEAD_MINUTES)
+                jobs[f"{job_id}:warmup"] = (DailyTrigger(lead.time(), self.calendar), f"{name} Warm-up")
+        if settings.AGENT_INTERVAL_MINUTES:
+            jobs["agent:intraday"] = (IntervalTrigger(settings.AGENT_INTERVAL_MINUTES * 60, self.calendar), "Intraday")
+        for job_id, (trigger, name) in jobs.items():
+            if job_id.endswith(":warmup"):
+                cycle_trigger = jobs[job_id[:-len(":warmup")]][0]
+                func = lambda cycle_trigger=cycle_trigger: self.run_warmup(cycle_trigger.next_after(self.calendar.now()))
+            else:
+                func = lambda name=name: self.run_job(name)
+            self.timer.add_job(job_id, trigger, func)
+        self.job_ids = list(jobs)
+        self.timer.start()
+        logger.info(f"Scheduler started: {', '.join(f'{n} ({t})' for t, n in jobs.values())}")
+
+    def stop(self):
+        """Removes this scheduler's jobs."""
+        for job_id in self.job_ids:
+            self.timer.remove_job(job_id)
+        logger.info("Scheduler stopped.")
+
     def run_job(self, name: str):
         """Wrapper to run the job."""
         logger.info(f"Scheduler triggering job: {name}")
         # We use a default persona for scheduled runs, e.g., "General" or user preference if stored
         # For now, "General" is safe.
-        self.portfolio_manager.run_cycle(persona="General")
-        
-    def get_next_run(self):
-        """Returns the next scheduled run time."""
-        return schedule.next_run()
+        # Time-budgeted: rank candidates and stop starting new work at the deadline
+        params = dict(persona="General", max_stocks=None, budget_seconds=settings.AGENT_CYCLE_BUDGET_SECONDS)
+        if self.job_queue:
+            # Queued behind (or merged with) any manual run instead of being dropped as busy
+            self.job_queue.submit(name, priority=PRIORITY_SCHEDULED, **params)
+        else:
+            self.portfolio_manager.run_cycle(**params)
+
+    def run_warmup(self, deadline: datetime):
+        """Warms the cache in the background so the timer stays free; stops before `deadline`."""
+        logger.info(f"Scheduler triggering cache warm-up until {deadline.strftime('%H:%M')} ET")
+        threading.Thread(target=self.warmer.warm, args=(deadline,), name="cache-warmup", daemon=True).start()
+
+    def get_next_run(self) -> Optional[datetime]:
+        """Returns the next scheduled agent cycle (market timezone), ignoring warm-ups."""
+        return self.timer.next_run([j for j in self.job_ids if not j.endswith(":warmup")])
@@ -0,0 +1,42 @@
+from typing import Dict, Optional, Tuple
+from datetime import date
+from src.strategies.base import Strategy, Signal, SignalType
+from src.models.domain import Stock
+from src.analysis.ai_analyst import AIAnalyst
+from src.infrastructure.decision_store import AIDecisionStore, StoredDecision
+
+
+class PersonaReplayStrategy(Strategy):
+    """
+    Replays stored AI persona decisions (see PersonaReplayRunner).
+    Never calls an LLM: bars without a stored decision for the exact inputs are HOLD.
+    """
+
+    def __init__(self, store: AIDecisionStore, persona: str, model: Optional[str] = None):
+        super().__init__(name=f"AI Persona Replay ({persona})")
+        self.store = store
+        self.persona = persona
+        self.model = model
+        self.misses = 0
+        self._decisions: Dict[str, Dict[Tuple[date, str], StoredDecision]] = {}
+
+    def analyze(self, stock: Stock) -> Signal:
+        if not stock.history:
+            return Signal(symbol=stock.symbol, signal_type=SignalType.HOLD, reason="No history")
+
+        # Load the symbol's decisions once; every later bar is a dict lookup
+        if stock.symbol not in self._decisions:
+            self._decisions[stock.symbol] = self.store.load(stock.symbol, self.persona, model=self.model)
+
+        key = (stock.history[-1].timestamp.date(), AIAnalyst.input_hash(stock, self.persona))
+        decision = self._decisions[stock.symbol].get(key)
+        if not decision:
+            self.misses += 1
+            return Signal(symbol=stock.symbol, signal_type=SignalType.HOLD, reason="No stored decision")
+
+        return Signal(
+            symbol=stock.symbol,
+            signal_type=SignalType(decision.signal),
+            strength=decision.confidence,
+            reason=f"{self.persona} ({decision.model}) replay"
+        )
@@ -11,6 +11,7 @@ from src.strategies.sma_crossover import SMACrossoverStrategy
 from src.strategies.rsi_reversion import RSIMeanReversionStrategy
 from src.backtesting.engine import Backtester
 from src.execution.paper_engine import PaperTradingEngine
+from src.infrastructure.ledger import default_paper_ledger
 
 console = Console()
 
@@ -21,7 +22,8 @@ class TradingCLI(cmd.Cmd):
     def __init__(self):
         super().__init__()
         self.provider = YahooFinanceProvider()
-        self.engine = PaperTradingEngine()
+        # Same paper account across runs; its own ledger, since the agent's has a single owner
+        self.engine = PaperTradingEngine(ledger=default_paper_ledger("cli_paper_ledger.db"))
         self.active_traders = {} # symbol -> thread
         self.stop_events = {} # symbol -> event
 
@@ -90,6 +92,7 @@ class TradingCLI(cmd.Cmd):
 
     def do_quit(self, arg):
         """Exit the CLI."""
+        self.engine.close()
         console.print("Goodbye!")
         return True
 
@@ -0,0 +1,86 @@
+"""
+Headless agent worker.
+
+Owns the single agent stack (market data, AI analyst, execution engine, portfolio
+manager, job queue and scheduler) and serves the Streamlit UI over a Unix socket:
+
+    python -m src.worker --socket data/agent.sock
+
+Point the UI at it with AGENT_WORKER_SOCKET=<same path>.
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+
+# Ensure src is in path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import settings
+from src.services.market_data import MarketDataService
+from src.analysis.ai_analyst import AIAnalyst
+from src.execution.paper_engine import PaperTradingEngine
+from src.execution.alpaca_engine import AlpacaExecutionEngine
+from src.services.scanner import MarketScanner
+from src.services.portfolio_manager import PortfolioManager
+from src.services.job_queue import AgentJobQueue
+from src.services.scheduler import AgentScheduler
+from src.services.agent_client import LocalAgent, AGENT_METHODS
+from src.infrastructure.ipc import IPCServer
+from src.infrastructure.ledger import default_paper_ledger
+
+logger = logging.getLogger(__name__)
+
+
+def default_socket_path() -> str:
+    return settings.AGENT_WORKER_SOCKET or os.path.join(settings.DATA_DIR, "agent.sock")
+
+
+def build_agent() -> LocalAgent:
+    """Creates the agent stack the same way the UI does in single-process mode."""
+    service = MarketDataService()
+    analyst = AIAnalyst(cache=service.cache)
+    engine = None
+    if settings.ALPACA_API_KEY:
+        try:
+            engine = AlpacaExecutionEngine()
+        except Exception as e:
+            logger.error(f"Alpaca unavailable, using paper engine: {e}")
+    if engine is None:
+        engine = PaperTradingEngine(ledger=default_paper_ledger())
+    portfolio_manager = PortfolioManager(service, analyst, engine, MarketScanner())
+    job_queue = AgentJobQueue(portfolio_manager)
+    scheduler = AgentScheduler(portfolio_manager, job_queue)
+    scheduler.start()
+    return LocalAgent(portfolio_manager, job_queue, scheduler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless AI trading agent worker")
+    parser.add_argument("--socket", default=default_socket_path(), help="Unix socket path for the UI")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    agent = build_agent()
+    server = IPCServer(args.socket, agent, AGENT_METHODS)
+    server.serve_in_background()
+    logger.info(f"Agent worker {os.getpid()} listening on {args.socket}")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    stop.wait()
+
+    logger.info("Agent worker shutting down")
+    server.shutdown()
+    server.server_close()
+    agent.scheduler.stop()
+    agent.job_queue.stop()
+    agent.portfolio_manager.journal.close()
+    agent.portfolio_manager.engine.close()
+
+
+if __name__ == "__main__":
+    main()
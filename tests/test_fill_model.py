@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from src.execution.fill_model import MarketImpactFillModel
+from src.models.trading import Order, OrderSide, OrderType
+
+
+def random_orders(n: int, seed: int):
+    rng = random.Random(seed)
+    # The engine passes each symbol's bar volume, so it is the same for all of that symbol's orders
+    bar_volume = {symbol: rng.choice((None, 0, 800, 5000, 1e6)) for symbol in "ABCDE"}
+    orders, prices, volumes = [], [], []
+    for i in range(n):
+        order_type = rng.choice((OrderType.MARKET, OrderType.LIMIT, OrderType.STOP))
+        price = rng.uniform(10, 500)
+        order = Order(id=str(i), symbol=rng.choice("ABCDE"), side=rng.choice(list(OrderSide)), order_type=order_type,
+                      quantity=rng.randint(1, 500), price=round(price, 2) if order_type == OrderType.LIMIT else None,
+                      stop_price=price if order_type == OrderType.STOP else None)
+        order.filled_quantity = rng.choice((0, 0, 0, order.quantity // 2))
+        orders.append(order)
+        prices.append(price)
+        volumes.append(bar_volume[order.symbol])
+    return orders, prices, volumes
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_vectorized_matches_loop(seed):
+    model = MarketImpactFillModel(max_participation=0.1)
+    orders, prices, volumes = random_orders(300, seed)
+    loop_qty, loop_price = model._fill_loop(orders, prices, volumes)
+    vec_qty, vec_price = model._fill_vectorized(orders, prices, volumes)
+    assert vec_qty == loop_qty
+    assert vec_price == pytest.approx(loop_price, rel=1e-12)
+
+
+def test_participation_cap_is_shared_per_symbol():
+    model = MarketImpactFillModel(max_participation=0.1)
+    orders = [Order(id=str(i), symbol="A", side=OrderSide.BUY, order_type=OrderType.MARKET, quantity=60) for i in range(3)]
+    for fill in (model._fill_loop, model._fill_vectorized):
+        quantities, _ = fill(orders, [100.0] * 3, [1000] * 3)
+        assert quantities == [60, 40, 0] # 100 shares of capacity, in arrival order
+
+
+def test_market_orders_pay_costs_limits_do_not():
+    model = MarketImpactFillModel(spread_bps=2.0, slippage_bps=0.0, impact_bps=0.0)
+    buy = Order(id="1", symbol="A", side=OrderSide.BUY, order_type=OrderType.MARKET, quantity=10)
+    sell = Order(id="2", symbol="A", side=OrderSide.SELL, order_type=OrderType.MARKET, quantity=10)
+    limit = Order(id="3", symbol="A", side=OrderSide.BUY, order_type=OrderType.LIMIT, quantity=10, price=99.0)
+    _, fill_prices = model.fill([buy, sell, limit], [100.0] * 3, [None] * 3)
+    assert fill_prices == pytest.approx([100.01, 99.99, 99.0])
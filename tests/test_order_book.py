@@ -0,0 +1,78 @@
+from src.execution.fill_model import IdealFillModel
+from src.execution.paper_engine import PaperTradingEngine
+from src.models.trading import OrderSide, OrderStatus, OrderType
+
+
+def engine_with_position(symbol: str = "A", quantity: int = 10, price: float = 100.0) -> PaperTradingEngine:
+    engine = PaperTradingEngine(risk_checks=False, fill_model=IdealFillModel())
+    engine.place_order(symbol, OrderSide.BUY, quantity)
+    engine.process_orders({symbol: price})
+    return engine
+
+
+def test_oco_take_profit_cancels_stop():
+    engine = engine_with_position()
+    take_profit, stop = engine.place_oco_order("A", OrderSide.SELL, 10, take_profit=110.0, stop_loss=90.0)
+    engine.process_orders({"A": 105.0})
+    assert take_profit.status == stop.status == OrderStatus.PENDING
+    engine.process_orders({"A": 111.0})
+    assert take_profit.status == OrderStatus.FILLED
+    assert take_profit.filled_price == 110.0 # Limit orders fill at their limit
+    assert stop.status == OrderStatus.CANCELLED
+    assert len(engine.book) == 0
+    assert "A" not in engine.portfolio.positions
+
+
+def test_bracket_exits_wait_for_entry():
+    engine = PaperTradingEngine(risk_checks=False, fill_model=IdealFillModel())
+    entry, take_profit, stop = engine.place_bracket_order("A", OrderSide.BUY, 10, take_profit=110.0, stop_loss=90.0,
+                                                          order_type=OrderType.LIMIT, price=95.0)
+    engine.process_orders({"A": 85.0}) # Entry fills; the exits only become active now
+    assert entry.status == OrderStatus.FILLED
+    assert stop.status == OrderStatus.PENDING
+    engine.process_orders({"A": 89.0})
+    assert stop.status == OrderStatus.FILLED
+    assert take_profit.status == OrderStatus.CANCELLED
+
+
+def test_cancelled_entry_cancels_its_exits():
+    engine = PaperTradingEngine(risk_checks=False, fill_model=IdealFillModel())
+    entry, take_profit, stop = engine.place_bracket_order("A", OrderSide.BUY, 10, take_profit=110.0, stop_loss=90.0,
+                                                          order_type=OrderType.LIMIT, price=95.0)
+    engine.cancel_order(entry.id)
+    assert take_profit.status == stop.status == OrderStatus.CANCELLED
+    assert len(engine.book) == 0
+
+
+def test_partially_filled_entry_protects_filled_shares():
+    engine = PaperTradingEngine(risk_checks=False, fill_model=IdealFillModel())
+    entry, take_profit, stop = engine.place_bracket_order("A", OrderSide.BUY, 10, take_profit=110.0, stop_loss=90.0,
+                                                          order_type=OrderType.LIMIT, price=95.0)
+    engine._fill(entry, 95.0, 4)
+    engine.book.cancel(entry.id)
+    assert take_profit.quantity == stop.quantity == 4
+    assert take_profit.status == stop.status == OrderStatus.PENDING
+
+
+def test_trailing_stop_ratchets_up_only():
+    engine = engine_with_position()
+    trail = engine.place_order("A", OrderSide.SELL, 10, OrderType.TRAILING_STOP, trail_percent=5)
+    assert trail.stop_price == 95.0
+    engine.process_orders({"A": 120.0})
+    assert trail.stop_price == 114.0
+    engine.process_orders({"A": 115.0}) # Pullback above the stop: no change, no fill
+    assert trail.stop_price == 114.0
+    assert trail.status == OrderStatus.PENDING
+    engine.process_orders({"A": 113.0})
+    assert trail.status == OrderStatus.FILLED
+    assert trail.filled_price == 113.0
+
+
+def test_buy_trailing_stop_ratchets_down():
+    engine = PaperTradingEngine(risk_checks=False, fill_model=IdealFillModel())
+    engine.process_orders({"A": 100.0})
+    trail = engine.place_order("A", OrderSide.BUY, 10, OrderType.TRAILING_STOP, trail_amount=2.0)
+    engine.process_orders({"A": 90.0})
+    assert trail.stop_price == 92.0
+    engine.process_orders({"A": 93.0})
+    assert trail.status == OrderStatus.FILLED
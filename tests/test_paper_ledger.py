@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+from src.execution.fill_model import IdealFillModel
+from src.execution.paper_engine import PaperTradingEngine
+from src.infrastructure.ledger import LedgerLocked, PaperLedger
+from src.models.trading import OrderSide, OrderStatus, OrderType
+
+
+@pytest.fixture
+def ledger_path(tmp_path):
+    return os.path.join(tmp_path, "ledger.db")
+
+
+def open_engine(path: str, snapshot_every: int = 200) -> PaperTradingEngine:
+    return PaperTradingEngine(ledger=PaperLedger(path, snapshot_every=snapshot_every), fill_model=IdealFillModel())
+
+
+def crash(engine: PaperTradingEngine):
+    """Drops the engine without its closing snapshot."""
+    engine.ledger.close()
+
+
+def account(engine: PaperTradingEngine):
+    return (engine.portfolio.cash,
+            {s: (p.quantity, p.average_price) for s, p in engine.portfolio.positions.items()},
+            sorted((o.symbol, o.side, o.quantity, o.price) for o in engine.book.pending.values()))
+
+
+def test_restore_from_snapshot_plus_tail(ledger_path):
+    engine = open_engine(ledger_path, snapshot_every=3)
+    for i, symbol in enumerate(("A", "B", "C", "D")):
+        engine.place_order(symbol, OrderSide.BUY, 10 + i)
+        engine.process_orders({symbol: 100.0 + i})
+    engine.place_order("A", OrderSide.SELL, 5, OrderType.LIMIT, price=150.0) # Still working at the crash
+    expected = account(engine)
+    seq, _ = engine.ledger.latest_snapshot()
+    assert 0 < seq < engine.ledger.last_seq() # Some events are only in the tail
+    crash(engine)
+
+    restored = open_engine(ledger_path)
+    assert account(restored) == expected
+    assert len(restored.trades) == 4
+    restored.process_orders({"A": 151.0}) # The restored limit order still works
+    assert restored.portfolio.positions["A"].quantity == 5
+    restored.close()
+
+
+def test_crash_between_fill_and_close(ledger_path):
+    engine = open_engine(ledger_path)
+    order = engine.place_order("A", OrderSide.BUY, 10)
+    engine.book.on_close = None # The process dies after logging the fill, before the close
+    engine.process_orders({"A": 100.0})
+    crash(engine)
+
+    restored = open_engine(ledger_path)
+    assert restored.portfolio.positions["A"].quantity == 10
+    assert restored.portfolio.cash == 100000.0 - 1000.0
+    assert len(restored.book) == 0 # The filled order is closed on restore, not filled again
+    assert restored.book.get(order.id).status == OrderStatus.FILLED
+    restored.process_orders({"A": 100.0})
+    assert restored.portfolio.positions["A"].quantity == 10
+    restored.close()
+
+
+def test_risk_peak_survives_restart(ledger_path):
+    engine = open_engine(ledger_path)
+    engine.place_order("A", OrderSide.BUY, 100)
+    engine.process_orders({"A": 100.0})
+    engine.process_orders({"A": 120.0})
+    engine.process_orders({"A": 90.0})
+    peak = engine.risk.peak_equity
+    engine.close()
+
+    restored = open_engine(ledger_path)
+    assert restored.risk.peak_equity == peak
+    assert restored.risk.snapshot()["drawdown_pct"] > 0
+    restored.close()
+
+
+def test_ledger_has_a_single_owner(ledger_path):
+    ledger = PaperLedger(ledger_path)
+    with pytest.raises(LedgerLocked):
+        PaperLedger(ledger_path)
+    ledger.close()
+    PaperLedger(ledger_path).close()
@@ -0,0 +1,116 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.execution.fill_model import IdealFillModel, MarketImpactFillModel
+from src.execution.mirror import AccountMirror
+from src.execution.paper_engine import PaperTradingEngine
+from src.execution.risk_engine import RiskEngine, RiskRejected
+from src.models.risk import RiskSettings
+from src.models.trading import OrderSide, OrderType
+
+LIMITS = RiskSettings(max_position_size=5000, max_daily_loss=1e9, max_drawdown_pct=1.0, max_open_positions=2)
+
+
+def risk_engine(cash: float = 100000.0) -> RiskEngine:
+    risk = RiskEngine(lambda: LIMITS)
+    risk.sync(cash, [])
+    return risk
+
+
+def paper_engine(fill_model=None) -> PaperTradingEngine:
+    engine = PaperTradingEngine(fill_model=fill_model or IdealFillModel())
+    engine.risk.risk_settings = lambda: LIMITS
+    return engine
+
+
+def test_accepted_buys_count_toward_open_positions():
+    risk = risk_engine()
+    risk.check("A", OrderSide.BUY, 10, 100.0)
+    risk.check("B", OrderSide.BUY, 10, 100.0)
+    with pytest.raises(RiskRejected) as e:
+        risk.check("C", OrderSide.BUY, 10, 100.0)
+    assert e.value.rejection.rule == "max_open_positions"
+    # Adding to a symbol that is already pending is not a new position
+    risk.check("A", OrderSide.BUY, 5, 100.0)
+
+
+def test_reserved_shares_count_toward_position_size():
+    risk = risk_engine()
+    risk.check("A", OrderSide.BUY, 30, 100.0)
+    with pytest.raises(RiskRejected) as e:
+        risk.check("A", OrderSide.BUY, 25, 100.0)
+    assert e.value.rejection.rule == "max_position_size"
+    assert risk.reserved == {"A": 30}
+
+
+def test_rejected_and_sell_orders_reserve_nothing():
+    risk = risk_engine()
+    risk.check("A", OrderSide.SELL, 10, 100.0)
+    with pytest.raises(RiskRejected):
+        risk.check("A", OrderSide.BUY, 100, 100.0)
+    assert risk.reserved == {}
+
+
+def test_fills_and_release_shrink_reservations():
+    risk = risk_engine()
+    risk.check("A", OrderSide.BUY, 10, 100.0)
+    risk.on_fill("A", OrderSide.BUY, 4, 100.0)
+    assert risk.reserved == {"A": 6}
+    risk.release("A", 6)
+    assert risk.reserved == {}
+    assert risk.quantities == {"A": 4}
+
+
+def test_paper_partial_fill_then_cancel_releases_the_rest():
+    engine = paper_engine(MarketImpactFillModel(max_participation=0.1))
+    order = engine.place_order("A", OrderSide.BUY, 10, OrderType.LIMIT, price=100.0)
+    engine.process_orders({"A": 100.0}, {"A": 40}) # 10% of 40 shares: 4 fill
+    assert order.filled_quantity == 4
+    assert engine.risk.reserved == {"A": 6}
+    engine.cancel_order(order.id)
+    assert engine.risk.reserved == {}
+    assert engine.risk.quantities == {"A": 4}
+
+
+def test_paper_rejected_fill_releases_reservation():
+    engine = paper_engine()
+    engine.portfolio.cash = 500.0 # Enough for the risk check's view, not for the fill
+    engine.place_order("A", OrderSide.BUY, 10, OrderType.LIMIT, price=100.0)
+    engine.process_orders({"A": 100.0})
+    assert engine.risk.reserved == {}
+
+
+def test_paper_batch_sees_earlier_requests():
+    from src.execution.order_router import OrderRequest
+    engine = paper_engine()
+    results = engine.place_orders([OrderRequest(symbol=s, side=OrderSide.BUY, quantity=10, order_type=OrderType.LIMIT, price=100.0)
+                                   for s in ("A", "B", "C")])
+    assert [r.ok for r in results] == [True, True, False]
+    assert results[2].risk_rejected
+
+
+class _Broker:
+    def __init__(self, orders):
+        self.orders = orders
+
+    def get_account(self):
+        return SimpleNamespace(equity=1e5, cash=1e5, buying_power=1e5, last_equity=1e5, status="ACTIVE")
+
+    def get_all_positions(self):
+        return []
+
+    def get_orders(self, filter=None):
+        return self.orders
+
+
+def test_mirror_reconcile_rebuilds_and_drop_releases():
+    mirror = AccountMirror(_Broker([SimpleNamespace(id="o1", symbol="X", side="OrderSide.BUY", qty="10", filled_qty="4")]),
+                           reconcile_seconds=60)
+    mirror.risk = risk_engine()
+    mirror.reconcile()
+    assert mirror.risk.reserved == {"X": 6}
+    mirror.apply_fill("o1", "X", OrderSide.BUY, 2, 50.0)
+    assert mirror.risk.reserved == {"X": 4}
+    mirror.drop_order("o1")
+    assert mirror.risk.reserved == {}